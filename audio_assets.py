@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import mmap
+import os
+import sys
+from typing import AsyncIterator, Callable, Protocol
+
+from livekit import rtc
+from livekit.agents.utils.audio import audio_frames_from_file
+
+AMBIENT_TRACK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bg_noise.mp3")
+# raw PCM of AMBIENT_TRACK, written at image build time by `python audio_assets.py`
+AMBIENT_PCM = os.path.splitext(AMBIENT_TRACK)[0] + ".pcm"
+
+# what BackgroundAudioPlayer publishes, nothing is resampled at playback
+SAMPLE_RATE = 48000
+NUM_CHANNELS = 1
+FRAME_SAMPLES = SAMPLE_RATE // 50  # 20ms
+FRAME_BYTES = FRAME_SAMPLES * NUM_CHANNELS * 2  # int16
+
+
+class AmbientTrack(Protocol):
+    @property
+    def duration(self) -> float: ...
+
+    def loop(
+        self, on_first_frame: Callable[[], None] | None = None
+    ) -> AsyncIterator[rtc.AudioFrame]: ...
+
+
+class DecodedTrack:
+    """
+    A track decoded once into PCM frames, shared by every session on the
+    worker. The frames are never modified, each session just iterates them.
+    """
+
+    def __init__(self, frames: tuple[rtc.AudioFrame, ...]) -> None:
+        if not frames:
+            raise ValueError("the track has no audio")
+        self.frames = frames
+
+    @property
+    def duration(self) -> float:
+        return sum(frame.duration for frame in self.frames)
+
+    async def loop(
+        self, on_first_frame: Callable[[], None] | None = None
+    ) -> AsyncIterator[rtc.AudioFrame]:
+        """
+        Repeats the track forever, `BackgroundAudioPlayer` only loops file
+        paths by itself.
+        """
+        while True:
+            for frame in self.frames:
+                yield frame
+                if on_first_frame is not None:
+                    on_first_frame()
+                    on_first_frame = None
+
+
+class MappedTrack:
+    """
+    Raw 48kHz mono int16 PCM, memory-mapped read-only. The pages are shared
+    by every session and, through the page cache, by every worker process on
+    the host; frames are cut from views of the mapping as they are played.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # whole frames only, a partial one at the end would click on every loop
+        self._size = len(self._mmap) - len(self._mmap) % FRAME_BYTES
+        if not self._size:
+            raise ValueError(f"{path} has no audio")
+        self._view = memoryview(self._mmap)
+
+    @property
+    def duration(self) -> float:
+        return self._size / (FRAME_BYTES * 50)
+
+    async def loop(
+        self, on_first_frame: Callable[[], None] | None = None
+    ) -> AsyncIterator[rtc.AudioFrame]:
+        view, size = self._view, self._size
+        while True:
+            for offset in range(0, size, FRAME_BYTES):
+                yield rtc.AudioFrame(
+                    view[offset : offset + FRAME_BYTES], SAMPLE_RATE, NUM_CHANNELS, FRAME_SAMPLES
+                )
+                if on_first_frame is not None:
+                    on_first_frame()
+                    on_first_frame = None
+
+
+async def decode_track(path: str) -> DecodedTrack:
+    return DecodedTrack(
+        tuple(
+            [
+                frame
+                async for frame in audio_frames_from_file(
+                    path, sample_rate=SAMPLE_RATE, num_channels=NUM_CHANNELS
+                )
+            ]
+        )
+    )
+
+
+async def convert_track(path: str, pcm_path: str) -> None:
+    """Decodes `path` into the raw PCM layout `MappedTrack` reads."""
+    tmp_path = pcm_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        async for frame in audio_frames_from_file(
+            path, sample_rate=SAMPLE_RATE, num_channels=NUM_CHANNELS
+        ):
+            f.write(frame.data)
+    os.replace(tmp_path, pcm_path)
+
+
+_ambient: AmbientTrack | None = None
+
+
+async def get_ambient_track() -> AmbientTrack:
+    """
+    Returns the process-wide ambient track: the pre-converted PCM when the
+    image has it, otherwise the MP3 decoded once on first use.
+    """
+    global _ambient
+    if _ambient is None:
+        if os.path.exists(AMBIENT_PCM):
+            _ambient = MappedTrack(AMBIENT_PCM)
+        else:
+            _ambient = await decode_track(AMBIENT_TRACK)
+    return _ambient
+
+
+if __name__ == "__main__":
+    # python audio_assets.py [track.mp3 track.pcm] -> converts the ambient track by default
+    import asyncio
+
+    src, dst = sys.argv[1:3] if len(sys.argv) >= 3 else (AMBIENT_TRACK, AMBIENT_PCM)
+    asyncio.run(convert_track(src, dst))
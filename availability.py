@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from typing import Callable, Iterable
+
+from catalog import MenuCatalog
+from database import ItemSize
+
+logger = logging.getLogger(__name__)
+
+# (item_id, size); a `None` size marks every size of the item
+AvailabilityKey = tuple[str, ItemSize | None]
+AvailabilityListener = Callable[[frozenset[AvailabilityKey], frozenset[AvailabilityKey]], None]
+
+
+class AvailabilityOverlay:
+    """
+    Mutable, process-wide set of items that ran out after the catalog was
+    built. It sits on top of `MenuItem.available` so the frozen catalog and the
+    rendered menu never need to be rebuilt when an item is 86'd mid-shift.
+    """
+
+    def __init__(self) -> None:
+        self._unavailable: frozenset[AvailabilityKey] = frozenset()
+        self._listeners: list[AvailabilityListener] = []
+
+    @property
+    def unavailable(self) -> frozenset[AvailabilityKey]:
+        return self._unavailable
+
+    def is_available(self, item_id: str, size: ItemSize | None = None) -> bool:
+        unavailable = self._unavailable
+        return (item_id, size) not in unavailable and (item_id, None) not in unavailable
+
+    def update(self, unavailable: Iterable[AvailabilityKey]) -> None:
+        """Replaces the whole overlay and notifies listeners about what changed."""
+        unavailable = frozenset(unavailable)
+        sold_out = unavailable - self._unavailable
+        back_in_stock = self._unavailable - unavailable
+        if not sold_out and not back_in_stock:
+            return
+
+        self._unavailable = unavailable
+        for listener in list(self._listeners):
+            listener(sold_out, back_in_stock)
+
+    def subscribe(self, listener: AvailabilityListener) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+
+def availability_delta(
+    catalog: MenuCatalog,
+    sold_out: Iterable[AvailabilityKey],
+    back_in_stock: Iterable[AvailabilityKey] = (),
+) -> str:
+    """Renders a short system note for the changed items only."""
+
+    def _label(item_id: str, size: ItemSize | None) -> str:
+        size_map = catalog.items_by_id.get(item_id)
+        name = next(iter(size_map.values())).name if size_map else item_id
+        return f"{name} (id: {item_id}, size: {size})" if size else f"{name} (id: {item_id})"
+
+    lines = ["# Menu availability update (overrides the menu above):"]
+    lines += [f"  - {_label(*key)}: unavailable" for key in sorted(sold_out, key=str)]
+    lines += [f"  - {_label(*key)}: available again" for key in sorted(back_in_stock, key=str)]
+    return "\n".join(lines)
+
+
+def load_availability_file(path: str) -> frozenset[AvailabilityKey]:
+    """
+    Reads a JSON list of unavailable items, e.g.
+    `[{"id": "pepsi", "size": "Can"}, {"id": "water"}]`.
+    """
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return frozenset((entry["id"], entry.get("size")) for entry in entries)
+
+
+async def watch_availability_file(
+    overlay: AvailabilityOverlay, path: str, *, interval: float = 2.0
+) -> None:
+    last_mtime: float | None = None
+    while True:
+        try:
+            mtime = os.stat(path).st_mtime
+            if mtime != last_mtime:
+                last_mtime = mtime
+                overlay.update(load_availability_file(path))
+        except FileNotFoundError:
+            if last_mtime is not None:
+                last_mtime = None
+                overlay.update(())
+        except (ValueError, KeyError, TypeError):
+            logger.exception("ignoring malformed availability file %s", path)
+        await asyncio.sleep(interval)
+
+
+_overlay: AvailabilityOverlay | None = None
+_watch_task: asyncio.Task[None] | None = None
+
+
+def get_availability() -> AvailabilityOverlay:
+    """
+    Returns the process-wide overlay. When `MENU_AVAILABILITY_FILE` is set, it
+    also starts watching that file, once per process.
+    """
+    global _overlay, _watch_task
+    if _overlay is None:
+        _overlay = AvailabilityOverlay()
+
+    path = os.getenv("MENU_AVAILABILITY_FILE")
+    if path and _watch_task is None:
+        try:
+            _watch_task = asyncio.get_running_loop().create_task(
+                watch_availability_file(_overlay, path)
+            )
+        except RuntimeError:
+            pass  # no loop yet (e.g. prewarm), the first session starts the watcher
+
+    return _overlay
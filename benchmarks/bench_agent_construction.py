@@ -0,0 +1,62 @@
+"""
+Per-session cost of the agent: constructing `DriveThruAgent`, and turning
+its tools into the JSON schemas the realtime session sends (what
+`RealtimeSession.update_tools` does when a session starts).
+
+    python benchmarks/bench_agent_construction.py --sessions 200
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import llm
+
+from cashier import DriveThruAgent, new_userdata
+from catalog import build_catalog, default_repository
+
+
+def tool_schemas(agent: DriveThruAgent) -> list[dict]:
+    schemas = []
+    for tool in agent.tools:
+        if isinstance(tool, llm.RawFunctionTool):
+            schemas.append(dict(tool.info.raw_schema))
+        elif isinstance(tool, llm.FunctionTool):
+            schemas.append(llm.utils.build_legacy_openai_schema(tool, internally_tagged=True))
+    return schemas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+
+    for mode in ("full", "retrieval"):
+        catalog = asyncio.run(build_catalog(default_repository(), context_mode=mode))
+
+        agents = []
+        start = time.perf_counter()
+        for _ in range(args.sessions):
+            agents.append(DriveThruAgent(userdata=new_userdata(catalog)))
+        construct = (time.perf_counter() - start) / args.sessions
+
+        start = time.perf_counter()
+        dumps = [json.dumps(tool_schemas(agent)) for agent in agents]
+        schemas = (time.perf_counter() - start) / args.sessions
+
+        print(
+            f"{mode:<9} construct {construct * 1e3:7.3f} ms  tool schemas {schemas * 1e3:7.3f} ms"
+            f"  per session, identical schemas across sessions: {len(set(dumps)) == 1}"
+        )
+        # compare between runs, e.g. with different PYTHONHASHSEED values
+        print(f"{'':<9} schema digest {hashlib.blake2b(dumps[0].encode(), digest_size=8).hexdigest()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+CPU time and memory of feeding the ambient track to concurrent sessions on
+one worker: decoding the MP3 per session (what BackgroundAudioPlayer does
+with a file path), frames decoded once and shared, and the memory-mapped
+pre-converted PCM. Each mode runs in its own process so RSS is comparable.
+
+    python benchmarks/bench_ambient_audio.py --sessions 50 --seconds 60
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_assets import AMBIENT_TRACK, MappedTrack, convert_track, decode_track
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def session(frames, seconds: float) -> None:
+    played = 0.0
+    async for frame in frames:
+        played += frame.duration
+        if played >= seconds:
+            break
+        # let the other sessions run, as the 20ms pacing of the player would
+        await asyncio.sleep(0)
+    await frames.aclose()
+
+
+async def run_mode(mode: str, sessions: int, seconds: float, pcm_path: str) -> None:
+    from livekit.agents.voice.background_audio import _loop_audio_frames
+
+    base_rss = rss_mb()
+    start_cpu, start = cpu_seconds(), time.perf_counter()
+    if mode == "decode":
+        make = lambda: _loop_audio_frames(AMBIENT_TRACK)  # noqa: E731
+    elif mode == "shared":
+        track = await decode_track(AMBIENT_TRACK)
+        make = track.loop
+    else:
+        track = MappedTrack(pcm_path)
+        make = track.loop
+
+    await asyncio.gather(*(session(make(), seconds) for _ in range(sessions)))
+    cpu = cpu_seconds() - start_cpu
+    print(
+        f"{mode:<8} cpu {cpu:7.2f}s  ({cpu * 1000 / (sessions * seconds):5.2f} ms per session-second)"
+        f"  wall {time.perf_counter() - start:6.2f}s  rss +{rss_mb() - base_rss:6.1f} MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--mode", choices=["decode", "shared", "mmap"])
+    parser.add_argument("--pcm")
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(run_mode(args.mode, args.sessions, args.seconds, args.pcm))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pcm_path = os.path.join(tmp, "ambient.pcm")
+        asyncio.run(convert_track(AMBIENT_TRACK, pcm_path))
+        print(f"{args.sessions} sessions x {args.seconds:g}s of ambient audio")
+        for mode in ("decode", "shared", "mmap"):
+            subprocess.run(
+                [
+                    sys.executable, __file__, "--mode", mode, "--pcm", pcm_path,
+                    "--sessions", str(args.sessions), "--seconds", str(args.seconds),
+                ],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
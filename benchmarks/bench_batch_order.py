@@ -0,0 +1,101 @@
+"""
+Model round trips and end-to-end turn time for multi-item utterances, using
+one `order_regular_item` call per item vs. a single `order_items` call.
+
+A scripted stand-in replaces the realtime model: it emits the tool calls
+the model would make for each utterance, and every model response costs a
+fixed `--rtt-ms`. Tool calls run for real against the sample catalog.
+
+    python benchmarks/bench_batch_order.py --rtt-ms 700
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cashier import DriveThruAgent, new_userdata
+from catalog import get_catalog
+
+# each utterance is the list of (item_id, size, quantity, modifiers) the customer asked for
+SCRIPT = [
+    [("margherita", "L", 2, []), ("pepsi", "Can", 1, []), ("marinara_sauce", None, 1, [])],
+    [("chicken_wings", "8 Pieces", 1, ["bbq"]), ("water", None, 2, [])],
+    [("veggie", "M", 1, [])],
+    [
+        ("garlic_twists", None, 1, []),
+        ("chocolate_lava_cake", "2 Pieces", 1, []),
+        ("bbq_sauce", None, 2, []),
+        ("seven_up", "Can", 3, []),
+    ],
+]
+
+
+class ScriptedModel:
+    """Plays the model: turns an utterance into tool calls, one response at a time."""
+
+    def __init__(self, batch: bool) -> None:
+        self.batch = batch
+
+    def responses(self, utterance):
+        if self.batch:
+            yield [
+                (
+                    "order_items",
+                    {"items": [{"item_id": i, "size": s, "quantity": q, "modifiers": m} for i, s, q, m in utterance]},
+                )
+            ]
+        else:
+            for item_id, size, quantity, modifiers in utterance:
+                for _ in range(quantity):
+                    yield [("order_regular_item", {"item_id": item_id, "size": size, "modifiers": modifiers})]
+        yield []  # the spoken confirmation closes the turn
+
+
+async def run(batch: bool, rtt: float) -> tuple[int, float, float]:
+    catalog = await get_catalog()
+    userdata = new_userdata(catalog)
+    agent = DriveThruAgent(userdata=userdata)
+    tools = {tool.info.name: tool for tool in agent.tools}
+    ctx = SimpleNamespace(userdata=userdata)
+    model = ScriptedModel(batch)
+
+    round_trips = 0
+    tool_time = 0.0
+    for utterance in SCRIPT:
+        for calls in model.responses(utterance):
+            round_trips += 1
+            for name, arguments in calls:
+                start = time.perf_counter()
+                await tools[name](arguments, ctx)
+                tool_time += time.perf_counter() - start
+
+    return round_trips, tool_time, round_trips * rtt + tool_time
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rtt-ms", type=float, default=700.0)
+    args = parser.parse_args()
+    rtt = args.rtt_ms / 1000
+
+    print(f"{len(SCRIPT)} utterances, {args.rtt_ms:.0f} ms per model response")
+    results = {}
+    for label, batch in (("order_regular_item", False), ("order_items", True)):
+        results[label] = await run(batch, rtt)
+        round_trips, tool_time, total = results[label]
+        print(
+            f"{label:<20} {round_trips:>3} model responses  "
+            f"tools {tool_time * 1e3:6.2f} ms  turn time {total:6.2f} s"
+        )
+
+    single, batched = results["order_regular_item"], results["order_items"]
+    print(f"round trips saved: {single[0] - batched[0]}, turn time {single[2] / batched[2]:.1f}x faster")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
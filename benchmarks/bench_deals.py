@@ -0,0 +1,112 @@
+"""
+Time the deal engine takes to keep an order's deals up to date, on every
+add and remove of orders growing past 50 lines with 200 active deals whose
+components overlap (the worst case for the search). Reports the per-change
+percentiles and worst case, how often the search hit its node budget, and
+what the search saves over the greedy answer.
+
+    python benchmarks/bench_deals.py --deals 200 --lines 60 --orders 200 --max-nodes 64 256 1024
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deals import Deal, DealComponent, DealEngine
+from recipt_state import OrderState
+
+SIZES = ("S", "M", "L")
+
+
+def synthetic_deals(n: int, items: int, rng: random.Random) -> list[Deal]:
+    deals = []
+    for d in range(n):
+        components = []
+        for _ in range(rng.randint(2, 3)):
+            choices = frozenset(
+                (f"item_{rng.randrange(items)}", rng.choice((*SIZES, None))) for _ in range(rng.randint(1, 6))
+            )
+            components.append(DealComponent(choices=choices, quantity=rng.choice((1, 1, 2))))
+        deals.append(Deal(f"deal_{d}", f"Deal {d}", 0, tuple(components)))
+    return deals
+
+
+def priced(deals: list[Deal], prices: dict, rng: random.Random) -> list[Deal]:
+    # 70-95% of the components' average price, so most deals are worth taking
+    priced_deals = []
+    for deal in deals:
+        value = sum(
+            component.quantity * sum(prices[key] for key in component.choices) // len(component.choices)
+            for component in deal.components
+        )
+        priced_deals.append(Deal(deal.deal_id, deal.name, value * rng.randint(70, 95) // 100, deal.components))
+    return priced_deals
+
+
+def percentile(values: list[float], p: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run_order(
+    order: OrderState, keys: list, lines: int, rng: random.Random, prices: dict, timings: list[float]
+) -> None:
+    """Adds items (and removes some) until the order has `lines` lines, timing each change."""
+    while len(order.lines) < lines:
+        item_id, size = rng.choice(keys)
+        start = time.perf_counter()
+        if order.lines and rng.random() < 0.15:
+            await order.decrement(next(iter(order.lines.values())).order_id)
+        else:
+            await order.add(item_id, size, quantity=rng.randint(1, 2), unit_price_fils=prices[(item_id, size)])
+        timings.append(time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deals", type=int, default=200)
+    parser.add_argument("--items", type=int, default=120)
+    parser.add_argument("--lines", type=int, default=60)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--max-nodes", type=int, nargs="+", default=[64, 256, 1024])
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    keys = [(f"item_{n}", size) for n in range(args.items) for size in SIZES]
+    prices = {key: 1_000 + rng.randrange(4_000) for key in keys}
+    # a None size is priced like its medium
+    prices.update({(f"item_{n}", None): prices[(f"item_{n}", "M")] for n in range(args.items)})
+    deals = priced(synthetic_deals(args.deals, args.items, rng), prices, rng)
+
+    print(f"{args.deals} deals over {args.items} items x {len(SIZES)} sizes, orders of {args.lines} lines")
+    for max_nodes in args.max_nodes:
+        engine = DealEngine(deals, max_nodes=max_nodes)
+        timings = []
+        capped = greedy_savings = savings = 0
+        for n in range(args.orders):
+            order = OrderState()
+            order.use_deals(engine)
+            asyncio.run(run_order(order, keys, args.lines, random.Random(n), prices, timings))
+            capped += not order.deals.match.exhaustive
+            savings += order.discount_fils
+            # no search budget at all leaves the greedy answer
+            greedy = DealEngine(deals, max_nodes=0).tracker()
+            for line in order.lines.values():
+                greedy.update(line.key, line.quantity, line.unit_price_fils)
+            greedy_savings += greedy.savings_fils
+
+        us = [t * 1e6 for t in timings]
+        print(
+            f"  max_nodes {max_nodes:5d}: per change p50 {percentile(us, 0.5):7.0f} us"
+            f"  p99 {percentile(us, 0.99):7.0f} us  max {max(us):7.0f} us"
+            f" | final search capped {capped}/{args.orders}"
+            f" | saves {savings / args.orders / 100:6.2f} AED/order (greedy {greedy_savings / args.orders / 100:6.2f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
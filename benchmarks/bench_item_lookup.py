@@ -0,0 +1,55 @@
+"""
+Compares the linear `find_items_by_id` scan used by the order tool against the
+precomputed `index_by_id` lookup on a synthetic menu.
+
+    python benchmarks/bench_item_lookup.py --skus 10000
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import find_items_by_id, index_by_id
+from menu_fixtures import synthetic_menu
+
+SIZES = ("S", "M", "L")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, default=10_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    args = parser.parse_args()
+
+    items = synthetic_menu(args.skus, sizes=SIZES)
+    ids = [f"item_{random.randrange(len(items) // len(SIZES))}" for _ in range(args.lookups)]
+
+    def linear() -> None:
+        for item_id in ids:
+            item_sizes = find_items_by_id(items, item_id)
+            list({item.size for item in item_sizes if item.size})
+
+    build_time = timeit.timeit(lambda: index_by_id(items), number=1)
+    items_by_id, sizes_by_id = index_by_id(items)
+
+    def indexed() -> None:
+        for item_id in ids:
+            items_by_id.get(item_id)
+            sizes_by_id[item_id]
+
+    linear_time = timeit.timeit(linear, number=1)
+    indexed_time = min(timeit.repeat(indexed, number=1, repeat=5))
+
+    print(f"menu: {len(items)} skus, {args.lookups} lookups")
+    print(f"index build:      {build_time * 1e3:10.2f} ms (once per catalog)")
+    print(f"find_items_by_id: {linear_time / args.lookups * 1e6:10.2f} us/lookup")
+    print(f"index_by_id:      {indexed_time / args.lookups * 1e6:10.2f} us/lookup")
+    print(f"speedup:          {linear_time / indexed_time:10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
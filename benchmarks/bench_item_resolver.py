@@ -0,0 +1,83 @@
+"""
+Accuracy and latency of the fuzzy/phonetic item resolver on synthetic
+misspellings of the sample menu's ids and names.
+
+    python benchmarks/bench_item_resolver.py --variants 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import build_catalog
+from database import FakeDB
+from item_resolver import ItemResolver
+
+
+def misspell(text: str, rng: random.Random) -> str:
+    words = text.replace("_", " ").split()
+    kind = rng.choice(("swap_words", "drop", "double", "vowel", "p_to_b"))
+    if kind == "swap_words" and len(words) > 1:
+        rng.shuffle(words)
+        return "_".join(words)
+
+    text = " ".join(words)
+    i = rng.randrange(len(text))
+    if kind == "drop":
+        return text[:i] + text[i + 1 :]
+    if kind == "double":
+        return text[:i] + text[i] + text[i:]
+    if kind == "vowel":
+        vowels = [n for n, c in enumerate(text) if c in "aeiou"]
+        if vowels:
+            n = rng.choice(vowels)
+            return text[:n] + rng.choice("aeiou") + text[n + 1 :]
+    return text.replace("p", "b")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variants", type=int, default=20)
+    args = parser.parse_args()
+
+    catalog = asyncio.run(build_catalog(FakeDB()))
+    resolver = ItemResolver(catalog.all_items)
+    rng = random.Random(3)
+
+    names = {item.id: item.name for item in catalog.all_items}
+    cases = [
+        (misspell(text, rng), item_id)
+        for item_id, name in names.items()
+        for text in (item_id, name)
+        for _ in range(args.variants)
+    ]
+
+    resolved = wrong = shortlisted = 0
+    latencies = []
+    for query, expected in cases:
+        start = time.perf_counter()
+        best, ranked = resolver.resolve(query)
+        latencies.append(time.perf_counter() - start)
+        if best == expected:
+            resolved += 1
+        elif best is not None:
+            wrong += 1
+        elif expected in (r.item_id for r in ranked):
+            shortlisted += 1
+
+    total = len(cases)
+    print(f"{total} misspellings of {len(names)} items")
+    print(f"resolved in one call:   {resolved / total:6.1%}")
+    print(f"in shortlist:           {shortlisted / total:6.1%}")
+    print(f"resolved to wrong item: {wrong / total:6.1%}")
+    print(f"latency: p50 {statistics.median(latencies) * 1e6:.0f} us, max {max(latencies) * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
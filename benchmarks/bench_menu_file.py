@@ -0,0 +1,123 @@
+"""
+Memory of worker processes holding the menu: each building its own catalog
+(today), against mapping a menu file written once (`menu_file`). Several
+workers run at the same time, so the pages of the file they share show up
+in the proportional set size (PSS): a shared page counts 1/N per process.
+Also times repeated lookups by id, as the order tools make them.
+
+    python benchmarks/bench_menu_file.py --skus 10000 100000 --workers 4 --mode retrieval
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import build_catalog
+from menu_file import load_catalog, write_menu_file
+from menu_fixtures import synthetic_menu
+
+
+class ListRepository:
+    def __init__(self, items) -> None:
+        self.items = items
+
+    async def list_all(self):
+        return self.items
+
+
+def memory_kb(pid: int) -> dict[str, int]:
+    fields = {}
+    for name in ("status", "smaps_rollup"):
+        with open(f"/proc/{pid}/{name}") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "RssFile", "Pss"):
+                    fields[key] = int(value.split()[0])
+    return fields
+
+
+def worker(source: str, skus: int, context_mode: str) -> None:
+    start = time.perf_counter()
+    if source == "build":
+        catalog = asyncio.run(build_catalog(ListRepository(synthetic_menu(skus)), context_mode=context_mode))
+    else:
+        catalog = load_catalog(source)
+    # what sessions do: lookups by id, and the prompt
+    for n in range(0, skus // 3, 97):
+        catalog.find(f"item_{n}", "M")
+    assert catalog.instructions
+    load_seconds = time.perf_counter() - start
+
+    # the same ids again, as the order tools look them up during a call
+    ids = [f"item_{n}" for n in range(0, skus // 3, 97)]
+    start = time.perf_counter()
+    for _ in range(10):
+        for item_id in ids:
+            catalog.find(item_id, "M")
+    lookup_us = (time.perf_counter() - start) / (10 * len(ids)) * 1e6
+    print(f"{load_seconds:.2f} {lookup_us:.2f}", flush=True)
+    sys.stdin.read()
+
+
+def run(source: str, skus: int, workers: int, context_mode: str) -> None:
+    procs = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--worker", source, "--skus", str(skus), "--mode", context_mode],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(workers)
+    ]
+    timings = [proc.stdout.readline().split() for proc in procs]
+    load_seconds = [float(load) for load, _ in timings]
+    lookup_us = max(float(lookup) for _, lookup in timings)
+    memory = [memory_kb(proc.pid) for proc in procs]
+    for proc in procs:
+        proc.stdin.close()
+        proc.wait()
+
+    def mb(key: str) -> float:
+        return sum(m[key] for m in memory) / len(memory) / 1024
+
+    label = "build per process" if source == "build" else "mapped menu file"
+    print(
+        f"  {label:<18} load {max(load_seconds):6.2f}s  lookup {lookup_us:5.2f} us  RSS {mb('VmRSS'):7.1f} MB"
+        f" (anon {mb('RssAnon'):7.1f}, file {mb('RssFile'):6.1f})  PSS {mb('Pss'):7.1f} MB"
+        f"  -> {mb('Pss') * workers:8.1f} MB for {workers} workers"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mode", choices=["full", "retrieval"], default="retrieval")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if args.worker:
+        worker(args.worker, args.skus[0], args.mode)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for skus in args.skus:
+            path = os.path.join(tmp, f"menu-{skus}.bin")
+            catalog = asyncio.run(build_catalog(ListRepository(synthetic_menu(skus)), context_mode=args.mode))
+            write_menu_file(catalog, path)
+            del catalog
+            print(f"{skus} SKUs, {args.mode} context, menu file {os.path.getsize(path) / 2**20:.1f} MB")
+            run("build", skus, args.workers, args.mode)
+            run(path, skus, args.workers, args.mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Cold-load time of the SQLite menu backend: one batched `list_all` query vs.
+the six per-category round trips, plus the full catalog build on top of it.
+
+    python benchmarks/bench_menu_load.py --skus 1000 10000 100000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite_menu
+from catalog import build_catalog
+from menu_fixtures import synthetic_menu
+from sqlite_menu import SqliteMenuRepository
+
+
+async def timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+async def per_category(repo: SqliteMenuRepository) -> None:
+    await repo.list_drinks()
+    await repo.list_pizza()
+    await repo.list_sauces()
+    await repo.list_chicken()
+    await repo.list_sides()
+    await repo.list_desserts()
+
+
+async def bench(skus: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "menu.db")
+        await SqliteMenuRepository(path).save_items(synthetic_menu(skus))
+
+        results = {}
+        for label, run in (
+            ("list_all (1 query)", lambda repo: repo.list_all()),
+            ("list_* (6 queries)", per_category),
+            ("build_catalog", build_catalog),
+        ):
+            # drop pooled connections so every measurement starts cold
+            sqlite_menu._pools.clear()
+            results[label] = await timed(run(SqliteMenuRepository(path)))
+
+        for label, seconds in results.items():
+            print(f"{skus:>7} skus  {label:<20} {seconds * 1e3:10.1f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+    for skus in args.skus:
+        await bench(skus)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+"""
+Build time and lookup latency of the `search_menu` inverted index on a
+synthetic menu with mixed English and Arabic text.
+
+    python benchmarks/bench_menu_search.py --items 50000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_fixtures import ARABIC_WORDS, WORDS, synthetic_menu
+from menu_search import MenuSearchIndex
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    menu = synthetic_menu(args.items, sizes=(None,), rng=rng)
+
+    start = time.perf_counter()
+    index = MenuSearchIndex(menu)
+    print(f"index build: {(time.perf_counter() - start) * 1e3:.0f} ms for {args.items} items")
+
+    queries = [
+        " ".join(rng.sample(WORDS + ARABIC_WORDS, rng.randint(1, 3))) for _ in range(args.queries)
+    ]
+    queries += [f"{rng.choice(WORDS)[:4]} {rng.randrange(args.items)}" for _ in range(args.queries)]
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k=5)
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"search: p50 {p50 * 1e6:.0f} us, p99 {p99 * 1e6:.0f} us, max {latencies[-1] * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Memory and construction time of the menu as `MenuItem` objects (what
+`FakeDB.list_*` returns) against the columnar `MenuTable`, for the sample
+menu and synthetic menus where every item comes in three sizes.
+
+    python benchmarks/bench_menu_table.py --skus 10000 100000
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import FakeDB, MenuItem, _generate_menu_text, find_items_by_id
+from menu_fixtures import synthetic_menu
+from menu_table import MenuTable
+
+
+def measure(build):
+    # timed without tracemalloc, which slows allocations down several times
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def report(label: str, count: int, size: int, elapsed: float) -> None:
+    print(
+        f"  {label:<28} {size / 2**20:8.2f} MB  {size / count:7.0f} B/item"
+        f"  {elapsed * 1e3:9.1f} ms  {elapsed * 1e6 / count:6.2f} us/item"
+    )
+
+
+def compare(label: str, rows: list[dict]) -> None:
+    print(f"{label}: {len(rows)} items")
+    items, size, elapsed = measure(lambda: [MenuItem(**row) for row in rows])
+    report("MenuItem list", len(rows), size, elapsed)
+    table, size, elapsed = measure(lambda: _table_from_rows(rows))
+    report("MenuTable", len(rows), size, elapsed)
+    _, _, elapsed = measure(lambda: MenuTable.from_items(items))
+    print(f"  {'MenuTable.from_items':<28} {'':>19}  {elapsed * 1e3:9.1f} ms")
+
+    assert list(table) == items
+    assert _generate_menu_text("Menu", list(table)) == _generate_menu_text("Menu", items)
+    item_id = items[len(items) // 2].id
+    assert find_items_by_id(list(table), item_id) == find_items_by_id(items, item_id)
+
+    for name, sample in (("MenuItem", items[0]), ("MenuRow", table[0])):
+        per_read = timeit.timeit(lambda: (sample.id, sample.price, sample.size), number=100_000) * 10
+        print(f"  {name + ' id, price, size':<28} {per_read:.3f} us")
+
+
+def _table_from_rows(rows: list[dict]) -> MenuTable:
+    table = MenuTable()
+    for row in rows:
+        table.append(**row)
+    return table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    sample = asyncio.run(FakeDB().list_all())
+    compare("sample menu (FakeDB)", [item.model_dump() for item in sample])
+    for skus in args.skus:
+        compare("synthetic menu", [item.model_dump() for item in synthetic_menu(skus)])
+
+
+if __name__ == "__main__":
+    main()
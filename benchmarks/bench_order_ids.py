@@ -0,0 +1,57 @@
+"""
+Order id throughput: the old per-character `secrets.choice` ids against the
+timestamp/worker/counter generator, one at a time and in bulk, plus a
+uniqueness check over every generated id.
+
+    python benchmarks/bench_order_ids.py --count 1000000
+"""
+
+import argparse
+import os
+import secrets
+import string
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_ids import IdGenerator
+from recipt_state import order_uid
+
+
+def random_uid() -> str:
+    alphabet = string.ascii_uppercase + string.digits
+    return "O_" + "".join(secrets.choice(alphabet) for _ in range(6))
+
+
+def timed(label: str, count: int, fn) -> list[str]:
+    start = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed * 1e9 / count:8.0f} ns/id  {count / elapsed / 1e6:6.2f} M ids/s")
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+    count = args.count
+
+    old = timed("secrets.choice x6", count, lambda: [random_uid() for _ in range(count)])
+    new = timed("order_uid()", count, lambda: [order_uid() for _ in range(count)])
+
+    generator = IdGenerator(1)
+    bulk = timed(
+        f"next_ids({args.batch})",
+        count,
+        lambda: [id for _ in range(count // args.batch) for id in generator.next_ids(args.batch)],
+    )
+
+    print(f"\nduplicates: secrets {len(old) - len(set(old))}, order_uid {len(new) - len(set(new))}, bulk {len(bulk) - len(set(bulk))}")
+    print(f"monotonic: order_uid {new == sorted(new)}, bulk {bulk == sorted(bulk)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Order journal appends per second, with group commit (records queued and
+fsynced in batches by a background thread) and without it (one fsync per
+append, on the caller's thread).
+
+    python benchmarks/bench_order_journal.py --appends 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_journal import OrderJournal
+
+
+def record(n: int) -> dict:
+    return {"s": f"room_{n % 50}", "op": "add", "id": f"O_{n:06d}", "item": "margherita", "size": "L", "q": 1, "p": 5600}
+
+
+def bench(group_commit: bool, appends: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        journal = OrderJournal(directory, group_commit=group_commit)
+        records = [record(n) for n in range(appends)]
+
+        start = time.perf_counter()
+        for r in records:
+            journal.append(r)
+        caller = time.perf_counter() - start
+        journal.close()
+        durable = time.perf_counter() - start
+
+    label = "group commit" if group_commit else "fsync per append"
+    print(
+        f"{label:<17} {appends / caller:>12,.0f} appends/s on the caller  "
+        f"{appends / durable:>10,.0f} appends/s durable  "
+        f"{caller / appends * 1e6:8.2f} us/append"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--appends", type=int, default=20_000)
+    parser.add_argument("--sync-appends", type=int, default=2_000)
+    args = parser.parse_args()
+
+    bench(group_commit=False, appends=args.sync_appends)
+    bench(group_commit=True, appends=args.appends)
+
+
+if __name__ == "__main__":
+    main()
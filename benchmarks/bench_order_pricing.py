@@ -0,0 +1,59 @@
+"""
+Cost of add/remove with running totals, and of re-reading the receipt after a
+single change, as the order grows to thousands of lines.
+
+    python benchmarks/bench_order_pricing.py --lines 100 1000 10000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recipt_state import OrderState
+
+
+async def bench(lines: int, ops: int, rng: random.Random) -> None:
+    order = OrderState()
+    for n in range(lines):
+        await order.add(f"item_{n}", "M", unit_price_fils=1_000 + n % 5_000)
+    order.receipt()
+    line_ids = [line.order_id for line in order.lines.values()]
+
+    start = time.perf_counter()
+    for _ in range(ops):
+        order_id = rng.choice(line_ids)
+        await order.increment(order_id)
+        await order.decrement(order_id)
+        order.totals
+    update = (time.perf_counter() - start) / (2 * ops)
+
+    start = time.perf_counter()
+    for _ in range(100):
+        await order.increment(rng.choice(line_ids))
+        order.receipt()
+    receipt = (time.perf_counter() - start) / 100
+
+    print(
+        f"{lines:>7} lines  add/remove + totals {update * 1e6:6.2f} us/op  "
+        f"receipt after one change {receipt * 1e3:7.3f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--ops", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    for lines in args.lines:
+        await bench(lines, args.ops, rng)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Order submission pipeline at a fixed offered load (default 1k orders/s) into
+the file spool, SQLite and a local HTTP stand-in. Reports delivered
+throughput, submit-to-delivery latency and the worst event loop stall seen
+by a ticker task while the sink was busy.
+
+    python benchmarks/bench_order_submission.py --rate 1000 --seconds 3
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+
+from order_submission import FileSpoolSink, HttpSink, OrderSubmitter, SqliteSink, SubmittedOrder
+from recipt_state import OrderState
+
+
+class TimedSink:
+    def __init__(self, sink) -> None:
+        self.sink = sink
+        self.latencies: list[float] = []
+
+    async def submit(self, orders: list[SubmittedOrder]) -> None:
+        await self.sink.submit(orders)
+        now = time.time()
+        self.latencies += [now - order.submitted_at for order in orders]
+
+
+async def loop_lag(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - start - 0.001)
+    return worst
+
+
+async def sample_order(n: int) -> SubmittedOrder:
+    order = OrderState(session_id=f"room_{n % 64}")
+    await order.add("margherita", "L", quantity=2, unit_price_fils=5600)
+    await order.add("pepsi", "Can", unit_price_fils=500)
+    return SubmittedOrder.from_order(order)
+
+
+async def bench(label: str, sink, rate: int, seconds: float) -> None:
+    timed = TimedSink(sink)
+    submitter = OrderSubmitter(timed)
+    submitter.start()
+    orders = [await sample_order(n) for n in range(int(rate * seconds))]
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(loop_lag(stop))
+    start = time.perf_counter()
+    for n, order in enumerate(orders):
+        # pace the offered load
+        delay = start + n / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await submitter.submit(
+            SubmittedOrder(**{**order.__dict__, "submitted_at": time.time()})
+        )
+    await submitter.drain()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_lag = await lag
+    await submitter.aclose()
+    if isinstance(sink, HttpSink):
+        await sink.aclose()
+
+    latencies = sorted(timed.latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(
+        f"{label:<7} {len(latencies) / elapsed:>8,.0f} orders/s delivered  "
+        f"latency p50 {p50 * 1e3:6.1f} ms p99 {p99 * 1e3:6.1f} ms  "
+        f"worst loop stall {worst_lag * 1e3:5.1f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=int, default=1_000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    received = set()
+
+    async def handle(request: web.Request) -> web.Response:
+        body = await request.json()
+        received.update(order["idempotency_key"] for order in body["orders"])
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_post("/orders", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await bench("spool", FileSpoolSink(os.path.join(tmp, "orders.jsonl")), args.rate, args.seconds)
+        await bench("sqlite", SqliteSink(os.path.join(tmp, "orders.db")), args.rate, args.seconds)
+        await bench("http", HttpSink(f"http://127.0.0.1:{port}/orders"), args.rate, args.seconds)
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
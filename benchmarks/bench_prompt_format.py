@@ -0,0 +1,54 @@
+"""
+Rendered size and render time of the "yaml" and "compact" menu prompt formats,
+on the sample menu and on a synthetic one.
+
+    python benchmarks/bench_prompt_format.py --items 5000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import MENU_CATEGORIES, build_catalog
+from database import FakeDB, MenuItem, menu_instructions
+from menu_fixtures import synthetic_menu
+from menu_prompt import BYTES_PER_TOKEN
+
+
+def report(label: str, menu: dict[str, list[MenuItem]]) -> None:
+    for prompt_format in ("yaml", "compact"):
+        def render() -> str:
+            return "\n\n".join(
+                menu_instructions(category, items=menu[category], prompt_format=prompt_format)
+                for category in MENU_CATEGORIES
+            )
+
+        size = len(render().encode())
+        seconds = min(timeit.repeat(render, number=1, repeat=5))
+        print(
+            f"{label:<16} {prompt_format:<8} {size:>10} bytes  ~{size // BYTES_PER_TOKEN:>8} tokens"
+            f"  {seconds * 1e3:8.2f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=5_000)
+    args = parser.parse_args()
+
+    sample = asyncio.run(build_catalog(FakeDB()))
+    report("sample menu", {c: list(sample.items(c)) for c in MENU_CATEGORIES})
+    # half the items in three sizes, half without sizes
+    items = [
+        *synthetic_menu(args.items // 2 * 3, id_prefix="sized"),
+        *synthetic_menu(args.items // 2, sizes=(None,), id_prefix="single"),
+    ]
+    report(f"{args.items} items", {c: [item for item in items if item.category == c] for c in MENU_CATEGORIES})
+
+
+if __name__ == "__main__":
+    main()
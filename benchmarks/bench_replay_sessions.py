@@ -0,0 +1,179 @@
+"""
+Load test of one worker process: N concurrent `AgentSession`s running
+`DriveThruAgent` against the replay realtime model, which plays a scripted
+drive-thru transcript. The tool calls, the order state and livekit's own
+session machinery run for real; only the model is replaced (`--rtt-ms` adds
+its latency to every response). Sessions run without a room, so the media
+pipeline isn't part of the cost, only the agent, tool and order paths.
+
+Reports the CPU time per session, how many calls one core could carry at
+that cost (`--call-seconds` being the length of a real call), the tool call
+and turn latencies, and the memory held per live session.
+
+    python benchmarks/bench_replay_sessions.py --sessions 200 --rtt-ms 300
+    python benchmarks/bench_replay_sessions.py --script transcript.json
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import resource
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import AgentSession
+
+from cashier import DriveThruAgent, new_userdata
+from catalog import get_catalog
+from latency import LatencyHistogram, SessionLatency
+from replay_model import ReplayCall, ReplayRealtimeModel, ReplayScript, ReplayTurn, load_script
+
+TRANSCRIPT = (
+    ReplayTurn(
+        user="two large margheritas, a pepsi can and marinara sauce",
+        calls=(
+            ReplayCall(
+                "order_items",
+                {
+                    "items": [
+                        {"item_id": "margherita", "size": "L", "quantity": 2},
+                        {"item_id": "pepsi", "size": "Can"},
+                        {"item_id": "marinara_sauce"},
+                    ]
+                },
+            ),
+        ),
+        reply="Two large Margheritas, a Pepsi can and marinara sauce. Anything else?",
+    ),
+    ReplayTurn(
+        user="and eight chicken wings with bbq sauce",
+        calls=(
+            ReplayCall(
+                "order_regular_item",
+                {"item_id": "chicken_wings", "size": "8 Pieces", "modifiers": ["bbq"]},
+            ),
+        ),
+        reply="Eight BBQ chicken wings, added.",
+    ),
+    ReplayTurn(
+        user="actually no pepsi",
+        calls=(ReplayCall("list_order_items", {}),),
+        reply="Let me check your order.",
+    ),
+    ReplayTurn(user="what's on the menu for dessert", reply="We have chocolate lava cake and cinnamon rolls."),
+    ReplayTurn(
+        user="how much is it",
+        calls=(ReplayCall("get_order_total", {}),),
+        reply="That's AED 150 in total.",
+    ),
+    ReplayTurn(
+        user="that's all",
+        calls=(ReplayCall("submit_order", {}),),
+        reply="Your order was sent, please drive to the window.",
+    ),
+)
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run(args, script: ReplayScript) -> None:
+    catalog = await get_catalog()
+    model = ReplayRealtimeModel(script)
+    histograms: dict[tuple[str, str], LatencyHistogram] = {}
+
+    # one warm-up session, so imports and lazy caches don't count as per-session memory
+    sessions = []
+    for n in range(args.sessions + 1):
+        userdata = new_userdata(catalog)
+        userdata.latency = SessionLatency(f"replay-{n}", histograms)
+        sessions.append((AgentSession(userdata=userdata, llm=model), userdata))
+
+    async def start(session, userdata) -> None:
+        await session.start(agent=DriveThruAgent(userdata=userdata))
+
+    submitted = 0
+
+    async def converse(session, userdata) -> None:
+        nonlocal submitted
+        for turn in script.turns:
+            start = time.perf_counter()
+            result = await session.run(user_input=turn.user)
+            userdata.latency.record("turn", "", time.perf_counter() - start)
+            # the orders the submit_order tool accepted
+            submitted += sum(
+                1
+                for event in result.events
+                if event.type == "function_call_output"
+                and event.item.name == "submit_order"
+                and not event.item.is_error
+            )
+
+    warm_session, warm_userdata = sessions.pop()
+    await start(warm_session, warm_userdata)
+    await converse(warm_session, warm_userdata)
+    await warm_session.aclose()
+    histograms.clear()
+    submitted = 0
+
+    gc.collect()
+    rss_before = rss_mb()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+
+    await asyncio.gather(*(start(session, userdata) for session, userdata in sessions))
+    rss_started = rss_mb()
+    await asyncio.gather(*(converse(session, userdata) for session, userdata in sessions))
+    rss_done = rss_mb()
+
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    await asyncio.gather(*(session.aclose() for session, _ in sessions))
+
+    cpu_per_session = cpu / args.sessions
+    print(
+        f"{args.sessions} sessions x {len(script.turns)} turns, {args.rtt_ms:.0f} ms per model response:"
+        f" {wall:.2f} s wall, {cpu:.2f} s CPU, {submitted} orders submitted"
+    )
+    print(
+        f"CPU per session: {cpu_per_session * 1e3:.1f} ms"
+        f" -> ~{args.call_seconds / cpu_per_session:.0f} concurrent {args.call_seconds:.0f}s calls per core"
+    )
+    print(
+        f"memory per live session: {(rss_started - rss_before) * 1024 / args.sessions:.1f} KB started,"
+        f" {(rss_done - rss_before) * 1024 / args.sessions:.1f} KB after the conversation"
+        f" (RSS {rss_before:.0f} -> {rss_done:.0f} MB)"
+    )
+    for (metric, label), histogram in sorted(histograms.items()):
+        name = f"{metric}[{label}]" if label else metric
+        print(
+            f"  {name:<32} n={histogram.count:<6} p50={histogram.quantile(0.5) * 1e3:7.2f} ms"
+            f"  p99={histogram.quantile(0.99) * 1e3:7.2f} ms  max={histogram.max_us / 1e3:7.2f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    parser.add_argument("--call-seconds", type=float, default=120.0)
+    parser.add_argument("--script", help="transcript JSON, see replay_model.load_script")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    script = load_script(args.script) if args.script else ReplayScript(turns=TRANSCRIPT)
+    if args.script:
+        args.rtt_ms = args.rtt_ms or script.response_delay * 1000
+    script = ReplayScript(turns=script.turns, response_delay=args.rtt_ms / 1000)
+    asyncio.run(run(args, script))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Memory of serving many stores from one worker: a full catalog per store,
+against store overlays on the shared base catalog (all stores materialized,
+and with the default LRU of derived catalogs). Every store changes a few
+prices and availability flags.
+
+    python benchmarks/bench_stores.py --stores 500 --prices 5 --unavailable 2
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import build_catalog
+from database import FakeDB
+from stores import StoreCatalogs, StoreOverlay
+
+
+class ListRepository:
+    def __init__(self, items) -> None:
+        self.items = items
+
+    async def list_all(self):
+        return self.items
+
+
+def random_overlays(base, stores: int, prices: int, unavailable: int, rng: random.Random):
+    overlays = {}
+    for n in range(stores):
+        store_id = f"store-{n:04d}"
+        priced = rng.sample(base.all_items, prices)
+        overlays[store_id] = StoreOverlay(
+            store_id=store_id,
+            prices={(item.id, item.size): round(item.price * rng.uniform(0.9, 1.2), 2) for item in priced},
+            unavailable=frozenset((item.id, item.size) for item in rng.sample(base.all_items, unavailable)),
+        )
+    return overlays
+
+
+def measure(label: str, stores: int, build) -> object:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<28} {size / 2**20:8.2f} MB  {size / stores / 1024:7.1f} KB/store"
+        f"  {elapsed * 1e3 / stores:7.3f} ms/store"
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, default=500)
+    parser.add_argument("--prices", type=int, default=5)
+    parser.add_argument("--unavailable", type=int, default=2)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    base = asyncio.run(build_catalog(FakeDB()))
+    overlays = random_overlays(base, args.stores, args.prices, args.unavailable, random.Random(7))
+    print(f"{args.stores} stores, {len(base.all_items)} menu items, {args.prices} prices and {args.unavailable} unavailable items changed per store")
+
+    def full_copies():
+        catalogs = []
+        for overlay in overlays.values():
+            changes = overlay.changes(base)
+            items = [changes.get((item.id, item.size), item).model_copy() for item in base.all_items]
+            catalogs.append(asyncio.run(build_catalog(ListRepository(items))))
+        return catalogs
+
+    def materialize(max_cached: int):
+        stores = StoreCatalogs(base, overlays, max_cached=max_cached)
+        for store_id in overlays:
+            stores.get(store_id)
+        return stores
+
+    full = measure("full catalog per store", args.stores, full_copies)
+    del full
+    measure("overlays only", args.stores, lambda: random_overlays(base, args.stores, args.prices, args.unavailable, random.Random(7)))
+    stores = measure("overlays, all materialized", args.stores, lambda: materialize(args.stores))
+    measure("overlays, LRU of 64", args.stores, lambda: materialize(64))
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        stores.get("store-0042")
+    print(f"cached store lookup: {(time.perf_counter() - start) * 1e9 / 100_000:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Build time of the suggestion tables over synthetic order history (10M
+order lines by default), the cost of reading lines from a CSV export, the
+size of the tables, and the latency of `suggest` / `alternatives` as the
+`suggest_items` tool calls them.
+
+    python benchmarks/bench_suggestions.py --lines 10000000 --items 0 2000 20000 100000
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import resource
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import MENU_CATEGORIES, build_catalog
+from database import FakeDB
+from suggestions import build_tables, csv_lines, encode_lines, load_tables, write_tables
+
+
+def menu(items: int) -> tuple[list[str], list[str]]:
+    """Item ids and categories, of the sample menu when `items` is 0."""
+    if not items:
+        catalog = asyncio.run(build_catalog(FakeDB()))
+        category_of = {item.id: item.category for item in catalog.all_items}
+        return list(category_of), list(category_of.values())
+    return [f"item_{n}" for n in range(items)], [MENU_CATEGORIES[n % len(MENU_CATEGORIES)] for n in range(items)]
+
+
+def synthetic_history(lines: int, n: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """Orders of 1 to 7 lines, popular items more likely, and some items usually ordered with a partner."""
+    sizes = rng.integers(1, 8, size=lines // 2)
+    sizes = sizes[: np.searchsorted(np.cumsum(sizes), lines) + 1]
+    orders = np.repeat(np.arange(len(sizes)), sizes)[:lines]
+    popularity = 1 / np.arange(1, n + 1) ** 0.8
+    items = rng.choice(n, size=len(orders), p=popularity / popularity.sum())
+    partner = rng.permutation(n)
+    follows = np.r_[False, orders[1:] == orders[:-1]] & (rng.random(len(orders)) < 0.4)
+    items[follows] = partner[items[np.flatnonzero(follows) - 1]]
+    return orders, items
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=10_000_000)
+    parser.add_argument("--items", type=int, nargs="+", default=[0, 2000, 20000, 100000], help="0 is the sample menu")
+    parser.add_argument("--csv-lines", type=int, default=1_000_000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(7)
+
+    for items in args.items:
+        item_ids, categories = menu(items)
+        orders, lines = synthetic_history(args.lines, len(item_ids), rng)
+        print(f"{len(lines)} order lines, {orders[-1] + 1} orders, {len(item_ids)} items")
+
+        start = time.perf_counter()
+        tables = build_tables(orders, lines, item_ids, categories)
+        build = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "suggestions.bin")
+            write_tables(tables, path)
+            file_size = os.path.getsize(path)
+            start = time.perf_counter()
+            load_tables(path)
+            load = time.perf_counter() - start
+        print(
+            f"  build {build:6.2f} s ({build * 1e9 / len(lines):.0f} ns/line), load {load * 1e3:.1f} ms,"
+            f" file {file_size / 1024:.0f} KB: {len(tables.complements.indices)} complements,"
+            f" {len(tables.substitutes.indices)} substitutes, peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+        )
+
+        for size in (1, 3, 6):
+            order = [item_ids[i] for i in rng.choice(min(len(item_ids), 50), size=size, replace=False)]
+            per_call = timeit.timeit(lambda: tables.suggest(order), number=20_000) / 20_000
+            print(f"  suggest for {size} items  {per_call * 1e6:6.1f} us")
+        per_call = timeit.timeit(lambda: tables.alternatives(item_ids[1]), number=20_000) / 20_000
+        print(f"  alternatives           {per_call * 1e6:6.1f} us")
+
+    # reading lines from a CSV export, the step before the build
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "orders.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["order_id", "item_id", "quantity"])
+            writer.writerows(
+                (f"o{order}", item_ids[item], 1)
+                for order, item in zip(orders[: args.csv_lines].tolist(), lines[: args.csv_lines].tolist())
+            )
+        start = time.perf_counter()
+        encoded, _ = encode_lines(csv_lines(path), item_ids)
+        parse = time.perf_counter() - start
+        print(f"CSV: {len(encoded)} lines read in {parse:.2f} s ({parse * 1e9 / len(encoded):.0f} ns/line)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Synthetic menus shared by the benchmarks."""
+
+import os
+import random
+import sys
+from typing import Sequence
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import MENU_CATEGORIES
+from database import MenuItem
+
+WORDS = (
+    "chicken beef pepperoni mozzarella onion pepper jalapeno mushroom olive "
+    "pineapple tikka ranch bbq garlic cheesy spicy classic supreme veggie"
+).split()
+ARABIC_WORDS = "دجاج لحم بيتزا جبنة فلفل بصل زيتون حار".split()
+
+
+def synthetic_menu(
+    skus: int,
+    *,
+    sizes: Sequence[str | None] = ("S", "M", "L"),
+    rng: random.Random | None = None,
+    id_prefix: str = "item",
+) -> list[MenuItem]:
+    """
+    `skus` menu items, one per size of each item id, spread over every
+    category; every 50th item is sold out. With `rng`, names, aliases and
+    ingredients are drawn from food words, as a search index sees them on a
+    real menu, otherwise they follow the item's number.
+    """
+    menu = []
+    for n in range(skus // len(sizes)):
+        if rng is not None:
+            name_words = rng.sample(WORDS, 2)
+            item_id = f"{'_'.join(name_words)}_{n}"
+            name = " ".join(name_words).title() + f" {n}"
+            voice_alias = " ".join(rng.sample(ARABIC_WORDS, 2))
+            ingredients = ", ".join(rng.sample(WORDS, 5)) + " & Signature Pizza Sauce."
+        else:
+            item_id = f"{id_prefix}_{n}"
+            name = f"Item {n}"
+            voice_alias = f"صنف {n}"
+            ingredients = f"Signature Pizza Sauce, Mozzarella Cheese and topping {n // 10}."
+        for i, size in enumerate(sizes):
+            menu.append(
+                MenuItem(
+                    id=item_id,
+                    name=name,
+                    ingredients=ingredients,
+                    voice_alias=voice_alias,
+                    price=10 + n % 40 + 4 * i,
+                    size=size,
+                    available=n % 50 != 49,
+                    category=MENU_CATEGORIES[n % len(MENU_CATEGORIES)],
+                )
+            )
+    return menu
@@ -3,19 +3,39 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from dataclasses import dataclass
+import asyncio
+import logging
+import subprocess
+from dataclasses import dataclass, field
 from typing import Annotated
 
-from database import (
-    COMMON_INSTRUCTIONS,
-    FakeDB,
-    MenuItem,
-    find_items_by_id,
-    menu_instructions,
+from audio_assets import AmbientTrack, get_ambient_track
+from availability import (
+    AvailabilityOverlay,
+    availability_delta,
+    get_availability,
+    load_availability_file,
 )
+from catalog import MenuCatalog
+from database import COMPACT_MENU_COLUMNS, MenuItem, compact_item_line
+from deals import get_deal_engine
 from dotenv import load_dotenv
-from recipt_state import OrderedRegular, OrderState
-from pydantic import Field
+from latency import (
+    LatencyCollector,
+    SessionLatency,
+    clear_snapshots,
+    get_worker_latency,
+)
+from modifiers import ChosenModifiers, choose_modifiers
+from order_journal import get_journal, recover_order
+from order_submission import SubmittedOrder, get_submitter
+from pricing import format_aed, to_fils
+from recipt_state import UNIT_SEPARATOR, OrderState
+from startup import StartupTrace
+from stores import StoreCatalogs, get_stores, store_for_job
+from suggestions import get_suggestions
+from tool_schemas import compile_tool
+from pydantic import BaseModel, Field
 
 from livekit.agents import (
     Agent,
@@ -24,219 +44,589 @@ from livekit.agents import (
     BackgroundAudioPlayer,
     FunctionTool,
     JobContext,
+    JobProcess,
     RunContext,
     ToolError,
     WorkerOptions,
     cli,
     function_tool,
+    llm,
     # RoomInputOptions,
 )
+from livekit.agents.llm import RawFunctionTool
 from livekit.plugins import  openai
+from prometheus_client import REGISTRY
 from openai.types.beta.realtime.session import TurnDetection
 
 load_dotenv()
 
+logger = logging.getLogger("cashier")
+
 
 @dataclass
 class Userdata:
-    #["drink", "pizza", "sauce", "chicken", "side", "dessert"]
     order: OrderState
-    drink_items: list[MenuItem]
-    pizza_items: list[MenuItem]
-    sauce_items: list[MenuItem]
-    dessert_items: list[MenuItem]
-    side_items: list[MenuItem]
-    chicken_items: list[MenuItem]
+    # shared by every session on this worker, never mutated
+    catalog: MenuCatalog
+    # shared as well, updated in place when items run out mid-shift
+    availability: AvailabilityOverlay
+    latency: SessionLatency | None = None
+    # deliveries of the orders this session submitted
+    submitted: list[asyncio.Future[bool]] = field(default_factory=list)
+
+
+MODIFIERS_DESCRIPTION = (
+    "Option ids for the item from its options (e.g. its sauce, 'extra_cheese', 'no_onions'). "
+    "Required options must be included, empty if the item has none."
+)
+
+
+class OrderItemRequest(BaseModel):
+    item_id: str = Field(description="The ID of the item the user requested, as listed in the menu.")
+    size: str | None = Field(
+        default=None,
+        description="Size of the item, if applicable (e.g., 'S', 'Can', '8 Pieces'). Should be null if not specified or not applicable.",
+    )
+    quantity: int = Field(default=1, ge=1, le=50, description="How many of this item.")
+    modifiers: list[str] = Field(
+        default_factory=list,
+        description=MODIFIERS_DESCRIPTION,
+    )
+
+
+def validate_order_item(
+    userdata: Userdata, item_id: str, size: str | None, modifiers: list[str] | None = None
+) -> tuple[MenuItem, str | None, ChosenModifiers]:
+    """
+    Checks an item requested by the model against the menu and returns the
+    matching menu item, the size and the options to order, raises a
+    `ToolError` the model can act on otherwise.
+    """
+    catalog = userdata.catalog
+    size_map = catalog.items_by_id.get(item_id)
+    if size_map is None:
+        resolved_id, candidates = catalog.resolver.resolve(item_id)
+        if resolved_id is None:
+            if candidates:
+                raise ToolError(
+                    f"error: {item_id} was not found. Closest items: "
+                    f"{', '.join(c.item_id for c in candidates)}."
+                )
+            raise ToolError(f"error: {item_id} was not found.")
 
+        item_id = resolved_id
+        size_map = catalog.items_by_id[item_id]
 
+    if size == "null":
+        size = None
+
+    available_sizes = catalog.sizes_by_id[item_id]
+    if size is None and len(available_sizes) > 1:
+        raise ToolError(
+            f"error: {item_id} comes with multiple sizes: {', '.join(available_sizes)}. "
+            "Please clarify which size should be selected."
+        )
+
+    if size is not None and not available_sizes:
+        size = None
+        # raise ToolError(
+        #     f"error: size should not be specified for item {item_id} as it does not support sizing options."
+        # )
+
+    if (size and available_sizes) and size not in size_map:
+        raise ToolError(
+            f"error: unknown size {size} for {item_id}. Available sizes: {', '.join(available_sizes)}."
+        )
+
+    menu_item = size_map[size or (available_sizes[0] if available_sizes else None)]
+    if not menu_item.available or not userdata.availability.is_available(
+        item_id, menu_item.size
+    ):
+        raise ToolError(f"error: {item_id} is currently unavailable.")
+
+    try:
+        chosen = choose_modifiers(catalog.modifiers.get(item_id), modifiers)
+    except ValueError as e:
+        raise ToolError(f"error: invalid options for {item_id}: {e}.")
+
+    # single-size items ordered without one get their only size, so they
+    # land on the same line (and match the same deals) either way
+    return menu_item, menu_item.size, chosen
 
 
 class DriveThruAgent(Agent):
     def __init__(self, *, userdata: Userdata) -> None:
-        instructions = (
-            COMMON_INSTRUCTIONS
-            + "\n\n"
-            + menu_instructions("drink", items=userdata.drink_items)
-            + "\n\n"
-            + menu_instructions("pizza", items=userdata.pizza_items)
-            + "\n\n"
-            + menu_instructions("sauce", items=userdata.sauce_items)
-            + "\n\n"
-            + menu_instructions("desserts", items=userdata.dessert_items)
-            + "\n\n"
-            + menu_instructions("sides", items=userdata.side_items)
-            + "\n\n"
-            + menu_instructions("chicken", items=userdata.chicken_items)
-            + "\n\n"
+        instructions = userdata.catalog.instructions
+        if userdata.availability.unavailable:
+            instructions += availability_delta(
+                userdata.catalog, userdata.availability.unavailable
+            )
+        if userdata.order.deals is not None:
+            instructions += (
+                "\n\n# Deals\nApplied automatically to the matching items of the order, "
+                "`get_order_total` shows them. Suggest a deal when the customer is close to one:\n"
+                + "\n".join(deal.describe() for deal in userdata.order.deals.engine.deals)
+            )
+        if userdata.order.lines:
+            instructions += "\n\n# The call was reconnected, the order so far:\n" + "\n".join(
+                line.describe() for line in userdata.order.lines.values()
+            )
+        logger.debug(
+            "agent instructions for menu %s: %d bytes", userdata.catalog.version, len(instructions)
         )
-        print(instructions)
+
+        self._availability = userdata.availability
+        self._catalog = userdata.catalog
+        self._unsubscribe_availability = None
+        # the event loop only keeps weak references to tasks
+        self._push_tasks: set[asyncio.Task[None]] = set()
 
         super().__init__(
             instructions=instructions,
-            tools=[
-                self.build_regular_order_tool(
-                    userdata.pizza_items, 
-                    userdata.drink_items, 
-                    userdata.sauce_items,
-                    userdata.chicken_items,
-                    userdata.side_items, 
-                    userdata.dessert_items,
-                ),
-            ],
+            tools=list(catalog_tools(userdata.catalog)),
         )
 
-    def build_regular_order_tool(
-        self,
-        pizza_items: list[MenuItem],
-        drink_items: list[MenuItem],
-        sauce_items: list[MenuItem],
-        chicken_items: list[MenuItem],
-        side_items: list[MenuItem],
-        dessert_items: list[MenuItem],
-    ) -> FunctionTool:
-        all_items = pizza_items + drink_items + sauce_items + chicken_items + side_items + dessert_items
-        available_ids = {item.id for item in all_items}
-
-        @function_tool
-        async def order_regular_item(
-            ctx: RunContext[Userdata],
-            item_id: Annotated[
-                str,
-                Field(
-                    description="The ID of the item the user requested.",
-                    json_schema_extra={"enum": list(available_ids)},
-                ),
-            ],
-            size: Annotated[
-                str | None, # Use a flexible string type
-                Field(description="Size of the item, if applicable (e.g., 'S', 'Can', '8 Pieces'). Should be null if not specified or not applicable."),
-            ] = None, 
-        ) -> str:
-            """
-            Call this when the user orders **a single item on its own**
-
-            The customer must provide clear and specific input. For example, item variants such as flavor must **always** be explicitly stated.
-
-            The user might say—for example:
-            - “Just the cheeseburger, no meal”
-            - “A medium Coke”
-            - “Can I get some ketchup?”
-            - “Can I get a McFlurry Oreo?”
-            """
-            item_sizes = find_items_by_id(all_items, item_id)
-            if not item_sizes:
-                raise ToolError(f"error: {item_id} was not found.")
-
-            if size == "null":
-                size = None
-
-            available_sizes = list({item.size for item in item_sizes if item.size})
-            if size is None and len(available_sizes) > 1:
-                raise ToolError(
-                    f"error: {item_id} comes with multiple sizes: {', '.join(available_sizes)}. "
-                    "Please clarify which size should be selected."
-                )
+    async def on_enter(self) -> None:
+        self._unsubscribe_availability = self._availability.subscribe(
+            self._on_availability_changed
+        )
 
-            if size is not None and not available_sizes:
-                size = None
-                # raise ToolError(
-                #     f"error: size should not be specified for item {item_id} as it does not support sizing options."
-                # )
+    async def on_exit(self) -> None:
+        if self._unsubscribe_availability:
+            self._unsubscribe_availability()
+            self._unsubscribe_availability = None
+
+    def _on_availability_changed(self, sold_out, back_in_stock) -> None:
+        # only the changed items are appended to the conversation, the menu
+        # itself is never re-rendered nor re-sent to the realtime model
+        delta = availability_delta(self._catalog, sold_out, back_in_stock)
+        task = asyncio.create_task(self._push_instructions_delta(delta))
+        self._push_tasks.add(task)
+        task.add_done_callback(self._push_done)
+
+    def _push_done(self, task: asyncio.Task[None]) -> None:
+        self._push_tasks.discard(task)
+        if not task.cancelled() and (error := task.exception()) is not None:
+            logger.error("failed to push the availability change", exc_info=error)
+
+    async def _push_instructions_delta(self, delta: str) -> None:
+        chat_ctx = self.chat_ctx.copy()
+        chat_ctx.add_message(role="system", content=delta)
+        await self.update_chat_ctx(chat_ctx)
 
-            if (size and available_sizes) and size not in available_sizes:
-                raise ToolError(
-                    f"error: unknown size {size} for {item_id}. Available sizes: {', '.join(available_sizes)}."
-                )
 
-            item = OrderedRegular(item_id=item_id, size=size)
-            await ctx.userdata.order.add(item)
-            return f"The item was added: {item.model_dump_json()}"
+def build_search_menu_tool() -> FunctionTool:
+    @function_tool
+    async def search_menu(
+        ctx: RunContext[Userdata],
+        query: Annotated[
+            str,
+            Field(
+                description="What the customer asked for, in their own words, Arabic or English (e.g. 'pepperoni pizza', 'بيبسي')."
+            ),
+        ],
+    ) -> str:
+        """
+        Looks up menu items by name, ingredients or id, and returns the best matches with their ids, sizes, prices and options.
 
-        return order_regular_item
+        Call this before describing an item or adding it to the order, and whenever the customer asks what is on the menu.
+        """
+        # the session's catalog, prices differ between stores
+        catalog = ctx.userdata.catalog
+        item_ids = catalog.search_index.search(query, k=5)
+        if not item_ids:
+            return "No matching items on the menu."
+
+        availability = ctx.userdata.availability
+        rows = []
+        for item_id in item_ids:
+            row = compact_item_line(
+                catalog.items_by_id[item_id],
+                lambda item: item.available and availability.is_available(item.id, item.size),
+            )
+            if item_modifiers := catalog.modifiers.get(item_id):
+                row += f" | options: {item_modifiers.describe()}"
+            rows.append(row)
+        return f"{COMPACT_MENU_COLUMNS}\n" + "\n".join(rows)
+
+    return search_menu
+
+def build_regular_order_tool(catalog: MenuCatalog) -> FunctionTool:
+    # in retrieval mode the ids come from `search_menu`, listing them all
+    # in the schema would put the whole menu back into the prompt
+    available_ids = catalog.item_ids if catalog.context_mode == "full" else None
 
     @function_tool
-    async def remove_order_item(
-        self,
+    async def order_regular_item(
         ctx: RunContext[Userdata],
-        order_id: Annotated[
-            list[str],
+        item_id: Annotated[
+            str,
             Field(
-                description="A list of internal `order_id`s of the items to remove. Use `list_order_items` to look it up if needed."
+                description="The ID of the item the user requested.",
+                json_schema_extra={"enum": sorted(available_ids)} if available_ids else None,
             ),
         ],
+        size: Annotated[
+            str | None, # Use a flexible string type
+            Field(description="Size of the item, if applicable (e.g., 'S', 'Can', '8 Pieces'). Should be null if not specified or not applicable."),
+        ] = None, 
+        modifiers: Annotated[
+            list[str] | None,
+            Field(description=MODIFIERS_DESCRIPTION),
+        ] = None,
     ) -> str:
         """
-        Removes one or more items from the user's order using their `order_id`s.
+        Call this when the user orders **a single item on its own**
 
-        Useful when the user asks to cancel or delete existing items (e.g., “Remove the cheeseburger”).
+        The customer must provide clear and specific input. For example, item variants such as flavor must **always** be explicitly stated.
 
-        If the `order_id`s are unknown, call `list_order_items` first to retrieve them.
+        The user might say—for example:
+        - “Just the cheeseburger, no meal”
+        - “A medium Coke”
+        - “Can I get some ketchup?”
+        - “Can I get a McFlurry Oreo?”
+        - “8 wings with BBQ sauce”, “a medium margherita, extra cheese and no onions” (pass the options in `modifiers`)
         """
-        not_found = [oid for oid in order_id if oid not in ctx.userdata.order.items]
-        if not_found:
-            raise ToolError(f"error: no item(s) found with order_id(s): {', '.join(not_found)}")
+        requested_id = item_id
+        menu_item, size, chosen = validate_order_item(ctx.userdata, item_id, size, modifiers)
+
+        line = await ctx.userdata.order.add(
+            menu_item.id,
+            size,
+            unit_price_fils=to_fils(menu_item.price) + chosen.price_fils,
+            modifiers=chosen.ids,
+            modifier_fils=chosen.price_fils,
+        )
+        if requested_id != menu_item.id:
+            return f"{requested_id} was matched to {menu_item.id}. The item was added: {line.describe()}"
+        return f"The item was added: {line.describe()}"
 
-        removed_items = [await ctx.userdata.order.remove(oid) for oid in order_id]
-        return "Removed items:\n" + "\n".join(item.model_dump_json() for item in removed_items)
+    return order_regular_item
 
+def build_batch_order_tool() -> FunctionTool:
     @function_tool
-    async def list_order_items(self, ctx: RunContext[Userdata]) -> str:
+    async def order_items(
+        ctx: RunContext[Userdata],
+        items: Annotated[
+            list[OrderItemRequest],
+            Field(description="Every item the user asked for in this turn.", min_length=1),
+        ],
+    ) -> str:
         """
-        Retrieves the current list of items in the user's order, including each item's internal `order_id`.
-
-        Helpful when:
-        - An `order_id` is required before modifying or removing an existing item.
-        - Confirming details or contents of the current order.
+        Call this when the user orders **several items at once** (e.g., “two large Margheritas, a Pepsi can and garlic sauce”), instead of calling `order_regular_item` for each one.
 
-        Examples:
-        - User requests modifying an item, but the item's `order_id` is unknown (e.g., "Change the fries from small to large").
-        - User requests removing an item, but the item's `order_id` is unknown (e.g., "Remove the cheeseburger").
-        - User asks about current order details (e.g., "What's in my order so far?").
+        All items are checked first: if any of them is invalid, nothing is added and every problem is reported, so it can be clarified with the customer in one go.
         """
-        items = ctx.userdata.order.items.values()
-        if not items:
-            return "The order is empty"
-
-        return "\n".join(item.model_dump_json() for item in items)
-
-
-async def new_userdata() -> Userdata:
-    fake_db = FakeDB()
-    drink_items = await fake_db.list_drinks()
-    pizza_items = await fake_db.list_pizza()
-    sauce_items = await fake_db.list_sauces()
-    chicken_items = await fake_db.list_chicken()
-    side_items = await fake_db.list_sides()
-    dessert_items = await fake_db.list_desserts()
-
-
-    order_state = OrderState(items={})
-    userdata = Userdata(
-        order=order_state,
-        drink_items=drink_items,
-        pizza_items=pizza_items,
-        sauce_items=sauce_items,
-        chicken_items=chicken_items,
-        side_items=side_items,
-        dessert_items=dessert_items,
+        validated: list[tuple[MenuItem, str | None, int, ChosenModifiers]] = []
+        errors: list[str] = []
+        for request in items:
+            try:
+                menu_item, size, chosen = validate_order_item(
+                    ctx.userdata, request.item_id, request.size, request.modifiers
+                )
+            except ToolError as e:
+                errors.append(e.message)
+                continue
+            validated.append((menu_item, size, request.quantity, chosen))
+
+        if errors:
+            raise ToolError("nothing was added:\n" + "\n".join(errors))
+
+        lines = [
+            await ctx.userdata.order.add(
+                menu_item.id,
+                size,
+                quantity=quantity,
+                unit_price_fils=to_fils(menu_item.price) + chosen.price_fils,
+                modifiers=chosen.ids,
+                modifier_fils=chosen.price_fils,
+            )
+            for menu_item, size, quantity, chosen in validated
+        ]
+        return "The items were added, order lines are now:\n" + "\n".join(
+            line.describe() for line in lines
+        )
+
+    return order_items
+
+@function_tool
+async def remove_order_item(
+    ctx: RunContext[Userdata],
+    order_id: Annotated[
+        list[str],
+        Field(
+            description=f"A list of internal `order_id`s of the items to remove. Use `list_order_items` to look it up if needed. A line `order_id` removes the whole line, `<order_id>{UNIT_SEPARATOR}<n>` removes a single unit of it."
+        ),
+    ],
+) -> str:
+    """
+    Removes one or more items from the user's order using their `order_id`s.
+
+    Useful when the user asks to cancel or delete existing items (e.g., “Remove the cheeseburger”).
+
+    If the `order_id`s are unknown, call `list_order_items` first to retrieve them.
+    """
+    order = ctx.userdata.order
+    not_found = [oid for oid in order_id if order.get(oid) is None]
+    if not_found:
+        raise ToolError(f"error: no item(s) found with order_id(s): {', '.join(not_found)}")
+
+    removed_items = []
+    for oid in order_id:
+        # a unit can already be gone if its whole line was listed too
+        if order.get(oid.partition(UNIT_SEPARATOR)[0]) is not None:
+            removed_items.append(await order.remove(oid))
+    return "Removed items:\n" + "\n".join(item.model_dump_json() for item in removed_items)
+
+@function_tool
+async def list_order_items(ctx: RunContext[Userdata]) -> str:
+    """
+    Retrieves the current list of items in the user's order, one line per item and size with its quantity, including each line's internal `order_id`.
+
+    Helpful when:
+    - An `order_id` is required before modifying or removing an existing item.
+    - Confirming details or contents of the current order.
+
+    Examples:
+    - User requests modifying an item, but the item's `order_id` is unknown (e.g., "Change the fries from small to large").
+    - User requests removing an item, but the item's `order_id` is unknown (e.g., "Remove the cheeseburger").
+    - User asks about current order details (e.g., "What's in my order so far?").
+    """
+    lines = ctx.userdata.order.lines.values()
+    if not lines:
+        return "The order is empty"
+
+    deals = [f"deal {combo.name}: saves {format_aed(combo.savings_fils)}" for combo in ctx.userdata.order.combos()]
+    return "\n".join([*(line.describe() for line in lines), *deals])
+
+
+@function_tool
+async def get_order_total(ctx: RunContext[Userdata]) -> str:
+    """
+    Returns the receipt of the current order: every line with its price, the subtotal, VAT and the total to pay, in AED.
+
+    Always use this instead of adding up prices yourself, e.g. when the user asks how much the order costs or when reading back the order at the end.
+    """
+    if not ctx.userdata.order.lines:
+        return "The order is empty"
+
+    return ctx.userdata.order.receipt()
+
+@function_tool
+async def suggest_items(
+    ctx: RunContext[Userdata],
+    item_id: Annotated[
+        str | None,
+        Field(
+            description="The item the customer asked for that is unavailable or not on the menu, to find the closest alternatives. Null to find items that go well with the current order."
+        ),
+    ] = None,
+) -> str:
+    """
+    Suggests up to 3 in-stock menu items from what past customers ordered: alternatives to an item that is unavailable or not on the menu, or items customers usually add to an order like the current one.
+
+    Call this before suggesting something close to an item you can't add, or when offering the customer something more.
+    """
+    tables = get_suggestions()
+    if tables is None:
+        return "No suggestions available."
+
+    catalog = ctx.userdata.catalog
+    order = ctx.userdata.order
+    availability = ctx.userdata.availability
+    in_order = {line.item_id for line in order.lines.values()}
+
+    def is_available(item: MenuItem) -> bool:
+        return item.available and availability.is_available(item.id, item.size)
+
+    def in_stock(suggested_id: str) -> bool:
+        size_map = catalog.items_by_id.get(suggested_id)
+        return (
+            size_map is not None
+            and suggested_id not in in_order
+            and any(map(is_available, size_map.values()))
+        )
+
+    if item_id and item_id not in catalog.items_by_id:
+        # a near-miss id or a name, its closest menu item stands in for it when
+        # it is close enough, what goes with the order otherwise
+        ranked = catalog.resolver.rank(item_id)
+        item_id = ranked[0].item_id if ranked and ranked[0].score >= catalog.resolver.min_score else None
+    if item_id:
+        suggested = tables.alternatives(item_id, keep=in_stock)
+    else:
+        suggested = tables.suggest(in_order, keep=in_stock)
+    if not suggested:
+        return "No suggestions available."
+
+    return f"{COMPACT_MENU_COLUMNS}\n" + "\n".join(
+        compact_item_line(catalog.items_by_id[suggested_id], is_available) for suggested_id in suggested
     )
-    return userdata
 
+@function_tool
+async def submit_order(ctx: RunContext[Userdata]) -> str:
+    """
+    Sends the order to the kitchen. Call this only once the customer has confirmed that the order is complete, after reading it back to them.
+
+    If the customer changes the order afterwards, update it and call this again.
+    """
+    order = ctx.userdata.order
+    if not order.lines:
+        raise ToolError("error: the order is empty.")
+
+    if submitter := get_submitter():
+        try:
+            delivered = await asyncio.wait_for(
+                submitter.submit(SubmittedOrder.from_order(order)), timeout=2.0
+            )
+        except asyncio.TimeoutError:
+            raise ToolError(
+                "error: the ordering system is busy, ask the customer to wait a moment and try again."
+            )
+        ctx.userdata.submitted.append(delivered)
+
+    return f"The order was sent to the kitchen. Total: {format_aed(order.totals.total_fils)}"
+
+
+# the tools only depend on the menu's item ids (anything else is read from the
+# session's catalog), so their definitions and JSON schemas are compiled once
+# and shared by all sessions and stores
+_compiled_tools: dict[tuple[str, frozenset[str]], tuple[RawFunctionTool, ...]] = {}
+
+
+def _record_tool_call(ctx: RunContext[Userdata], name: str, seconds: float) -> None:
+    if ctx.userdata.latency is not None:
+        ctx.userdata.latency.record("tool_call", name, seconds)
+
+
+def catalog_tools(catalog: MenuCatalog) -> tuple[RawFunctionTool, ...]:
+    key = (catalog.context_mode, catalog.item_ids)
+    tools = _compiled_tools.get(key)
+    if tools is None:
+        tools = _compiled_tools[key] = tuple(
+            compile_tool(tool, on_call=_record_tool_call)
+            for tool in (
+                build_regular_order_tool(catalog),
+                build_batch_order_tool(),
+                *([build_search_menu_tool()] if catalog.search_index is not None else []),
+                remove_order_item,
+                list_order_items,
+                get_order_total,
+                *([suggest_items] if get_suggestions() is not None else []),
+                submit_order,
+            )
+        )
+    return tools
 
-async def entrypoint(ctx: JobContext):
-    await ctx.connect()
 
-    userdata = await new_userdata()
-    session = AgentSession[Userdata](
-         userdata=userdata,
-        llm = openai.realtime.RealtimeModel.with_azure(
+def new_userdata(catalog: MenuCatalog, order: OrderState | None = None) -> Userdata:
+    order = order or OrderState()
+    if (deal_engine := get_deal_engine()) is not None:
+        order.use_deals(deal_engine)
+    return Userdata(order=order, catalog=catalog, availability=get_availability())
+
+
+def realtime_model() -> llm.RealtimeModel:
+    """
+    The realtime model of the sessions, picked by `REALTIME_MODEL`: "azure"
+    (the default) or "replay", which plays the transcript in `REPLAY_SCRIPT`
+    instead, for load tests and local runs without Azure.
+    """
+    kind = os.getenv("REALTIME_MODEL", "azure")
+    if kind == "replay":
+        from replay_model import ReplayRealtimeModel, load_script
+
+        return ReplayRealtimeModel(load_script(os.environ["REPLAY_SCRIPT"]))
+    if kind != "azure":
+        raise ValueError(f"unknown realtime model: {kind}")
+
+    return openai.realtime.RealtimeModel.with_azure(
         azure_deployment="gpt-4o-mini-realtime-preview",
         azure_endpoint="wss://naseh.openai.azure.com/",
         api_key=os.getenv("AZURE_OPENAI_KEY"),
         api_version="2024-10-01-preview",
         turn_detection=None,
         # tracing=False,
-        ),
+    )
+
+
+def prewarm(proc: JobProcess) -> None:
+    """
+    Runs once per worker process before it takes jobs, so that a job only
+    binds state that is already loaded: the menu with its prompt and lookup
+    indexes, the store overlays, the availability overlay, the deals, the
+    suggestion tables, the order journal and the ambient track.
+    """
+
+    async def _preload() -> tuple[StoreCatalogs, AmbientTrack]:
+        return await asyncio.gather(get_stores(), get_ambient_track())
+
+    proc.userdata["stores"], proc.userdata["ambient_track"] = asyncio.run(_preload())
+    catalog_tools(proc.userdata["stores"].base)
+
+    overlay = get_availability()
+    if path := os.getenv("MENU_AVAILABILITY_FILE"):
+        try:
+            overlay.update(load_availability_file(path))
+        except FileNotFoundError:
+            pass
+    get_deal_engine()
+    get_suggestions()
+    get_journal()
+
+
+async def entrypoint(ctx: JobContext):
+    trace = StartupTrace(ctx.job.id)
+
+    async def _report_startup() -> None:
+        # the agent may never have spoken, e.g. the caller hung up first
+        trace.report()
+
+    ctx.add_shutdown_callback(_report_startup)
+
+    await ctx.connect()
+    trace.mark("connected")
+
+    stores = ctx.proc.userdata.get("stores") or await get_stores()
+    catalog = stores.get(store_for_job(ctx.job.metadata, ctx.room.name))
+    ambient_track = ctx.proc.userdata.get("ambient_track") or await get_ambient_track()
+
+    order = None
+    if journal := get_journal():
+        # the job is restarted in the same room if the previous worker died
+        order = await asyncio.to_thread(recover_order, journal.directory, ctx.room.name)
+        order = order or OrderState()
+        order.journal, order.session_id = journal, ctx.room.name
+
+        async def _close_order() -> None:
+            order.close()
+            # the flusher only writes every few ms, the close record and the
+            # last changes must be on disk before the job ends; the journal
+            # itself stays open for the other jobs of this process
+            await asyncio.to_thread(journal.flush)
+
+        ctx.add_shutdown_callback(_close_order)
+
+    userdata = new_userdata(catalog, order)
+
+    async def _drain_orders() -> None:
+        # give the orders of this call a chance to leave before the job ends,
+        # without waiting on the other calls of the worker
+        if userdata.submitted:
+            await asyncio.wait(userdata.submitted, timeout=5.0)
+
+    ctx.add_shutdown_callback(_drain_orders)
+    latency = userdata.latency = get_worker_latency().session(ctx.room.name)
+
+    async def _report_latency() -> None:
+        logger.info("session %s latency: %s", latency.session_id, latency.summary())
+        await asyncio.to_thread(get_worker_latency().flush)
+
+    ctx.add_shutdown_callback(_report_latency)
+
+    session = AgentSession[Userdata](
+         userdata=userdata,
+        llm=realtime_model(),
         turn_detection=TurnDetection(
             type="server_vad",
             threshold=0.5,
@@ -249,9 +639,24 @@ async def entrypoint(ctx: JobContext):
         # vad=silero.VAD.load(),
     )
 
+    @session.on("user_state_changed")
+    def _on_user_state_changed(ev) -> None:
+        if ev.old_state == "speaking" and ev.new_state == "listening":
+            latency.user_turn_ended()
+
+    @session.on("agent_state_changed")
+    def _on_agent_state_changed(ev) -> None:
+        if ev.new_state != "speaking":
+            return
+        latency.agent_started_speaking()
+        if "first_agent_speech" not in trace.marks:
+            trace.mark("first_agent_speech")
+            latency.record("first_agent_audio", "", trace.marks["first_agent_speech"] / 1000)
+            trace.report()
+
     background_audio = BackgroundAudioPlayer(
         ambient_sound=AudioConfig(
-            str(os.path.join(os.path.dirname(os.path.abspath(__file__)), "bg_noise.mp3")),
+            ambient_track.loop(on_first_frame=lambda: trace.mark("first_audio_frame")),
             volume=1.0,
         ),
     )
@@ -266,8 +671,29 @@ async def entrypoint(ctx: JobContext):
         #     noise_cancellation=noise_cancellation.BVC(),
         # ),
     )
+    trace.mark("session_started")
     await background_audio.start(room=ctx.room, agent_session=session)
 
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    # job processes write their latency histograms to LATENCY_METRICS_DIR, this
+    # process serves them with livekit's own metrics at :METRICS_PORT/metrics
+    clear_snapshots()
+    REGISTRY.register(LatencyCollector())
+
+    if os.getenv("MENU_CATALOG_FILE"):
+        # written once for all job processes, which map it instead of building
+        # their own catalog; in a child process so this one doesn't hold it
+        subprocess.run(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "menu_file.py")],
+            check=True,
+        )
+
+    cli.run_app(
+        WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            # the health check keeps livekit's default port (8081 in production)
+            prometheus_port=int(os.getenv("METRICS_PORT", "8082")),
+        )
+    )
\ No newline at end of file
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Iterator, Mapping, Sequence
+
+from database import (
+    FakeDB,
+    ItemCategory,
+    ItemSize,
+    MenuItem,
+    MenuRepository,
+    ModifierGroup,
+    index_by_id,
+    modifier_instructions,
+)
+from item_resolver import ItemResolver
+from menu_prompt import MenuContextMode, MenuPromptRenderer, RenderedMenu
+from menu_search import MenuSearchIndex
+from menu_table import MenuTable
+from modifiers import ItemModifiers, compile_modifiers
+
+# categories in the order they are rendered in the prompt
+MENU_CATEGORIES: tuple[ItemCategory, ...] = (
+    "drink",
+    "pizza",
+    "sauce",
+    "desserts",
+    "sides",
+    "chicken",
+)
+
+
+@dataclass(frozen=True)
+class MenuCatalog:
+    """
+    Read-only snapshot of the menu, built once per worker process and shared
+    by reference between every session running on it.
+    """
+
+    # tuples of `MenuTable` rows, or views over a mapped menu file (see `menu_file`)
+    items_by_category: Mapping[ItemCategory, Sequence[MenuItem]]
+    all_items: Sequence[MenuItem]
+    item_ids: frozenset[str]
+    # item id -> {size -> item}, unsized items are keyed by None
+    items_by_id: Mapping[str, Mapping[ItemSize | None, MenuItem]]
+    # item id -> selectable sizes in menu order
+    sizes_by_id: Mapping[str, tuple[ItemSize, ...]]
+    # resolves near-miss ids and spoken names to menu ids
+    resolver: ItemResolver
+    prompt: RenderedMenu
+    # "retrieval" keeps items out of the prompt, they are found via `search_index`
+    context_mode: MenuContextMode = "full"
+    search_index: MenuSearchIndex | None = None
+    # item id -> its modifier groups, as loaded and compiled for validation
+    modifier_groups: Mapping[str, tuple[ModifierGroup, ...]] = field(
+        default_factory=lambda: MappingProxyType({})
+    )
+    modifiers: Mapping[str, ItemModifiers] = field(default_factory=lambda: MappingProxyType({}))
+
+    @property
+    def version(self) -> str:
+        return self.prompt.version
+
+    @property
+    def instructions(self) -> str:
+        return self.prompt.instructions
+
+    def items(self, category: ItemCategory) -> Sequence[MenuItem]:
+        return self.items_by_category[category]
+
+    def find(self, item_id: str, size: ItemSize | None = None) -> MenuItem | None:
+        size_map = self.items_by_id.get(item_id)
+        if size_map is None:
+            return None
+        return size_map.get(size)
+
+
+# "yaml" (default) or "compact", see `database.menu_instructions`
+_renderer = MenuPromptRenderer(os.getenv("MENU_PROMPT_FORMAT", "yaml"))
+
+
+async def build_catalog(
+    db: MenuRepository, *, context_mode: MenuContextMode = "full"
+) -> MenuCatalog:
+    # the items are only kept as rows of a columnar table, repositories that
+    # can fill one directly (SQLite) skip the `MenuItem` objects altogether
+    if load_table := getattr(db, "load_table", None):
+        table = await load_table()
+    else:
+        table = MenuTable.from_items(await db.list_all())
+    # optional, repositories without item options leave it out
+    if list_modifier_groups := getattr(db, "list_modifier_groups", None):
+        modifier_groups = await list_modifier_groups()
+    else:
+        modifier_groups = {}
+    grouped: dict[ItemCategory, list[MenuItem]] = {category: [] for category in MENU_CATEGORIES}
+    for row in table:
+        grouped[row.category].append(row)
+    items_by_category = {category: tuple(items) for category, items in grouped.items()}
+
+    all_items = tuple(
+        item for category in MENU_CATEGORIES for item in items_by_category[category]
+    )
+
+    items_by_id, sizes_by_id = index_by_id(list(all_items))
+    if context_mode == "retrieval":
+        prompt = _renderer.render_index(items_by_category, MENU_CATEGORIES)
+        search_index = MenuSearchIndex(all_items)
+    else:
+        prompt = _renderer.render(
+            items_by_category, MENU_CATEGORIES, options=modifier_instructions(modifier_groups)
+        )
+        search_index = None
+
+    return MenuCatalog(
+        items_by_category=MappingProxyType(items_by_category),
+        all_items=all_items,
+        item_ids=frozenset(items_by_id),
+        items_by_id=MappingProxyType(
+            {item_id: MappingProxyType(size_map) for item_id, size_map in items_by_id.items()}
+        ),
+        sizes_by_id=MappingProxyType(sizes_by_id),
+        resolver=ItemResolver(all_items),
+        prompt=prompt,
+        context_mode=context_mode,
+        search_index=search_index,
+        modifier_groups=MappingProxyType(dict(modifier_groups)),
+        modifiers=MappingProxyType(compile_modifiers(modifier_groups)),
+    )
+
+
+class OverlayItems(Mapping[str, Mapping[ItemSize | None, MenuItem]]):
+    """`items_by_id` of an overlay catalog: the changed size maps, then the base ones."""
+
+    __slots__ = ("_base", "_changed")
+
+    def __init__(
+        self,
+        base: Mapping[str, Mapping[ItemSize | None, MenuItem]],
+        changed: Mapping[str, Mapping[ItemSize | None, MenuItem]],
+    ) -> None:
+        self._base = base
+        self._changed = changed
+
+    def __getitem__(self, item_id: str) -> Mapping[ItemSize | None, MenuItem]:
+        size_map = self._changed.get(item_id)
+        return self._base[item_id] if size_map is None else size_map
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self._base
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._base)
+
+    def __len__(self) -> int:
+        return len(self._base)
+
+
+class OverlaySequence(Sequence[MenuItem]):
+    """Items of an overlay catalog: the base ones, with the changed ones swapped in on access."""
+
+    __slots__ = ("_base", "_changes")
+
+    def __init__(
+        self, base: Sequence[MenuItem], changes: Mapping[tuple[str, ItemSize | None], MenuItem]
+    ) -> None:
+        self._base = base
+        self._changes = changes
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(len(self))))
+        item = self._base[index]
+        return self._changes.get((item.id, item.size), item)
+
+    def __iter__(self) -> Iterator[MenuItem]:
+        changes = self._changes
+        for item in self._base:
+            yield changes.get((item.id, item.size), item)
+
+    def __len__(self) -> int:
+        return len(self._base)
+
+
+def overlay_catalog(
+    base: MenuCatalog, changes: Mapping[tuple[str, ItemSize | None], MenuItem]
+) -> MenuCatalog:
+    """
+    A variant of `base` where the `(id, size)` items in `changes` are replaced,
+    e.g. with another price or availability. Ids, sizes, names and the lookup
+    indexes are shared with `base`, only the changed items, their categories
+    and their prompt blocks are new.
+    """
+    if not changes:
+        return base
+
+    changed_ids: dict[str, dict[ItemSize | None, MenuItem]] = {}
+    for (item_id, size), item in changes.items():
+        changed_ids.setdefault(item_id, dict(base.items_by_id[item_id]))[size] = item
+
+    changed_categories = {item.category for item in changes.values()}
+    items_by_category = dict(base.items_by_category)
+    for category in changed_categories:
+        items_by_category[category] = OverlaySequence(base.items_by_category[category], changes)
+
+    if base.context_mode == "retrieval":
+        # only the categories are in the prompt, prices come from `search_menu`
+        prompt = base.prompt
+    else:
+        prompt = _renderer.render_overlay(base.prompt, items_by_category, changed_categories)
+
+    return replace(
+        base,
+        items_by_category=MappingProxyType(items_by_category),
+        all_items=OverlaySequence(base.all_items, changes),
+        items_by_id=OverlayItems(
+            base.items_by_id,
+            {item_id: MappingProxyType(size_map) for item_id, size_map in changed_ids.items()},
+        ),
+        prompt=prompt,
+    )
+
+
+def default_repository() -> MenuRepository:
+    """Uses the SQLite menu at `MENU_DB_PATH` when set, the built-in sample menu otherwise."""
+    if db_path := os.getenv("MENU_DB_PATH"):
+        from sqlite_menu import SqliteMenuRepository
+
+        return SqliteMenuRepository(db_path)
+    return FakeDB()
+
+
+_catalog: MenuCatalog | None = None
+
+
+async def get_catalog() -> MenuCatalog:
+    """
+    Returns the process-wide catalog, building it on first use, or mapping
+    the menu file at `MENU_CATALOG_FILE` when one was written (see `menu_file`).
+    """
+    global _catalog
+    if _catalog is None:
+        path = os.getenv("MENU_CATALOG_FILE")
+        if path and os.path.exists(path):
+            from menu_file import load_catalog
+
+            _catalog = load_catalog(path)
+        else:
+            _catalog = await build_catalog(
+                default_repository(), context_mode=os.getenv("MENU_CONTEXT_MODE", "full")
+            )
+    return _catalog
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from typing import Literal
+from typing import Callable, Literal, Mapping, Protocol
 from typing import TypeAlias
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 COMMON_INSTRUCTIONS = (
 
@@ -61,6 +61,9 @@ ItemCategory = Literal["drink", "pizza", "sauce", "chicken", "sides", "desserts"
 
 
 class MenuItem(BaseModel):
+    # shared read-only between sessions through the process-wide catalog
+    model_config = ConfigDict(frozen=True)
+
     id: str
     name: str
     price: float
@@ -71,7 +74,122 @@ class MenuItem(BaseModel):
     category: ItemCategory
 
 
+class Modifier(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    id: str
+    name: str
+    # added to the item's price, in AED
+    price: float = 0
+
+
+class ModifierGroup(BaseModel):
+    """Options of an item the customer picks from, e.g. the sauce of the wings."""
+
+    model_config = ConfigDict(frozen=True)
+
+    id: str
+    name: str
+    options: tuple[Modifier, ...]
+    # a group with min_selections > 0 is required
+    min_selections: int = 0
+    max_selections: int = 1
+
+    @property
+    def required(self) -> bool:
+        return self.min_selections > 0
+
+
+class MenuRepository(Protocol):
+    """Source of menu items, one coroutine per category plus a batched load."""
+
+    async def list_drinks(self) -> list[MenuItem]: ...
+
+    async def list_pizza(self) -> list[MenuItem]: ...
+
+    async def list_chicken(self) -> list[MenuItem]: ...
+
+    async def list_sides(self) -> list[MenuItem]: ...
+
+    async def list_desserts(self) -> list[MenuItem]: ...
+
+    async def list_sauces(self) -> list[MenuItem]: ...
+
+    async def list_all(self) -> list[MenuItem]:
+        """Every item of every category, in a single round trip."""
+        ...
+
+
+PIZZA_EXTRAS = ModifierGroup(
+    id="extras",
+    name="Extra toppings",
+    options=(
+        Modifier(id="extra_cheese", name="Extra Cheese", price=5),
+        Modifier(id="extra_pepperoni", name="Extra Pepperoni", price=5),
+        Modifier(id="extra_chicken", name="Extra Chicken", price=6),
+        Modifier(id="extra_mushrooms", name="Extra Mushrooms", price=3),
+        Modifier(id="extra_jalapeno", name="Extra Jalapeno", price=3),
+        Modifier(id="extra_olives", name="Extra Olives", price=3),
+    ),
+    max_selections=4,
+)
+
+PIZZA_REMOVALS = ModifierGroup(
+    id="remove",
+    name="Leave out",
+    options=(
+        Modifier(id="no_onions", name="No Onions"),
+        Modifier(id="no_peppers", name="No Green Peppers"),
+        Modifier(id="no_mushrooms", name="No Mushrooms"),
+        Modifier(id="no_olives", name="No Olives"),
+        Modifier(id="no_jalapeno", name="No Jalapeno"),
+    ),
+    max_selections=5,
+)
+
+CHICKEN_SAUCE = ModifierGroup(
+    id="sauce",
+    name="Sauce",
+    options=(
+        Modifier(id="hot", name="Hot"),
+        Modifier(id="bbq", name="BBQ"),
+        Modifier(id="ranch", name="Ranch"),
+    ),
+    min_selections=1,
+)
+
+
 class FakeDB:
+    async def list_all(self) -> list[MenuItem]:
+        return [
+            *await self.list_drinks(),
+            *await self.list_pizza(),
+            *await self.list_sauces(),
+            *await self.list_desserts(),
+            *await self.list_sides(),
+            *await self.list_chicken(),
+        ]
+
+    async def list_modifier_groups(self) -> dict[str, tuple[ModifierGroup, ...]]:
+        """Modifier groups by item id, items without options are left out."""
+        pizza_ids = dict.fromkeys(item.id for item in await self.list_pizza())
+        groups = {item_id: (PIZZA_EXTRAS, PIZZA_REMOVALS) for item_id in pizza_ids}
+        groups["chicken_legend"] += (CHICKEN_SAUCE,)
+        groups["chicken_wings"] = (CHICKEN_SAUCE,)
+        groups["chicken_kickers_item"] = (CHICKEN_SAUCE,)
+        groups["premium_chicken"] = (
+            ModifierGroup(
+                id="flavor",
+                name="Flavor",
+                options=(
+                    Modifier(id="spicy_jalapeno_pineapple", name="Spicy Jalapeno & Pineapple"),
+                    Modifier(id="classic_hot_buffalo", name="Classic Hot Buffalo"),
+                ),
+                min_selections=1,
+            ),
+        )
+        return groups
+
     async def list_drinks(self) -> list[MenuItem]:
         drink_data = [
             {
@@ -662,6 +780,23 @@ def find_items_by_id(
     return [item for item in items if item.id == item_id and (size is None or item.size == size)]
 
 
+def index_by_id(
+    items: list[MenuItem],
+) -> tuple[dict[str, dict[ItemSize | None, MenuItem]], dict[str, tuple[ItemSize, ...]]]:
+    """
+    Builds `id -> {size -> item}` and `id -> sizes` (in menu order, unsized
+    variants excluded) so lookups don't have to scan the whole menu.
+    """
+    by_id: dict[str, dict[ItemSize | None, MenuItem]] = {}
+    for item in items:
+        by_id.setdefault(item.id, {})[item.size] = item
+    sizes = {
+        item_id: tuple(size for size in size_map if size)
+        for item_id, size_map in by_id.items()
+    }
+    return by_id, sizes
+
+
 def _generate_menu_text(title: str, items: list[MenuItem]) -> str:
     """
     Generates a formatted string for a list of menu items using a
@@ -709,20 +844,99 @@ def _generate_menu_text(title: str, items: list[MenuItem]) -> str:
 
     return f"# {title}:\n" + "\n".join(menu_lines)
 
-def menu_instructions(category: ItemCategory, *, items: list[MenuItem]) -> str:
+CATEGORY_TITLES = {
+    "pizza": "Pizzas",
+    "chicken": "Chicken",
+    "drink": "Drinks",
+    "sides": "Sides",
+    "desserts": "Desserts",
+    "sauce": "Sauces",
+}
+
+COMPACT_MENU_COLUMNS = "id | name | AED price, or size=price | ingredients"
+
+
+def _format_price(price: float) -> str:
+    return f"{price:.0f}" if price == int(price) else f"{price:.2f}"
+
+
+def compact_item_line(
+    size_map: Mapping[ItemSize | None, MenuItem],
+    is_available: Callable[[MenuItem], bool] = lambda item: item.available,
+) -> str:
+    """
+    One compact menu row for all size variants of an item, unsized items are
+    keyed by None.
+    """
+    first_item = next(iter(size_map.values()))
+    name = "" if first_item.name.lower().replace(" ", "_") == first_item.id else first_item.name
+    prices = ", ".join(
+        (f"{size}={_format_price(item.price)}" if size else _format_price(item.price))
+        + ("" if is_available(item) else " unavailable")
+        for size, item in size_map.items()
+    )
+    row = f"{first_item.id} | {name} | {prices}"
+    if first_item.ingredients:
+        row += f" | {first_item.ingredients}"
+    return row
+
+
+def _generate_compact_menu_text(title: str, items: list[MenuItem]) -> str:
+    """
+    Dense alternative to `_generate_menu_text`: one row per item with its
+    sizes and prices inline, and the name left out when it only repeats the id.
+    """
+    items_with_sizes, items_without_sizes = map_by_sizes(items)
+    menu_lines = [f"# {title} ({COMPACT_MENU_COLUMNS}):"]
+    menu_lines += [compact_item_line(size_map) for size_map in items_with_sizes.values()]
+    menu_lines += [compact_item_line({None: item}) for item in items_without_sizes]
+    return "\n".join(menu_lines)
+
+
+def modifier_instructions(groups_by_item: Mapping[str, tuple[ModifierGroup, ...]]) -> str:
+    """
+    The item options for the prompt, one row per group listing the items it
+    applies to, so groups shared by every pizza are written once.
+    """
+    items_by_group: dict[ModifierGroup, list[str]] = {}
+    for item_id, groups in groups_by_item.items():
+        for group in groups:
+            items_by_group.setdefault(group, []).append(item_id)
+    if not items_by_group:
+        return ""
+
+    lines = ["# Item options (pass the option ids in `modifiers`, +price in AED):"]
+    for group, item_ids in items_by_group.items():
+        lines.append(f"  - {describe_modifier_group(group)} | for: {', '.join(item_ids)}")
+    return "\n".join(lines)
+
+
+def describe_modifier_group(group: ModifierGroup) -> str:
+    if group.required:
+        rule = f"required, pick {group.min_selections}" + (
+            f" to {group.max_selections}" if group.max_selections > group.min_selections else ""
+        )
+    else:
+        rule = f"optional, up to {group.max_selections}"
+    options = ", ".join(
+        option.id + (f" +{_format_price(option.price)}" if option.price else "")
+        for option in group.options
+    )
+    return f"{group.id} ({rule}): {options}"
+
+
+MenuPromptFormat = Literal["yaml", "compact"]
+
+
+def menu_instructions(
+    category: ItemCategory, *, items: list[MenuItem], prompt_format: MenuPromptFormat = "yaml"
+) -> str:
     """
     Acts as a router to generate the correct menu instructions for a given category.
     """
-    category_titles = {
-        "pizza": "Pizzas",
-        "chicken": "Chicken",
-        "drink": "Drinks",
-        "sides": "Sides",
-        "desserts": "Desserts",
-        "sauce": "Sauces",
-    }
-    
-    title = category_titles.get(category, category.capitalize())
+    title = CATEGORY_TITLES.get(category, category.capitalize())
+    if prompt_format == "compact":
+        return _generate_compact_menu_text(title, items)
     return _generate_menu_text(title, items)
 
 
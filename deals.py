@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+from pricing import format_aed, to_fils
+
+logger = logging.getLogger(__name__)
+
+# (item_id, size) of a deal component, a None size matches every size
+ItemKey = tuple[str, "str | None"]
+# an order line, `(item_id, size, ...)` (see `recipt_state.LineKey`)
+LineKey = tuple
+
+
+@dataclass(frozen=True)
+class DealComponent:
+    # the items that can fill this part of the deal
+    choices: frozenset[ItemKey]
+    quantity: int = 1
+
+
+@dataclass(frozen=True)
+class Deal:
+    deal_id: str
+    name: str
+    price_fils: int
+    components: tuple[DealComponent, ...]
+
+    def describe(self) -> str:
+        return f"{self.deal_id}: {self.name} for {format_aed(self.price_fils)}"
+
+
+@dataclass(frozen=True)
+class AppliedDeal:
+    deal: Deal
+    # the order units the deal replaces, by line
+    units: tuple[tuple[LineKey, int], ...]
+    savings_fils: int
+
+
+@dataclass(frozen=True)
+class DealMatch:
+    applied: tuple[AppliedDeal, ...] = ()
+    # False when the search ran out of budget, the match is then the best found so far
+    exhaustive: bool = True
+
+    @property
+    def savings_fils(self) -> int:
+        return sum(applied.savings_fils for applied in self.applied)
+
+
+NO_DEALS = DealMatch()
+
+
+class DealEngine:
+    """
+    The active deals, compiled into an index from `(item_id, size)` to the
+    deal components the line can fill, so an order change only looks at the
+    deals it can affect.
+
+    Picking the cheapest combination of deals is a packing problem: the
+    greedy answer (best single deal first, as often as it applies) is
+    improved by a branch and bound search capped at `max_nodes`, which
+    bounds the worst case whatever the order looks like. Within a deal the
+    most expensive units that fit each component are used.
+    """
+
+    def __init__(self, deals: Iterable[Deal], *, max_nodes: int = 256) -> None:
+        self.deals = tuple(deals)
+        self.max_nodes = max_nodes
+        self._index: dict[ItemKey, list[tuple[int, int]]] = {}
+        for d, deal in enumerate(self.deals):
+            for c, component in enumerate(deal.components):
+                for key in component.choices:
+                    self._index.setdefault(key, []).append((d, c))
+
+    def components_for(self, key: ItemKey) -> list[tuple[int, int]]:
+        """`(deal, component)` indexes that `key` can fill."""
+        exact = self._index.get(key, [])
+        any_size = self._index.get((key[0], None), []) if key[1] is not None else []
+        if not any_size:
+            return exact
+        # a component can list both a size of the item and the item itself
+        return list(dict.fromkeys(exact + any_size)) if exact else any_size
+
+    def tracker(self) -> DealTracker:
+        return DealTracker(self)
+
+    def match(
+        self, units: Mapping[LineKey, int], prices: Mapping[LineKey, int], candidates: Iterable[int]
+    ) -> DealMatch:
+        """The combination of `candidates` deals saving the most on `units`."""
+        # per deal and component, the order lines it accepts, most expensive first
+        eligible = {d: tuple([] for _ in self.deals[d].components) for d in candidates}
+        for key in sorted(units, key=lambda key: -prices[key]):
+            for d, c in self.components_for(key[:2]):
+                if d in eligible:
+                    eligible[d][c].append(key)
+        scored = []
+        for d, keys in eligible.items():
+            instance = self._take(d, keys, units, prices)
+            if instance is not None and instance.savings_fils > 0:
+                deal_units = sum(component.quantity for component in self.deals[d].components)
+                scored.append((instance.savings_fils, deal_units, d))
+        if not scored:
+            return NO_DEALS
+
+        # best single deals first, for the greedy start and so good answers come early
+        scored.sort(key=lambda entry: (-entry[0], entry[2]))
+        order = [d for _, _, d in scored]
+        # an instance never saves more per unit it uses than the best rate of
+        # the deals left to try, so rate * units left bounds a branch
+        best_rate = [savings / deal_units for savings, deal_units, _ in scored]
+        for i in range(len(best_rate) - 2, -1, -1):
+            best_rate[i] = max(best_rate[i], best_rate[i + 1])
+
+        best: list[AppliedDeal] = []
+        best_savings = 0
+        remaining = dict(units)
+        for d in order:
+            while (instance := self._take(d, eligible[d], remaining, prices)) and instance.savings_fils > 0:
+                remaining = _without(remaining, instance)
+                best.append(instance)
+                best_savings += instance.savings_fils
+
+        nodes = 0
+        exhausted = False
+
+        def search(start: int, remaining: dict[LineKey, int], left: int, savings: int, applied: list[AppliedDeal]) -> None:
+            nonlocal best, best_savings, nodes, exhausted
+            if savings > best_savings:
+                best, best_savings = list(applied), savings
+            for i in range(start, len(order)):
+                if savings + best_rate[i] * left <= best_savings:
+                    return
+                nodes += 1
+                if nodes > self.max_nodes:
+                    exhausted = True
+                    return
+                instance = self._take(order[i], eligible[order[i]], remaining, prices)
+                if instance is None or instance.savings_fils <= 0:
+                    continue
+                applied.append(instance)
+                used = sum(count for _, count in instance.units)
+                search(i, _without(remaining, instance), left - used, savings + instance.savings_fils, applied)
+                applied.pop()
+                if exhausted:
+                    return
+
+        search(0, dict(units), sum(units.values()), 0, [])
+        return DealMatch(applied=tuple(best), exhaustive=not exhausted)
+
+    def _take(
+        self,
+        d: int,
+        eligible: tuple[list[LineKey], ...],
+        remaining: Mapping[LineKey, int],
+        prices: Mapping[LineKey, int],
+    ) -> AppliedDeal | None:
+        """One instance of deal `d` from the `remaining` units, the most expensive ones first."""
+        deal = self.deals[d]
+        taken: dict[LineKey, int] = {}
+        value = 0
+        for component, keys in zip(deal.components, eligible):
+            needed = component.quantity
+            for key in keys:
+                units = min(needed, remaining[key] - taken.get(key, 0))
+                if units <= 0:
+                    continue
+                taken[key] = taken.get(key, 0) + units
+                value += units * prices[key]
+                needed -= units
+                if not needed:
+                    break
+            if needed:
+                return None
+        return AppliedDeal(deal, tuple(taken.items()), value - deal.price_fils)
+
+
+def _without(units: Mapping[LineKey, int], instance: AppliedDeal) -> dict[LineKey, int]:
+    left = dict(units)
+    for key, count in instance.units:
+        left[key] -= count
+    return left
+
+
+class DealTracker:
+    """
+    Deals of one order, kept up to date as lines change: `update` only
+    touches the deals the changed line takes part in, and lines that are in
+    no deal don't trigger a new search.
+    """
+
+    def __init__(self, engine: DealEngine) -> None:
+        self.engine = engine
+        self.match = NO_DEALS
+        # only the lines some deal can use
+        self._units: dict[LineKey, int] = {}
+        self._prices: dict[LineKey, int] = {}
+        # units of the order each (deal, component) could use
+        self._eligible: dict[tuple[int, int], int] = {}
+        # components of each deal with enough of those units
+        self._filled: dict[int, int] = {}
+
+    @property
+    def savings_fils(self) -> int:
+        return self.match.savings_fils
+
+    def update(self, key: LineKey, delta: int, unit_price_fils: int) -> bool:
+        """Applies a change of `delta` units to a line, True when the deals changed."""
+        components = self.engine.components_for(key[:2])
+        if not components:
+            return False
+
+        units = self._units.get(key, 0) + delta
+        if units > 0:
+            self._units[key] = units
+            self._prices[key] = unit_price_fils
+        else:
+            self._units.pop(key, None)
+            self._prices.pop(key, None)
+        deals = self.engine.deals
+        for d, c in components:
+            before = self._eligible.get((d, c), 0)
+            after = self._eligible[(d, c)] = before + delta
+            needed = deals[d].components[c].quantity
+            self._filled[d] = self._filled.get(d, 0) + (after >= needed) - (before >= needed)
+
+        # deals with enough units for each of their components, taken separately
+        candidates = [d for d, filled in self._filled.items() if filled == len(deals[d].components)]
+        previous = self.match
+        self.match = self.engine.match(self._units, self._prices, sorted(candidates))
+        return self.match != previous
+
+
+def load_deals(path: str) -> list[Deal]:
+    """
+    Reads deals from JSON, e.g.
+    `[{"id": "pizza_pair", "name": "2 medium pizzas and a drink", "price": 49,
+    "components": [{"quantity": 2, "items": [{"id": "margherita", "size": "M"}]},
+    {"items": [{"id": "pepsi"}]}]}]`, an item without a size matches all of them.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [
+            Deal(
+                deal_id=deal["id"],
+                name=deal["name"],
+                price_fils=to_fils(deal["price"]),
+                components=tuple(
+                    DealComponent(
+                        choices=frozenset((item["id"], item.get("size")) for item in component["items"]),
+                        quantity=component.get("quantity", 1),
+                    )
+                    for component in deal["components"]
+                ),
+            )
+            for deal in json.load(f)
+        ]
+
+
+_engine: DealEngine | None = None
+
+
+def get_deal_engine() -> DealEngine | None:
+    """Returns the process-wide deals from `MENU_DEALS_FILE`, None when it isn't set."""
+    global _engine
+    if _engine is None and (path := os.getenv("MENU_DEALS_FILE")):
+        _engine = DealEngine(load_deals(path))
+        logger.info("%d deals loaded from %s", len(_engine.deals), path)
+    return _engine
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Collection, Iterable, Mapping, Sequence
+
+from database import MenuItem
+from menu_search import normalize
+
+# rough Latin spelling of Arabic letters, so "بيبسي" and "pepsi" meet halfway
+_TRANSLITERATION = str.maketrans(
+    {
+        "ا": "a", "ب": "b", "ت": "t", "ث": "th", "ج": "j", "ح": "h", "خ": "kh",
+        "د": "d", "ذ": "th", "ر": "r", "ز": "z", "س": "s", "ش": "sh", "ص": "s",
+        "ض": "d", "ط": "t", "ظ": "z", "ع": "a", "غ": "gh", "ف": "f", "ق": "k",
+        "ك": "k", "ل": "l", "م": "m", "ن": "n", "ه": "h", "و": "w", "ي": "y",
+        "ء": "", "ئ": "y", "ؤ": "w", "ڤ": "v", "پ": "p", "چ": "ch",
+    }
+)  # fmt: skip
+# sounds Arabic speakers and speech-to-text tend to swap
+_PHONETIC = str.maketrans({"p": "b", "v": "f", "q": "k", "c": "k", "x": "k", "z": "s"})
+_SILENT = re.compile(r"[aeiouyhw]")
+_REPEATS = re.compile(r"(.)\1+")
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _tokens(text: str) -> list[str]:
+    return _WORD.findall(normalize(text).translate(_TRANSLITERATION))
+
+
+def _canonical(text: str) -> str:
+    # token order is irrelevant: "pepsi_diet" == "diet pepsi"
+    return " ".join(sorted(_tokens(text)))
+
+
+def phonetic_key(text: str) -> str:
+    """Consonant skeleton of each token, e.g. "Pepsi" and "بيبسي" both give "bs"."""
+    skeletons = []
+    for token in _tokens(text):
+        skeleton = _REPEATS.sub(r"\1", _SILENT.sub("", token.translate(_PHONETIC)))
+        skeletons.append(skeleton or token[:1])
+    return " ".join(sorted(skeletons))
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class Resolution:
+    item_id: str
+    score: float
+
+
+@dataclass(frozen=True)
+class ResolverTables:
+    """
+    The lookup tables of an `ItemResolver`. Keys stand for the canonical
+    spellings of ids, names and aliases: the spellings themselves when built
+    from items, their indexes in a menu file (see `menu_file`).
+    """
+
+    # key -> number of trigrams of its spelling
+    gram_counts: Mapping[Any, int] | Sequence[int]
+    # trigram -> keys whose spelling contains it
+    keys_by_gram: Mapping[str, Collection[Any]]
+    # key -> ids of the items spelled that way
+    ids_by_key: Mapping[Any, Collection[str]] | Sequence[Collection[str]]
+    # phonetic key -> item ids
+    ids_by_phonetic: Mapping[str, Collection[str]]
+
+
+class ItemResolver:
+    """
+    Maps near-miss item ids and spoken names to menu ids, using a precomputed
+    trigram index over ids, names and voice aliases plus a phonetic key.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[MenuItem],
+        *,
+        min_score: float = 0.55,
+        min_margin: float = 0.1,
+    ) -> None:
+        gram_counts: dict[str, int] = {}
+        keys_by_gram: defaultdict[str, set[str]] = defaultdict(set)
+        ids_by_key: defaultdict[str, set[str]] = defaultdict(set)
+        ids_by_phonetic: defaultdict[str, set[str]] = defaultdict(set)
+
+        for item in items:
+            for text in (item.id, item.name, item.voice_alias):
+                if not text:
+                    continue
+                canonical = _canonical(text)
+                if canonical not in gram_counts:
+                    grams = _trigrams(canonical)
+                    gram_counts[canonical] = len(grams)
+                    for gram in grams:
+                        keys_by_gram[gram].add(canonical)
+                ids_by_key[canonical].add(item.id)
+                ids_by_phonetic[phonetic_key(text)].add(item.id)
+
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.tables = ResolverTables(gram_counts, keys_by_gram, ids_by_key, ids_by_phonetic)
+
+    @classmethod
+    def from_tables(
+        cls, tables: ResolverTables, *, min_score: float = 0.55, min_margin: float = 0.1
+    ) -> ItemResolver:
+        """A resolver over tables built earlier, e.g. mapped from a menu file."""
+        resolver = cls.__new__(cls)
+        resolver.min_score = min_score
+        resolver.min_margin = min_margin
+        resolver.tables = tables
+        return resolver
+
+    def rank(self, query: str, *, k: int = 3) -> list[Resolution]:
+        """Best candidates first, at most one entry per item id."""
+        tables = self.tables
+        canonical = _canonical(query)
+        grams = _trigrams(canonical)
+        overlaps: defaultdict[Any, int] = defaultdict(int)
+        for gram in grams:
+            for key in tables.keys_by_gram.get(gram, ()):
+                overlaps[key] += 1
+
+        scores: dict[str, float] = {}
+        for key, overlap in overlaps.items():
+            # Dice coefficient between the two trigram sets
+            score = 2 * overlap / (len(grams) + tables.gram_counts[key])
+            for item_id in tables.ids_by_key[key]:
+                if score > scores.get(item_id, 0.0):
+                    scores[item_id] = score
+
+        for item_id in tables.ids_by_phonetic.get(phonetic_key(query), ()):
+            scores[item_id] = max(scores.get(item_id, 0.0), 0.9)
+
+        ranked = sorted(scores.items(), key=lambda entry: (-entry[1], entry[0]))[:k]
+        return [Resolution(item_id, score) for item_id, score in ranked]
+
+    def resolve(self, query: str) -> tuple[str | None, list[Resolution]]:
+        """
+        Returns the matched id when one candidate clearly wins, otherwise
+        `None` and a shortlist to offer the customer.
+        """
+        ranked = self.rank(query)
+        if not ranked or ranked[0].score < self.min_score:
+            return None, ranked
+
+        runner_up = ranked[1].score if len(ranked) > 1 else 0.0
+        if ranked[0].score - runner_up < self.min_margin:
+            return None, ranked
+        return ranked[0].item_id, ranked
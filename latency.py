@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import IO, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# HDR-style log-linear buckets over integer microseconds: values below 2 *
+# SUB_BUCKETS get their own bucket, above that every power of two is split
+# into SUB_BUCKETS linear buckets, so any value is off by at most 1/16 (6.25%)
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# the `le` buckets exported to Prometheus, in seconds
+EXPORT_BOUNDS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+EXPORT_QUANTILES = (0.5, 0.9, 0.99)
+
+LATENCY_METRICS_DIR = os.getenv("LATENCY_METRICS_DIR") or os.path.join(
+    tempfile.gettempdir(), "cashier-latency"
+)
+# the histograms of every job process that exited, folded into one file
+FINISHED_SNAPSHOT = "finished.json"
+
+
+def _bucket(us: int) -> int:
+    if us < 2 * SUB_BUCKETS:
+        return us
+    shift = us.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (us >> shift) - SUB_BUCKETS
+
+
+def _upper_bound(bucket: int) -> int:
+    """Largest value, in microseconds, that falls into `bucket`."""
+    if bucket < 2 * SUB_BUCKETS:
+        return bucket
+    shift = bucket // SUB_BUCKETS - 1
+    return ((bucket % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Fixed relative precision histogram of durations. Recording is O(1)."""
+
+    __slots__ = ("counts", "count", "total_us", "max_us")
+
+    def __init__(self) -> None:
+        # sparse, a session only touches a handful of buckets
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def record(self, seconds: float) -> None:
+        us = max(int(seconds * 1_000_000), 0)
+        bucket = _bucket(us)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def merge(self, other: LatencyHistogram) -> None:
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def quantile(self, q: float) -> float:
+        """In seconds, the upper bound of the bucket holding the `q` quantile."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(_upper_bound(bucket), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def cumulative(self, bounds: Iterable[float]) -> Iterator[tuple[float, int]]:
+        """`(bound, count of values <= bound)`, as Prometheus `le` buckets."""
+        buckets = sorted(self.counts)
+        i = seen = 0
+        for bound in bounds:
+            bound_us = bound * 1_000_000
+            while i < len(buckets) and _upper_bound(buckets[i]) <= bound_us:
+                seen += self.counts[buckets[i]]
+                i += 1
+            yield bound, seen
+
+    def to_dict(self) -> dict:
+        return {"counts": self.counts, "count": self.count, "total_us": self.total_us, "max_us": self.max_us}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> LatencyHistogram:
+        histogram = cls()
+        histogram.counts = {int(bucket): count for bucket, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total_us = data["total_us"]
+        histogram.max_us = data["max_us"]
+        return histogram
+
+
+# (metric, label) -> histogram, e.g. ("tool_call", "order_regular_item")
+HistogramKey = tuple[str, str]
+
+
+class SessionLatency:
+    """
+    Latencies of one session. Every value also goes into the worker-wide
+    histograms, which are exported to Prometheus.
+    """
+
+    def __init__(self, session_id: str, worker: dict[HistogramKey, LatencyHistogram]) -> None:
+        self.session_id = session_id
+        self.histograms: dict[HistogramKey, LatencyHistogram] = {}
+        self._worker = worker
+        self._user_turn_ended_at: float | None = None
+
+    def record(self, metric: str, label: str, seconds: float) -> None:
+        key = (metric, label)
+        for histograms in (self.histograms, self._worker):
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def user_turn_ended(self) -> None:
+        self._user_turn_ended_at = time.perf_counter()
+
+    def agent_started_speaking(self) -> None:
+        """Closes the turn: from the end of the user's speech to the first agent audio."""
+        if self._user_turn_ended_at is not None:
+            self.record("turn_response", "", time.perf_counter() - self._user_turn_ended_at)
+            self._user_turn_ended_at = None
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{metric}{f'[{label}]' if label else ''} n={h.count} p50={h.quantile(0.5) * 1e3:.2f}ms"
+            f" p99={h.quantile(0.99) * 1e3:.2f}ms max={h.max_us / 1e3:.2f}ms"
+            for (metric, label), h in sorted(self.histograms.items())
+        )
+
+
+class WorkerLatency:
+    """
+    Worker-wide histograms of one job process, written as a snapshot to
+    `directory` so the main process can serve them (job processes don't own
+    the HTTP port). The snapshot's lock file is held while the process
+    lives, once it is free the snapshot is final (see `fold_finished`).
+    """
+
+    def __init__(self, directory: str = LATENCY_METRICS_DIR, *, flush_interval: float = 10.0) -> None:
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.histograms: dict[HistogramKey, LatencyHistogram] = {}
+        # unique per process, pids are reused
+        self._path = os.path.join(directory, f"latency-{uuid.uuid4().hex}.json")
+        self._lock_file: IO[str] | None = None
+        self._flush_task: asyncio.Task[None] | None = None
+
+    def session(self, session_id: str) -> SessionLatency:
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+        return SessionLatency(session_id, self.histograms)
+
+    def flush(self) -> None:
+        snapshot = [
+            {"metric": metric, "label": label, **histogram.to_dict()}
+            for (metric, label), histogram in self.histograms.items()
+        ]
+        os.makedirs(self.directory, exist_ok=True)
+        if self._lock_file is None:
+            # locked before the snapshot first appears
+            self._lock_file = open(_lock_path(self._path), "a", encoding="utf-8")
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self._path)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("failed to write latency metrics")
+
+
+def _lock_path(snapshot_path: str) -> str:
+    return snapshot_path[: -len(".json")] + ".lock"
+
+
+def _merge_snapshot(merged: dict[HistogramKey, LatencyHistogram], snapshot: list[dict]) -> None:
+    for entry in snapshot:
+        key = (entry["metric"], entry["label"])
+        histogram = merged.get(key)
+        if histogram is None:
+            histogram = merged[key] = LatencyHistogram()
+        histogram.merge(LatencyHistogram.from_dict(entry))
+
+
+def _read_json(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _read_finished(directory: str) -> tuple[dict[HistogramKey, LatencyHistogram], set[str]]:
+    """The folded histograms, and the names of the snapshots folded into them."""
+    finished: dict[HistogramKey, LatencyHistogram] = {}
+    data = _read_json(os.path.join(directory, FINISHED_SNAPSHOT)) or {"histograms": [], "folded": []}
+    _merge_snapshot(finished, data["histograms"])
+    return finished, set(data["folded"])
+
+
+def clear_snapshots(directory: str = LATENCY_METRICS_DIR) -> None:
+    """Drops the snapshots of a previous run, called by the main process on startup."""
+    for pattern in ("latency-*.json", "latency-*.lock", FINISHED_SNAPSHOT):
+        for path in glob.glob(os.path.join(directory, pattern)):
+            os.unlink(path)
+
+
+def fold_finished(directory: str = LATENCY_METRICS_DIR) -> None:
+    """
+    Folds the snapshots of job processes that exited into `FINISHED_SNAPSHOT`
+    and deletes them, so the snapshots to read don't pile up with every job.
+    Only the main process calls this.
+    """
+    finished, folded = _read_finished(directory)
+    done = []
+    for path in glob.glob(os.path.join(directory, "latency-*.json")):
+        name = os.path.basename(path)
+        if name in folded:
+            # folded before a crash, but not deleted yet
+            done.append(path)
+            continue
+        with open(_lock_path(path), "a", encoding="utf-8") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+        snapshot = _read_json(path)
+        if snapshot is not None:
+            _merge_snapshot(finished, snapshot)
+        folded.add(name)
+        done.append(path)
+    if not done:
+        return
+
+    finished_path = os.path.join(directory, FINISHED_SNAPSHOT)
+    with open(finished_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "histograms": [
+                    {"metric": metric, "label": label, **histogram.to_dict()}
+                    for (metric, label), histogram in finished.items()
+                ],
+                # until they are deleted below, so they can't be folded twice
+                "folded": sorted(os.path.basename(path) for path in done),
+            },
+            f,
+        )
+    os.replace(finished_path + ".tmp", finished_path)
+    for path in done:
+        for done_path in (path, _lock_path(path)):
+            try:
+                os.unlink(done_path)
+            except FileNotFoundError:
+                pass
+
+
+def read_snapshots(directory: str = LATENCY_METRICS_DIR) -> dict[HistogramKey, LatencyHistogram]:
+    """Merges the snapshots of every job process, past and present."""
+    merged, folded = _read_finished(directory)
+    for path in glob.glob(os.path.join(directory, "latency-*.json")):
+        if os.path.basename(path) in folded:
+            continue
+        snapshot = _read_json(path)
+        if snapshot is not None:
+            _merge_snapshot(merged, snapshot)
+    return merged
+
+
+class LatencyCollector:
+    """Prometheus collector for the main process, serving the job processes' snapshots."""
+
+    def __init__(self, directory: str = LATENCY_METRICS_DIR) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
+
+        with self._lock:
+            try:
+                fold_finished(self.directory)
+            except OSError:
+                logger.exception("failed to fold latency snapshots")
+            histograms = sorted(read_snapshots(self.directory).items())
+        metric_names = sorted({metric for (metric, _), _ in histograms})
+        for name in metric_names:
+            family = HistogramMetricFamily(
+                f"cashier_{name}_seconds", f"Latency of {name.replace('_', ' ')}", labels=["label"]
+            )
+            quantiles = GaugeMetricFamily(
+                f"cashier_{name}_quantile_seconds",
+                f"Quantiles of {name.replace('_', ' ')} latency, within 6.25%",
+                labels=["label", "quantile"],
+            )
+            for (metric, label), histogram in histograms:
+                if metric != name:
+                    continue
+                family.add_metric(
+                    [label],
+                    [(str(bound), count) for bound, count in histogram.cumulative(EXPORT_BOUNDS)]
+                    + [("+Inf", histogram.count)],
+                    histogram.total_us / 1_000_000,
+                )
+                for q in EXPORT_QUANTILES:
+                    quantiles.add_metric([label, str(q)], histogram.quantile(q))
+            yield family
+            yield quantiles
+
+
+_worker: WorkerLatency | None = None
+
+
+def get_worker_latency() -> WorkerLatency:
+    """Returns the histograms of this job process."""
+    global _worker
+    if _worker is None:
+        _worker = WorkerLatency()
+    return _worker
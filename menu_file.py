@@ -0,0 +1,638 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Iterator, Mapping, Sequence, overload
+
+from catalog import MENU_CATEGORIES, MenuCatalog
+from database import ItemSize, MenuItem, ModifierGroup
+from item_resolver import ItemResolver, ResolverTables
+from menu_prompt import RenderedCategory, RenderedMenu
+from menu_search import MenuSearchIndex
+from modifiers import compile_modifiers
+
+# layout: magic, u32 header length, JSON header, then 8-byte aligned sections,
+# named in the header:
+#   strings    u32 offsets (n_strings + 1) into the UTF-8 blob that follows
+#   records    one RECORD per item, in menu order (so categories are ranges)
+#   ids        (id string, first position, count) per id, in menu order
+#   positions  item indexes grouped by id, sizes in menu order
+#   slots      open addressing table, crc32(id) -> id index + 1, 0 when empty
+# and the tables of the resolver and the search index as lists of u32 (see
+# `_list_sections`), ids stored as their index in `ids`
+MAGIC = b"MENUCAT\x02"
+# id, name, ingredients, voice_alias, size, price, available, category
+RECORD = struct.Struct("<5Id2B2x")
+ID_ENTRY = struct.Struct("<3I")
+NO_STRING = 0xFFFFFFFF
+
+_CATEGORY_CODES = {category: code for code, category in enumerate(MENU_CATEGORIES)}
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _slot_table(keys: Iterable[str]) -> array:
+    keys = list(keys)
+    # at most half full, so probes stay short
+    slots = array("I", bytes(4 * (1 << (2 * len(keys)).bit_length())))
+    mask = len(slots) - 1
+    for index, key in enumerate(keys):
+        slot = zlib.crc32(key.encode()) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = index + 1
+    return slots
+
+
+def _list_sections(
+    name: str,
+    lists: Sequence[Iterable[int]],
+    ref: Callable[[str], int],
+    *,
+    keys: Sequence[str] | None = None,
+    weights: Sequence[Iterable[float]] | None = None,
+) -> dict[str, bytes]:
+    """
+    `lists` as `<name>.offsets` and `<name>.values`, with a parallel
+    `<name>.weights` and, when the lists are looked up by a string key, the
+    keys' strings and a slot table over them (see `MappedKeyedLists`).
+    """
+    offsets = array("I", [0])
+    values = array("I")
+    for values_of in lists:
+        values.extend(values_of)
+        offsets.append(len(values))
+    sections = {f"{name}.offsets": offsets.tobytes(), f"{name}.values": values.tobytes()}
+    if weights is not None:
+        # the search field weights are exact in single precision
+        sections[f"{name}.weights"] = array("f", (w for weights_of in weights for w in weights_of)).tobytes()
+    if keys is not None:
+        sections[f"{name}.keys"] = array("I", map(ref, keys)).tobytes()
+        sections[f"{name}.slots"] = _slot_table(keys).tobytes()
+    return sections
+
+
+def _resolver_sections(
+    resolver: ItemResolver, id_index: Mapping[str, int], ref: Callable[[str], int]
+) -> dict[str, bytes]:
+    tables = resolver.tables
+    # the spellings themselves aren't needed, only their index
+    keys = list(tables.gram_counts)
+    key_index = {key: index for index, key in enumerate(keys)}
+    grams = sorted(tables.keys_by_gram)
+    phonetic_keys = sorted(tables.ids_by_phonetic)
+    return {
+        "resolver.gram_counts": array("I", (tables.gram_counts[key] for key in keys)).tobytes(),
+        **_list_sections(
+            "resolver.keys_by_gram",
+            [sorted(key_index[key] for key in tables.keys_by_gram[gram]) for gram in grams],
+            ref,
+            keys=grams,
+        ),
+        **_list_sections(
+            "resolver.ids_by_key",
+            [sorted(id_index[item_id] for item_id in tables.ids_by_key[key]) for key in keys],
+            ref,
+        ),
+        **_list_sections(
+            "resolver.ids_by_phonetic",
+            [sorted(id_index[item_id] for item_id in tables.ids_by_phonetic[key]) for key in phonetic_keys],
+            ref,
+            keys=phonetic_keys,
+        ),
+    }
+
+
+def _search_sections(
+    index: MenuSearchIndex, id_index: Mapping[str, int], ref: Callable[[str], int]
+) -> dict[str, bytes]:
+    tokens = list(index.vocabulary)
+    postings = [index.postings[token] for token in tokens]
+    return _list_sections(
+        "search.postings",
+        # docs in the same order, ids are indexed in menu order as well
+        [[id_index[index.item_ids[doc]] for doc, _ in postings_of] for postings_of in postings],
+        ref,
+        keys=tokens,
+        weights=[[weight for _, weight in postings_of] for postings_of in postings],
+    )
+
+
+def write_menu_file(catalog: MenuCatalog, path: str) -> None:
+    """
+    Serializes `catalog` (items, id index, rendered prompt, and the tables
+    of its resolver and search index) so worker processes can map it
+    instead of each building their own copy. `catalog` comes from
+    `build_catalog`.
+    """
+    strings: dict[str, int] = {}
+
+    def ref(text: str | None) -> int:
+        if text is None:
+            return NO_STRING
+        index = strings.get(text)
+        if index is None:
+            index = strings[text] = len(strings)
+        return index
+
+    records = bytearray()
+    positions_by_id: dict[str, list[int]] = {}
+    for position, item in enumerate(catalog.all_items):
+        records += RECORD.pack(
+            ref(item.id),
+            ref(item.name),
+            ref(item.ingredients),
+            ref(item.voice_alias),
+            ref(item.size),
+            item.price,
+            item.available,
+            _CATEGORY_CODES[item.category],
+        )
+        positions_by_id.setdefault(item.id, []).append(position)
+
+    ids = bytearray()
+    positions = array("I")
+    for item_id, item_positions in positions_by_id.items():
+        ids += ID_ENTRY.pack(ref(item_id), len(positions), len(item_positions))
+        positions.extend(item_positions)
+    id_index = {item_id: index for index, item_id in enumerate(positions_by_id)}
+
+    category_ranges = {}
+    start = 0
+    for category in MENU_CATEGORIES:
+        category_ranges[category] = (start, start + len(catalog.items_by_category[category]))
+        start += len(catalog.items_by_category[category])
+
+    prompt = catalog.prompt
+    header = {
+        "version": prompt.version,
+        "context_mode": catalog.context_mode,
+        "instructions": ref(prompt.instructions),
+        "options": ref(prompt.options),
+        "blocks": [
+            (block.category, block.digest, ref(block.text), block.size_bytes)
+            for block in prompt.categories
+        ],
+        "category_ranges": category_ranges,
+        # a few groups shared by many items, small enough for the header
+        "modifier_groups": {
+            item_id: [group.model_dump() for group in groups]
+            for item_id, groups in catalog.modifier_groups.items()
+        },
+        "n_items": len(catalog.all_items),
+        "n_ids": len(positions_by_id),
+    }
+
+    sections = {
+        "records": bytes(records),
+        "ids": bytes(ids),
+        "positions": positions.tobytes(),
+        "slots": _slot_table(positions_by_id).tobytes(),
+        **_resolver_sections(catalog.resolver, id_index, ref),
+        **(
+            _search_sections(catalog.search_index, id_index, ref)
+            if catalog.search_index is not None
+            else {}
+        ),
+    }
+    # last, every other section adds its strings
+    blob = bytearray()
+    offsets = array("I", [0])
+    for text in strings:
+        blob += text.encode()
+        offsets.append(len(blob))
+    header["n_strings"] = len(strings)
+    sections = {"strings": offsets.tobytes() + blob, **sections}
+
+    # the header holds the section offsets, which depend on its own length
+    header["sections"] = {}
+    while True:
+        encoded = json.dumps(header).encode()
+        offset = _align(len(MAGIC) + 4 + len(encoded))
+        layout = {}
+        for name, section in sections.items():
+            layout[name] = [offset, len(section)]
+            offset = _align(offset + len(section))
+        if layout == header["sections"]:
+            break
+        header["sections"] = layout
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(encoded)) + encoded)
+        for name, section in sections.items():
+            f.write(bytes(layout[name][0] - f.tell()))
+            f.write(section)
+    os.replace(tmp_path, path)
+
+
+class MappedMenu:
+    """
+    Read-only view of a menu file. Nothing is decoded up front: a `MenuItem`
+    (or an id) is built from its record on first access and kept for this
+    process, so the processes mapping the file share its pages and only hold
+    the items their sessions looked at.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a menu file")
+
+        (header_size,) = struct.unpack_from("<I", self._mmap, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(self._mmap[start : start + header_size])
+        self.n_items: int = self.header["n_items"]
+        self.n_ids: int = self.header["n_ids"]
+
+        self._view = memoryview(self._mmap)
+        strings_at = self.header["sections"]["strings"][0]
+        n_offsets = self.header["n_strings"] + 1
+        self._string_offsets = self._view[strings_at : strings_at + 4 * n_offsets].cast("I")
+        self._blob_at = strings_at + 4 * n_offsets
+        self._records = self.section("records")
+        self._ids = self.section("ids")
+        self._positions = self.section("positions", "I")
+        self._slots = self.section("slots", "I")
+        self._items: list[MenuItem | None] = [None] * self.n_items
+        self._id_strings: list[str | None] = [None] * self.n_ids
+
+    def has_section(self, name: str) -> bool:
+        return name in self.header["sections"]
+
+    def section(self, name: str, fmt: str | None = None) -> memoryview:
+        offset, size = self.header["sections"][name]
+        view = self._view[offset : offset + size]
+        return view.cast(fmt) if fmt else view
+
+    def string(self, index: int) -> str | None:
+        if index == NO_STRING:
+            return None
+        return str(self._string_bytes(index), "utf-8")
+
+    def _string_bytes(self, index: int) -> bytes:
+        start = self._blob_at + self._string_offsets[index]
+        return self._mmap[start : self._blob_at + self._string_offsets[index + 1]]
+
+    def lookup(self, slots: Sequence[int], ref_at: Callable[[int], int], key: str) -> int | None:
+        """Index of `key` in a slot table, `ref_at(index)` being the string of each index."""
+        encoded = key.encode()
+        mask = len(slots) - 1
+        slot = zlib.crc32(encoded) & mask
+        while index := slots[slot]:
+            if self._string_bytes(ref_at(index - 1)) == encoded:
+                return index - 1
+            slot = (slot + 1) & mask
+        return None
+
+    def item(self, position: int) -> MenuItem:
+        item = self._items[position]
+        if item is None:
+            item = self._items[position] = self._decode(position)
+        return item
+
+    def _decode(self, position: int) -> MenuItem:
+        id_, name, ingredients, voice_alias, size, price, available, category = (
+            RECORD.unpack_from(self._records, position * RECORD.size)
+        )
+        string = self.string
+        # the record was validated when the file was written
+        return MenuItem.model_construct(
+            id=string(id_),
+            name=string(name),
+            price=price,
+            ingredients=string(ingredients),
+            available=bool(available),
+            size=string(size),
+            voice_alias=string(voice_alias),
+            category=MENU_CATEGORIES[category],
+        )
+
+    def size(self, position: int) -> ItemSize | None:
+        return self.string(RECORD.unpack_from(self._records, position * RECORD.size)[4])
+
+    def id_at(self, index: int) -> str:
+        item_id = self._id_strings[index]
+        if item_id is None:
+            item_id = self._id_strings[index] = self.string(self._id_ref(index))
+        return item_id
+
+    def ids_at(self, indexes: Iterable[int]) -> tuple[str, ...]:
+        return tuple(map(self.id_at, indexes))
+
+    def _id_ref(self, index: int) -> int:
+        return ID_ENTRY.unpack_from(self._ids, index * ID_ENTRY.size)[0]
+
+    def find_id(self, item_id: str) -> range | None:
+        """Where the positions of `item_id`'s sizes are, see `positions`."""
+        index = self.lookup(self._slots, self._id_ref, item_id)
+        if index is None:
+            return None
+        _, first, count = ID_ENTRY.unpack_from(self._ids, index * ID_ENTRY.size)
+        return range(first, first + count)
+
+    def positions(self, ids: range) -> Sequence[int]:
+        """Item positions of one id, its sizes in menu order."""
+        return self._positions[ids.start : ids.stop]
+
+    def prompt(self) -> RenderedMenu:
+        return RenderedMenu(
+            version=self.header["version"],
+            instructions=self.string(self.header["instructions"]),
+            categories=tuple(
+                RenderedCategory(
+                    category=category, digest=digest, text=self.string(text), size_bytes=size_bytes
+                )
+                for category, digest, text, size_bytes in self.header["blocks"]
+            ),
+            options=self.string(self.header["options"]),
+        )
+
+    def modifier_groups(self) -> dict[str, tuple[ModifierGroup, ...]]:
+        return {
+            item_id: tuple(ModifierGroup.model_validate(group) for group in groups)
+            for item_id, groups in self.header["modifier_groups"].items()
+        }
+
+    def resolver_tables(self) -> ResolverTables:
+        return ResolverTables(
+            gram_counts=self.section("resolver.gram_counts", "I"),
+            keys_by_gram=MappedKeyedLists(self, "resolver.keys_by_gram"),
+            ids_by_key=MappedLists(self, "resolver.ids_by_key", self.ids_at),
+            ids_by_phonetic=MappedKeyedLists(self, "resolver.ids_by_phonetic", self.ids_at),
+        )
+
+    def search_index(self) -> MenuSearchIndex:
+        postings = MappedKeyedLists(self, "search.postings")
+        return MenuSearchIndex.from_tables(MappedIds(self), postings, postings.sorted_keys)
+
+
+class MappedItems(Sequence[MenuItem]):
+    """A range of the menu's items, e.g. one category, decoded on access."""
+
+    __slots__ = ("_menu", "_start", "_stop")
+
+    def __init__(self, menu: MappedMenu, start: int, stop: int) -> None:
+        self._menu = menu
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    @overload
+    def __getitem__(self, index: int) -> MenuItem: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> tuple[MenuItem, ...]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._menu.item(self._start + index)
+
+    def __iter__(self) -> Iterator[MenuItem]:
+        item = self._menu.item
+        for position in range(self._start, self._stop):
+            yield item(position)
+
+
+class MappedIds(Sequence[str]):
+    """The menu's item ids by index, in menu order."""
+
+    __slots__ = ("_menu",)
+
+    def __init__(self, menu: MappedMenu) -> None:
+        self._menu = menu
+
+    def __len__(self) -> int:
+        return self._menu.n_ids
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._menu.id_at(index)
+
+
+class MappedStrings(Sequence[str]):
+    """Strings stored as u32 refs, e.g. the sorted keys of `MappedKeyedLists`."""
+
+    __slots__ = ("_menu", "_refs")
+
+    def __init__(self, menu: MappedMenu, refs: Sequence[int]) -> None:
+        self._menu = menu
+        self._refs = refs
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._menu.string(ref) for ref in self._refs[index]]
+        return self._menu.string(self._refs[index])
+
+
+class WeightedList(Sequence[tuple[int, float]]):
+    """`(value, weight)` pairs of one of `MappedLists`, e.g. a token's postings."""
+
+    __slots__ = ("_values", "_weights")
+
+    def __init__(self, values: Sequence[int], weights: Sequence[float]) -> None:
+        self._values = values
+        self._weights = weights
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(zip(self._values[index], self._weights[index]))
+        return self._values[index], self._weights[index]
+
+
+class MappedLists(Sequence):
+    """
+    Lists of u32 by index, written by `_list_sections`. A list is returned
+    as a view over the file, as `(value, weight)` pairs when the lists are
+    weighted, or converted by `convert` (e.g. id indexes to ids).
+    """
+
+    __slots__ = ("_offsets", "_values", "_weights", "_convert")
+
+    def __init__(
+        self,
+        menu: MappedMenu,
+        name: str,
+        convert: Callable[[Sequence[int]], Any] | None = None,
+    ) -> None:
+        self._offsets = menu.section(f"{name}.offsets", "I")
+        self._values = menu.section(f"{name}.values", "I")
+        self._weights = (
+            menu.section(f"{name}.weights", "f") if menu.has_section(f"{name}.weights") else None
+        )
+        self._convert = convert
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int):
+        start, stop = self._offsets[index], self._offsets[index + 1]
+        values = self._values[start:stop]
+        if self._weights is not None:
+            return WeightedList(values, self._weights[start:stop])
+        return self._convert(values) if self._convert else values
+
+
+class MappedKeyedLists(Mapping[str, Any]):
+    """`key -> list` over `MappedLists` stored with their keys, sorted."""
+
+    __slots__ = ("_menu", "_lists", "_keys", "_slots")
+
+    def __init__(
+        self,
+        menu: MappedMenu,
+        name: str,
+        convert: Callable[[Sequence[int]], Any] | None = None,
+    ) -> None:
+        self._menu = menu
+        self._lists = MappedLists(menu, name, convert)
+        self._keys = menu.section(f"{name}.keys", "I")
+        self._slots = menu.section(f"{name}.slots", "I")
+
+    @property
+    def sorted_keys(self) -> Sequence[str]:
+        return MappedStrings(self._menu, self._keys)
+
+    def __getitem__(self, key: str):
+        index = self._menu.lookup(self._slots, self._keys.__getitem__, key)
+        if index is None:
+            raise KeyError(key)
+        return self._lists[index]
+
+    def __contains__(self, key: object) -> bool:
+        return (
+            isinstance(key, str)
+            and self._menu.lookup(self._slots, self._keys.__getitem__, key) is not None
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.sorted_keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class _ById(Mapping):
+    """
+    A mapping by item id over the menu file. Values are built on first
+    access and kept, so repeated lookups are a dict hit.
+    """
+
+    __slots__ = ("_menu", "_cache")
+
+    def __init__(self, menu: MappedMenu) -> None:
+        self._menu = menu
+        self._cache: dict[str, Any] = {}
+
+    def _value(self, positions: Sequence[int]): ...
+
+    def __getitem__(self, item_id: str):
+        value = self._cache.get(item_id)
+        if value is None:
+            ids = self._menu.find_id(item_id) if isinstance(item_id, str) else None
+            if ids is None:
+                raise KeyError(item_id)
+            value = self._cache[item_id] = self._value(self._menu.positions(ids))
+        return value
+
+    def get(self, item_id, default=None):
+        value = self._cache.get(item_id)
+        if value is not None:
+            return value
+        try:
+            return self[item_id]
+        except KeyError:
+            return default
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self._cache or (
+            isinstance(item_id, str) and self._menu.find_id(item_id) is not None
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return map(self._menu.id_at, range(self._menu.n_ids))
+
+    def __len__(self) -> int:
+        return self._menu.n_ids
+
+
+class MappedIndex(_ById, Mapping[str, Mapping[ItemSize | None, MenuItem]]):
+    """`items_by_id` over the menu file: `id -> {size -> item}`."""
+
+    __slots__ = ()
+
+    def _value(self, positions: Sequence[int]) -> Mapping[ItemSize | None, MenuItem]:
+        menu = self._menu
+        return MappingProxyType({menu.size(position): menu.item(position) for position in positions})
+
+
+class MappedSizes(_ById, Mapping[str, tuple[ItemSize, ...]]):
+    """`sizes_by_id` over the menu file, unsized variants excluded."""
+
+    __slots__ = ()
+
+    def _value(self, positions: Sequence[int]) -> tuple[ItemSize, ...]:
+        return tuple(size for size in map(self._menu.size, positions) if size)
+
+
+def load_catalog(path: str) -> MenuCatalog:
+    """
+    A catalog over the menu file at `path`. The resolver and the search
+    index read their tables from the file as well, only the compiled item
+    options are built in this process.
+    """
+    menu = MappedMenu(path)
+    items_by_id = MappedIndex(menu)
+    modifier_groups = menu.modifier_groups()
+    return MenuCatalog(
+        items_by_category={
+            category: MappedItems(menu, start, stop)
+            for category, (start, stop) in menu.header["category_ranges"].items()
+        },
+        all_items=MappedItems(menu, 0, menu.n_items),
+        item_ids=frozenset(items_by_id),
+        items_by_id=items_by_id,
+        sizes_by_id=MappedSizes(menu),
+        resolver=ItemResolver.from_tables(menu.resolver_tables()),
+        prompt=menu.prompt(),
+        context_mode=menu.header["context_mode"],
+        search_index=menu.search_index() if menu.has_section("search.postings.keys") else None,
+        modifier_groups=MappingProxyType(modifier_groups),
+        modifiers=MappingProxyType(compile_modifiers(modifier_groups)),
+    )
+
+
+if __name__ == "__main__":
+    # python menu_file.py [path] -> writes the configured menu to MENU_CATALOG_FILE by default
+    import asyncio
+    import sys
+
+    from catalog import build_catalog, default_repository
+
+    path = sys.argv[1] if len(sys.argv) > 1 else os.environ["MENU_CATALOG_FILE"]
+    catalog = asyncio.run(
+        build_catalog(default_repository(), context_mode=os.getenv("MENU_CONTEXT_MODE", "full"))
+    )
+    write_menu_file(catalog, path)
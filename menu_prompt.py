@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal, Mapping, get_args
+
+from database import (
+    CATEGORY_TITLES,
+    COMMON_INSTRUCTIONS,
+    ItemCategory,
+    MenuItem,
+    MenuPromptFormat,
+    menu_instructions,
+)
+
+logger = logging.getLogger(__name__)
+
+MenuContextMode = Literal["full", "retrieval"]
+
+RETRIEVAL_INSTRUCTIONS = (
+    "The menu is not listed here, only its categories. \n"
+    "Always call `search_menu` to look up items, their ids, sizes and prices before describing or ordering them. \n"
+    "Only use item ids returned by `search_menu`. \n"
+)
+
+# rough average for the realtime model tokenizer on this kind of text
+BYTES_PER_TOKEN = 4
+
+
+@dataclass(frozen=True)
+class RenderedCategory:
+    category: ItemCategory
+    digest: str
+    text: str
+    size_bytes: int
+
+    @property
+    def approx_tokens(self) -> int:
+        return -(-self.size_bytes // BYTES_PER_TOKEN)
+
+
+@dataclass(frozen=True)
+class RenderedMenu:
+    version: str
+    instructions: str
+    categories: tuple[RenderedCategory, ...]
+    # the item options block, see `database.modifier_instructions`
+    options: str = ""
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.instructions.encode())
+
+
+def items_digest(items: tuple[MenuItem, ...]) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    for item in items:
+        h.update(
+            f"{item.id}\x1f{item.size}\x1f{item.price}\x1f{item.available}\x1f"
+            f"{item.name}\x1f{item.ingredients}\x1f{item.voice_alias}\x1e".encode()
+        )
+    return h.hexdigest()
+
+
+class MenuPromptRenderer:
+    """
+    Renders the menu prompt one category block at a time. The main menu is
+    rendered once per process; the blocks of store overlays are cached by
+    the digest of their items, so stores that change a category the same
+    way (a regional price list, the same sold-out item) share one block.
+    """
+
+    def __init__(self, prompt_format: MenuPromptFormat = "yaml", *, max_cached: int = 256) -> None:
+        if prompt_format not in get_args(MenuPromptFormat):
+            raise ValueError(f"unknown menu prompt format: {prompt_format}")
+
+        self.prompt_format = prompt_format
+        self.max_cached = max_cached
+        self._overlay_blocks: OrderedDict[tuple[ItemCategory, str], RenderedCategory] = OrderedDict()
+
+    def render(
+        self,
+        items_by_category: Mapping[ItemCategory, tuple[MenuItem, ...]],
+        categories: tuple[ItemCategory, ...],
+        options: str = "",
+    ) -> RenderedMenu:
+        rendered = tuple(
+            self._render_category(category, items_by_category[category])
+            for category in categories
+        )
+        menu = self._assemble(rendered, options)
+
+        for block in rendered:
+            logger.info(
+                "menu prompt %s: %d bytes, ~%d tokens",
+                block.category,
+                block.size_bytes,
+                block.approx_tokens,
+            )
+        logger.info("menu prompt %s: %d bytes total", menu.version, menu.size_bytes)
+        return menu
+
+    def render_overlay(
+        self,
+        base: RenderedMenu,
+        items_by_category: Mapping[ItemCategory, tuple[MenuItem, ...]],
+        changed: set[ItemCategory],
+    ) -> RenderedMenu:
+        """
+        Renders a variant of `base` (e.g. a store's prices) where only the
+        `changed` categories differ. The other blocks are shared with `base`.
+        """
+        rendered = tuple(
+            self._render_overlay_category(block.category, items_by_category[block.category])
+            if block.category in changed
+            else block
+            for block in base.categories
+        )
+        return self._assemble(rendered, base.options)
+
+    def render_index(
+        self,
+        items_by_category: Mapping[ItemCategory, tuple[MenuItem, ...]],
+        categories: tuple[ItemCategory, ...],
+    ) -> RenderedMenu:
+        """
+        Renders only the list of categories, for the "retrieval" context mode
+        where items are looked up through `search_menu` (item options
+        included). Its size doesn't grow with the menu.
+        """
+        lines = ["# Menu categories:"]
+        for category in categories:
+            item_count = len({item.id for item in items_by_category[category]})
+            lines.append(f"  - {CATEGORY_TITLES.get(category, category)}: {item_count} items")
+
+        index_text = "\n".join(lines)
+        instructions = "\n\n".join([COMMON_INSTRUCTIONS, RETRIEVAL_INSTRUCTIONS, index_text])
+        version = hashlib.blake2b(
+            "".join(
+                ["retrieval", *(items_digest(items_by_category[c]) for c in categories)]
+            ).encode(),
+            digest_size=8,
+        ).hexdigest()
+        menu = RenderedMenu(version=version, instructions=instructions + "\n\n", categories=())
+        logger.info("menu prompt %s: %d bytes total (category index only)", version, menu.size_bytes)
+        return menu
+
+    def _assemble(self, rendered: tuple[RenderedCategory, ...], options: str = "") -> RenderedMenu:
+        version = hashlib.blake2b(
+            "".join([self.prompt_format, *(block.digest for block in rendered), options]).encode(),
+            digest_size=8,
+        ).hexdigest()
+        instructions = "\n\n".join(
+            [COMMON_INSTRUCTIONS, *(block.text for block in rendered), *([options] if options else [])]
+        )
+        return RenderedMenu(
+            version=version, instructions=instructions + "\n\n", categories=rendered, options=options
+        )
+
+    def _render_overlay_category(
+        self, category: ItemCategory, items: tuple[MenuItem, ...]
+    ) -> RenderedCategory:
+        key = (category, items_digest(items))
+        block = self._overlay_blocks.get(key)
+        if block is not None:
+            self._overlay_blocks.move_to_end(key)
+            return block
+
+        block = self._overlay_blocks[key] = self._render_category(category, items, key[1])
+        if len(self._overlay_blocks) > self.max_cached:
+            self._overlay_blocks.popitem(last=False)
+        return block
+
+    def _render_category(
+        self, category: ItemCategory, items: tuple[MenuItem, ...], digest: str | None = None
+    ) -> RenderedCategory:
+        digest = digest or items_digest(items)
+        text = menu_instructions(category, items=list(items), prompt_format=self.prompt_format)
+        return RenderedCategory(
+            category=category, digest=digest, text=text, size_bytes=len(text.encode())
+        )
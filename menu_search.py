@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import heapq
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterable, Mapping, Sequence
+
+from database import CATEGORY_TITLES, MenuItem
+
+# field -> weight of a token match in that field
+FIELD_WEIGHTS = {
+    "id": 3.0,
+    "name": 3.0,
+    "voice_alias": 3.0,
+    "ingredients": 1.0,
+    "category": 0.5,
+}
+
+_ARABIC_DIACRITICS = re.compile("[\u064b-\u0652\u0640]")
+_ARABIC_LETTERS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي", "ة": "ه"})
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercases and folds the Arabic spelling variants speech-to-text mixes up."""
+    return _ARABIC_DIACRITICS.sub("", text.lower()).translate(_ARABIC_LETTERS)
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(normalize(text))
+
+
+class MenuSearchIndex:
+    """
+    In-memory inverted index over item ids, names, voice aliases,
+    ingredients and categories. Arabic and English text share the same token space.
+
+    Query tokens are matched exactly and, from 3 characters on, as prefixes
+    of indexed tokens. Rare tokens are scored first, and at most
+    `max_postings` postings are visited per query, so lookups stay fast on
+    large menus where words like "mozzarella" match most items.
+    """
+
+    def __init__(self, items: Iterable[MenuItem], *, max_postings: int = 1024) -> None:
+        self.max_postings = max_postings
+        item_ids: list[str] = []
+        doc_by_id: dict[str, int] = {}
+        postings: defaultdict[str, dict[int, float]] = defaultdict(dict)
+
+        for item in items:
+            # size variants of the same item share one document
+            if item.id in doc_by_id:
+                continue
+            doc = doc_by_id[item.id] = len(item_ids)
+            item_ids.append(item.id)
+
+            fields = {
+                "id": item.id.replace("_", " "),
+                "name": item.name,
+                "voice_alias": item.voice_alias or "",
+                "ingredients": item.ingredients or "",
+                "category": f"{item.category} {CATEGORY_TITLES.get(item.category, '')}",
+            }
+            for field, text in fields.items():
+                for token in tokenize(text):
+                    doc_weights = postings[token]
+                    doc_weights[doc] = max(doc_weights.get(doc, 0.0), FIELD_WEIGHTS[field])
+
+        self.item_ids: Sequence[str] = item_ids
+        # token -> (doc, weight) in doc order
+        self.postings: Mapping[str, Sequence[tuple[int, float]]] = {
+            token: tuple(doc_weights.items()) for token, doc_weights in postings.items()
+        }
+        # the tokens, sorted for prefix matches
+        self.vocabulary: Sequence[str] = sorted(self.postings)
+
+    @classmethod
+    def from_tables(
+        cls,
+        item_ids: Sequence[str],
+        postings: Mapping[str, Sequence[tuple[int, float]]],
+        vocabulary: Sequence[str],
+        *,
+        max_postings: int = 1024,
+    ) -> MenuSearchIndex:
+        """An index over tables built earlier, e.g. mapped from a menu file."""
+        index = cls.__new__(cls)
+        index.max_postings = max_postings
+        index.item_ids = item_ids
+        index.postings = postings
+        index.vocabulary = vocabulary
+        return index
+
+    def search(self, query: str, *, k: int = 5) -> list[str]:
+        """Returns the ids of the `k` best matching items, best first."""
+        matches: list[tuple[int, str, float]] = []
+        for token in set(tokenize(query)):
+            if token in self.postings:
+                matches.append((len(self.postings[token]), token, 1.0))
+            if len(token) >= 3:
+                # prefix matches ("marg" -> "margherita") count for a bit less
+                for prefix_match in self._prefix_matches(token):
+                    matches.append((len(self.postings[prefix_match]), prefix_match, 0.5))
+
+        scores: defaultdict[int, float] = defaultdict(float)
+        budget = self.max_postings
+        for df, token, factor in sorted(matches):
+            if budget <= 0:
+                break
+            # rarer tokens say more about the item
+            idf = factor / df
+            for doc, weight in self.postings[token][:budget]:
+                scores[doc] += weight * idf
+            budget -= df
+
+        best = heapq.nlargest(k, scores.items(), key=lambda entry: entry[1])
+        return [self.item_ids[doc] for doc, _ in best]
+
+    def _prefix_matches(self, prefix: str, limit: int = 16) -> list[str]:
+        start = bisect_left(self.vocabulary, prefix)
+        found = []
+        for token in self.vocabulary[start : start + limit + 1]:
+            if not token.startswith(prefix):
+                break
+            if token != prefix:
+                found.append(token)
+        return found
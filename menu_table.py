@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from array import array
+from typing import Any, Iterable, Iterator, Sequence, get_args, overload
+
+from database import ItemCategory, ItemSize, MenuItem
+
+CATEGORIES: tuple[ItemCategory, ...] = get_args(ItemCategory)
+_CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORIES)}
+NO_STRING = 0xFFFFFFFF
+
+_FIELDS = tuple(MenuItem.model_fields)
+
+
+class MenuTable(Sequence["MenuRow"]):
+    """
+    Columnar storage of menu items: every distinct string is stored once
+    (a three-size pizza shares its name and ingredients), prices sit in an
+    `array`, availability in a bitmap and categories as one-byte codes. Rows
+    are exposed as `MenuRow` views.
+    """
+
+    def __init__(self) -> None:
+        self._strings: list[str] = []
+        self._string_index: dict[str, int] = {}
+        self._ids = array("I")
+        self._names = array("I")
+        self._ingredients = array("I")
+        self._voice_aliases = array("I")
+        self._sizes = array("I")
+        self._prices = array("d")
+        self._available = bytearray()
+        self._categories = array("B")
+        self._rows: list[MenuRow] = []
+
+    @classmethod
+    def from_items(cls, items: Iterable[MenuItem]) -> MenuTable:
+        table = cls()
+        for item in items:
+            table.append(
+                id=item.id,
+                name=item.name,
+                price=item.price,
+                ingredients=item.ingredients,
+                available=item.available,
+                size=item.size,
+                voice_alias=item.voice_alias,
+                category=item.category,
+            )
+        return table
+
+    def append(
+        self,
+        *,
+        id: str,
+        name: str,
+        price: float,
+        available: bool,
+        category: ItemCategory,
+        ingredients: str | None = None,
+        size: ItemSize | None = None,
+        voice_alias: str | None = None,
+    ) -> MenuRow:
+        index = len(self._rows)
+        self._ids.append(self._ref(id))
+        self._names.append(self._ref(name))
+        self._ingredients.append(self._ref(ingredients))
+        self._voice_aliases.append(self._ref(voice_alias))
+        self._sizes.append(self._ref(size))
+        self._prices.append(price)
+        if index % 8 == 0:
+            self._available.append(0)
+        if available:
+            self._available[index >> 3] |= 1 << (index & 7)
+        self._categories.append(_CATEGORY_CODES[category])
+
+        row = MenuRow(self, index)
+        self._rows.append(row)
+        return row
+
+    def _ref(self, text: str | None) -> int:
+        if text is None:
+            return NO_STRING
+        ref = self._string_index.get(text)
+        if ref is None:
+            ref = self._string_index[text] = len(self._strings)
+            self._strings.append(text)
+        return ref
+
+    def _string(self, ref: int) -> str | None:
+        return None if ref == NO_STRING else self._strings[ref]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @overload
+    def __getitem__(self, index: int) -> MenuRow: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[MenuRow]: ...
+
+    def __getitem__(self, index):
+        return self._rows[index]
+
+    def __iter__(self) -> Iterator[MenuRow]:
+        return iter(self._rows)
+
+
+class MenuRow:
+    """
+    One row of a `MenuTable`, read like a `MenuItem` (same attributes, equal
+    to the `MenuItem` with the same fields). `model_copy` returns a real
+    `MenuItem`, e.g. for a store's own prices.
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: MenuTable, index: int) -> None:
+        self._table = table
+        self._index = index
+
+    @property
+    def id(self) -> str:
+        return self._table._strings[self._table._ids[self._index]]
+
+    @property
+    def name(self) -> str:
+        return self._table._strings[self._table._names[self._index]]
+
+    @property
+    def price(self) -> float:
+        return self._table._prices[self._index]
+
+    @property
+    def ingredients(self) -> str | None:
+        return self._table._string(self._table._ingredients[self._index])
+
+    @property
+    def available(self) -> bool:
+        return bool(self._table._available[self._index >> 3] >> (self._index & 7) & 1)
+
+    @property
+    def size(self) -> ItemSize | None:
+        return self._table._string(self._table._sizes[self._index])
+
+    @property
+    def voice_alias(self) -> str | None:
+        return self._table._string(self._table._voice_aliases[self._index])
+
+    @property
+    def category(self) -> ItemCategory:
+        return CATEGORIES[self._table._categories[self._index]]
+
+    def model_dump(self) -> dict[str, Any]:
+        return {field: getattr(self, field) for field in _FIELDS}
+
+    def model_copy(self, *, update: dict[str, Any] | None = None) -> MenuItem:
+        return MenuItem.model_construct(**{**self.model_dump(), **(update or {})})
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, field) for field in _FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (MenuRow, MenuItem)):
+            return self._values() == tuple(getattr(other, field) for field in _FIELDS)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._values())
+
+    def __repr__(self) -> str:
+        return "MenuRow(" + ", ".join(f"{field}={getattr(self, field)!r}" for field in _FIELDS) + ")"
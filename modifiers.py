@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Mapping, Sequence
+
+from database import ModifierGroup, describe_modifier_group
+from pricing import to_fils
+
+
+def _normalize(text: str) -> str:
+    return "_".join(text.lower().replace("-", " ").replace("&", " ").split())
+
+
+@dataclass(frozen=True)
+class ChosenModifiers:
+    # option ids in menu order, the same choice always gives the same ids
+    ids: tuple[str, ...] = ()
+    # added to the unit price of the item
+    price_fils: int = 0
+
+
+NO_MODIFIERS = ChosenModifiers()
+
+
+class ItemModifiers:
+    """
+    The modifier groups of one item compiled for validation: every accepted
+    spelling of an option (its id, its name) maps straight to its group,
+    position and price, so a request is checked in a single pass over the
+    requested options, and all of its problems are reported at once.
+    """
+
+    __slots__ = ("groups", "_options", "_ids", "_prices")
+
+    def __init__(self, groups: Sequence[ModifierGroup]) -> None:
+        self.groups = tuple(groups)
+        # spelling -> (group index, option position in the item's options)
+        self._options: dict[str, tuple[int, int]] = {}
+        self._ids: list[str] = []
+        self._prices: list[int] = []
+        for g, group in enumerate(self.groups):
+            for option in group.options:
+                position = len(self._ids)
+                self._ids.append(option.id)
+                self._prices.append(to_fils(option.price))
+                for spelling in (option.id, _normalize(option.id), _normalize(option.name)):
+                    self._options.setdefault(spelling, (g, position))
+
+    def choose(self, requested: Iterable[str]) -> ChosenModifiers:
+        """The options picked by `requested`, raises a `ValueError` describing every problem otherwise."""
+        picked: dict[int, int] = {}
+        counts = [0] * len(self.groups)
+        unknown = []
+        for spelling in requested:
+            found = self._options.get(spelling) or self._options.get(_normalize(spelling))
+            if found is None:
+                unknown.append(spelling)
+            elif found[1] not in picked:
+                picked[found[1]] = found[0]
+                counts[found[0]] += 1
+
+        problems = []
+        if unknown:
+            problems.append(f"unknown option(s) {', '.join(unknown)}, the options are {self.describe()}")
+        for group, count in zip(self.groups, counts):
+            if count < group.min_selections:
+                problems.append(f"missing {describe_modifier_group(group)}")
+            elif count > group.max_selections:
+                problems.append(f"{count} picked from {describe_modifier_group(group)}")
+        if problems:
+            raise ValueError("; ".join(problems))
+
+        positions = sorted(picked)
+        return ChosenModifiers(
+            ids=tuple(self._ids[p] for p in positions),
+            price_fils=sum(self._prices[p] for p in positions),
+        )
+
+    def describe(self) -> str:
+        return "; ".join(describe_modifier_group(group) for group in self.groups)
+
+
+def compile_modifiers(
+    groups_by_item: Mapping[str, Sequence[ModifierGroup]],
+) -> dict[str, ItemModifiers]:
+    # items with the same groups (every pizza) share one compiled instance
+    compiled: dict[tuple[ModifierGroup, ...], ItemModifiers] = {}
+    by_item = {}
+    for item_id, groups in groups_by_item.items():
+        if groups:
+            key = tuple(groups)
+            if key not in compiled:
+                compiled[key] = ItemModifiers(key)
+            by_item[item_id] = compiled[key]
+    return by_item
+
+
+def choose_modifiers(
+    item_modifiers: ItemModifiers | None, requested: Sequence[str] | None
+) -> ChosenModifiers:
+    """Validates `requested` for an item, `item_modifiers` is None when the item has no options."""
+    if item_modifiers is None:
+        if requested:
+            raise ValueError(f"the item has no options, got {', '.join(requested)}")
+        return NO_MODIFIERS
+    return item_modifiers.choose(requested or ())
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from typing import IO
+
+# Snowflake-style layout, 63 bits: | 41 bits ms since EPOCH | 10 bits worker | 12 bits counter |
+EPOCH_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+COUNTER_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_COUNTER = (1 << COUNTER_BITS) - 1
+
+_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# every 2-character base36 pair, so encoding takes one lookup per 2 characters
+_PAIRS = [a + b for a in _ALPHABET for b in _ALPHABET]
+# 36**13 > 2**63, so 13 characters fit any id and keep them sortable as strings
+ID_LENGTH = 13
+
+
+def _base36(n: int) -> str:
+    pairs = []
+    while n:
+        n, pair = divmod(n, 1296)
+        pairs.append(_PAIRS[pair])
+    return "".join(reversed(pairs)).rjust(ID_LENGTH, "0")[-ID_LENGTH:]
+
+
+def decode(id: str) -> int:
+    return int(id, 36)
+
+
+# worker ids are leased by locking one file per id in this directory
+WORKER_ID_DIR = os.getenv("WORKER_ID_DIR") or os.path.join(
+    tempfile.gettempdir(), "cashier-worker-ids"
+)
+
+# the lock files of the ids leased by this process, held open until it exits
+_leases: list[IO[str]] = []
+
+
+def worker_id_pool() -> range:
+    """
+    The worker ids this host's processes lease from, `WORKER_ID_POOL` (e.g.
+    "0-255", all of them by default). Hosts sharing an order sink or a
+    journal need disjoint pools.
+    """
+    first, _, last = (os.getenv("WORKER_ID_POOL") or f"0-{MAX_WORKER_ID}").partition("-")
+    pool = range(int(first), int(last or first) + 1)
+    if not pool or pool.start < 0 or pool.stop - 1 > MAX_WORKER_ID:
+        raise ValueError(f"worker id pool must be within 0-{MAX_WORKER_ID}")
+    return pool
+
+
+def lease_worker_id(directory: str | None = None, pool: range | None = None) -> int:
+    """
+    Takes the first worker id of `pool` no other live process on this host
+    holds. The lease is a lock on the id's file, released by the OS when the
+    process exits, crashes included, so no id is ever held by two processes.
+    """
+    directory = directory or WORKER_ID_DIR
+    pool = pool if pool is not None else worker_id_pool()
+    os.makedirs(directory, exist_ok=True)
+    for worker_id in pool:
+        f = open(os.path.join(directory, f"worker-{worker_id}.lock"), "a", encoding="utf-8")
+        try:
+            # a lock inherited from a forked parent conflicts as well
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            continue
+        _leases.append(f)
+        return worker_id
+    raise RuntimeError(f"every worker id in {pool.start}-{pool.stop - 1} is leased")
+
+
+class IdGenerator:
+    """
+    Issues ids that are unique per worker and strictly increasing, so they
+    are monotonic within every session as well. No randomness is involved:
+    uniqueness comes from the timestamp, the worker id and a counter.
+
+    Without a `worker_id`, one is leased (see `lease_worker_id`) on first
+    use, and again in a process forked after that.
+    """
+
+    def __init__(self, worker_id: int | None = None) -> None:
+        if worker_id is not None and not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker id must be between 0 and {MAX_WORKER_ID}")
+
+        self._fixed_worker_id = worker_id
+        self._worker_id = worker_id
+        # the process `_worker_id` was leased by
+        self._leased_by: int | None = None
+        self._last_ms = 0
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    @property
+    def worker_id(self) -> int:
+        if self._fixed_worker_id is not None:
+            return self._fixed_worker_id
+        if self._leased_by != os.getpid():
+            with self._lock:
+                if self._leased_by != os.getpid():
+                    self._worker_id = lease_worker_id()
+                    self._leased_by = os.getpid()
+        return self._worker_id
+
+    def next_id(self) -> str:
+        return self.next_ids(1)[0]
+
+    def next_ids(self, count: int) -> list[str]:
+        """Reserves `count` consecutive ids at once."""
+        worker_bits = self.worker_id << COUNTER_BITS
+        with self._lock:
+            start_ms, start_counter = self._reserve(count)
+
+        ids = []
+        ms, counter = start_ms, start_counter
+        for _ in range(count):
+            ids.append(
+                _base36(((ms - EPOCH_MS) << (WORKER_BITS + COUNTER_BITS)) | worker_bits | counter)
+            )
+            counter += 1
+            if counter > MAX_COUNTER:
+                ms, counter = ms + 1, 0
+        return ids
+
+    def observe(self, id: str) -> None:
+        """
+        Makes sure later ids sort after `id`, e.g. one read back from the
+        order journal, even if this worker's clock is behind.
+        """
+        value = decode(id)
+        ms = (value >> (WORKER_BITS + COUNTER_BITS)) + EPOCH_MS
+        with self._lock:
+            if ms >= self._last_ms:
+                self._last_ms, self._counter = ms, MAX_COUNTER + 1
+
+    def _reserve(self, count: int) -> tuple[int, int]:
+        # never go back in time; when the counter of the current ms runs out,
+        # borrow the next ms instead of sleeping
+        now = time.time_ns() // 1_000_000
+        if now > self._last_ms:
+            self._last_ms, self._counter = now, 0
+        elif self._counter > MAX_COUNTER:
+            self._last_ms, self._counter = self._last_ms + 1, 0
+
+        start = (self._last_ms, self._counter)
+        total = self._counter + count
+        self._last_ms += total // (MAX_COUNTER + 1)
+        self._counter = total % (MAX_COUNTER + 1)
+        return start
+
+
+def _configured_worker_id() -> int | None:
+    # WORKER_ID pins the id, for a host that runs a single process; job
+    # processes lease theirs from the pool otherwise
+    worker_id = os.getenv("WORKER_ID")
+    return int(worker_id) if worker_id else None
+
+
+ids = IdGenerator(_configured_worker_id())
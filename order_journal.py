@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Iterator
+
+from order_ids import ids
+from recipt_state import ORDER_ID_PREFIX, OrderState
+
+logger = logging.getLogger(__name__)
+
+# record layout, one JSON object per line:
+#   {"s": session, "op": "add", "o": order uid, "id": line id, "item": ..., "size": ..., "q": qty, "p": unit price in fils}
+#   {"s": session, "op": "inc" | "dec", "id": line id, "q": qty}
+#   {"s": session, "op": "close"}
+# every record also carries "n", an id from `order_ids` issued when it was
+# appended: unique across workers, and it sorts in the order the records of a
+# session were appended, whichever segment they ended up in
+JournalRecord = dict[str, Any]
+
+SEGMENT_PATTERN = "orders-*.jsonl"
+# the records of closed orders, moved out of the journal by `compact_journal`
+# and only read offline (e.g. by suggestions.py), never replayed on job start
+HISTORY_PATTERN = "history-*.jsonl"
+
+
+class OrderJournal:
+    """
+    Append-only log of every order change on this worker, in JSONL segment
+    files under `directory`. The segment being written is locked, so
+    `compact_journal` running in another process leaves it alone.
+
+    With `group_commit` (the default), `append` only queues the record and a
+    background thread writes and fsyncs whatever accumulated every
+    `commit_interval` seconds, so the event loop never waits on the disk.
+    Without it, every append is written and fsynced before returning.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        group_commit: bool = True,
+        commit_interval: float = 0.05,
+        segment_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.group_commit = group_commit
+        self.commit_interval = commit_interval
+        self.segment_bytes = segment_bytes
+
+        self._pending: list[JournalRecord] = []
+        self._lock = threading.Lock()
+        # held while writing: jobs flush from their own threads, alongside the flusher
+        self._write_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._file = self._open_segment()
+
+        self._flusher: threading.Thread | None = None
+        if group_commit:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="order-journal", daemon=True
+            )
+            self._flusher.start()
+
+    def append(self, record: JournalRecord) -> None:
+        record["n"] = ids.next_id()
+        if not self.group_commit:
+            with self._write_lock:
+                self._write([record])
+            return
+
+        with self._lock:
+            self._pending.append(record)
+
+    def flush(self) -> None:
+        """Writes and fsyncs everything appended so far."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if pending:
+                self._write(pending)
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._file.close()
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.commit_interval):
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("failed to write the order journal")
+
+    def _write(self, records: list[JournalRecord]) -> None:
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if self._file.tell() >= self.segment_bytes:
+            self._file.close()
+            self._file = self._open_segment()
+
+    def _open_segment(self):
+        # created under a temporary name and locked before it is renamed into
+        # place, so a compaction never sees it unlocked
+        name = f"orders-{time.time_ns():020d}-{os.getpid()}.jsonl"
+        path = os.path.join(self.directory, name)
+        f = open(path + ".tmp", "a", encoding="utf-8")
+        fcntl.flock(f, fcntl.LOCK_EX)
+        os.replace(path + ".tmp", path)
+        return f
+
+
+def _read_segment(path: str) -> Iterator[JournalRecord]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # a torn write at the tail of a segment from a crash
+                logger.warning("skipping a corrupt record in %s", path)
+
+
+def read_journal(directory: str, *, history: bool = False) -> list[JournalRecord]:
+    """
+    Every record in the journal, in the order they were appended. With
+    `history`, the closed orders that compactions moved out are included.
+    """
+    patterns = (HISTORY_PATTERN, SEGMENT_PATTERN) if history else (SEGMENT_PATTERN,)
+    while True:
+        # records written before they were numbered come first, in file order
+        unnumbered: list[JournalRecord] = []
+        records: dict[str, JournalRecord] = {}
+        try:
+            paths = [path for pattern in patterns for path in sorted(glob.glob(os.path.join(directory, pattern)))]
+            for path in paths:
+                for record in _read_segment(path):
+                    if "n" not in record:
+                        unnumbered.append(record)
+                    else:
+                        # a crashed compaction can leave a record in two segments
+                        records[record["n"]] = record
+        except FileNotFoundError:
+            # compacted while reading, its records moved to a newer segment
+            continue
+        return unnumbered + [records[n] for n in sorted(records)]
+
+
+def recover_order(directory: str, session_id: str) -> OrderState | None:
+    """
+    Rebuilds the order of a session that didn't finish, e.g. after the
+    worker died mid-call. Returns None when there is nothing to recover.
+    """
+    order = OrderState()
+    found = False
+    for record in read_journal(directory):
+        if record.get("s") != session_id:
+            continue
+        found = True
+        _observe(record, "n", "o", "id")
+        op = record["op"]
+        if op == "add":
+            order.order_uid = record.get("o", order.order_uid)
+            order.restore_line(
+                record["id"],
+                record["item"],
+                record["size"],
+                record["q"],
+                record["p"],
+                tuple(record.get("m", ())),
+                record.get("mp", 0),
+            )
+        elif op in ("inc", "dec"):
+            if order.get(record["id"]) is None:
+                # its add was lost, e.g. in a torn write
+                logger.warning("skipping a change to unknown line %s of %s", record["id"], session_id)
+                continue
+            order.restore_quantity(record["id"], record["q"] if op == "inc" else -record["q"])
+        elif op == "close":
+            order, found = OrderState(), False
+
+    return order if found else None
+
+
+def compact_journal(directory: str) -> None:
+    """
+    Rewrites the segments no worker is writing anymore into one, keeping
+    only the records of orders that weren't closed, so the journal (and the
+    replay on every job start) only grows with unfinished orders. The
+    records of closed orders move to a new history segment.
+    """
+    locked = []
+    try:
+        for path in sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN))):
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # still being written, or compacted by another worker
+                f.close()
+                continue
+            locked.append((path, f))
+        if not locked:
+            return
+
+        sessions: dict[str, list[JournalRecord]] = {}
+        for path, _ in locked:
+            for record in _read_segment(path):
+                _observe(record, "n", "o", "id")
+                sessions.setdefault(record.get("s", ""), []).append(record)
+
+        kept, closed = [], []
+        for records in sessions.values():
+            records.sort(key=lambda record: record.get("n", ""))
+            last_close = max(
+                (i for i, record in enumerate(records) if record["op"] == "close"), default=-1
+            )
+            closed += records[: last_close + 1]
+            kept += records[last_close + 1 :]
+
+        # the new segments are in place before the old ones go, readers that
+        # see both drop the duplicates
+        if closed:
+            _write_segment(directory, "history", closed)
+        if kept:
+            _write_segment(directory, "orders", kept)
+        for old_path, _ in locked:
+            os.unlink(old_path)
+        logger.info(
+            "compacted %d journal segments, %d of %d sessions still open",
+            len(locked),
+            len({record["s"] for record in kept}),
+            len(sessions),
+        )
+    finally:
+        for _, f in locked:
+            f.close()
+
+
+def _write_segment(directory: str, prefix: str, records: list[JournalRecord]) -> None:
+    path = os.path.join(directory, f"{prefix}-{time.time_ns():020d}-{os.getpid()}.jsonl")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def seed_ids(directory: str) -> None:
+    """
+    Makes new ids sort after every id in the newest segment, so a restarted
+    worker that lands on the same worker id can't reissue one even if the
+    clock went backwards.
+    """
+    segments = sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+    if not segments:
+        return
+    try:
+        for record in _read_segment(segments[-1]):
+            _observe(record, "n", "o", "id")
+    except FileNotFoundError:
+        pass
+
+
+def _observe(record: JournalRecord, *keys: str) -> None:
+    for key in keys:
+        value = record.get(key)
+        if not isinstance(value, str):
+            continue
+        if value.startswith(ORDER_ID_PREFIX):
+            value = value[len(ORDER_ID_PREFIX) :]
+        try:
+            ids.observe(value)
+        except ValueError:
+            pass
+
+
+_journal: OrderJournal | None = None
+
+
+def get_journal() -> OrderJournal | None:
+    """
+    Returns the process-wide journal when `ORDER_JOURNAL_DIR` is set,
+    compacting what previous workers left behind first. It stays open for
+    every job of the process and is closed when the process exits; jobs
+    `flush` it when they end.
+    """
+    global _journal
+    if _journal is None and (directory := os.getenv("ORDER_JOURNAL_DIR")):
+        os.makedirs(directory, exist_ok=True)
+        compact_journal(directory)
+        seed_ids(directory)
+        _journal = OrderJournal(directory)
+        atexit.register(close_journal)
+    return _journal
+
+
+def close_journal() -> None:
+    """Writes out the last records and closes the process-wide journal, if open."""
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
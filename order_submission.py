@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from typing import Protocol
+
+import aiohttp
+
+from recipt_state import OrderState
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SubmittedOrder:
+    # the same for every submission of an order, amended ones included
+    idempotency_key: str
+    order_uid: str
+    # bumped on every change to the order, the highest one is the current order
+    revision: int
+    session_id: str
+    # (item_id, size, quantity, unit price in fils with the options, option ids)
+    lines: tuple[tuple[str, str | None, int, int, tuple[str, ...]], ...]
+    total_fils: int
+    submitted_at: float
+    # (deal_id, savings in fils) of the deals in `total_fils`
+    deals: tuple[tuple[str, int], ...] = ()
+
+    @classmethod
+    def from_order(cls, order: OrderState) -> SubmittedOrder:
+        return cls(
+            idempotency_key=order.order_uid,
+            order_uid=order.order_uid,
+            revision=order.revision,
+            session_id=order.session_id,
+            lines=tuple(
+                (line.item_id, line.size, line.quantity, line.unit_price_fils, line.modifiers)
+                for line in order.lines.values()
+            ),
+            total_fils=order.totals.total_fils,
+            submitted_at=time.time(),
+            deals=tuple((combo.deal_id, combo.savings_fils) for combo in order.combos()),
+        )
+
+
+class OrderSink(Protocol):
+    async def submit(self, orders: list[SubmittedOrder]) -> None:
+        """
+        Delivers a batch, raising on failure. Orders with the same
+        `idempotency_key` are one order: a higher `revision` replaces it (the
+        customer amended it), the same or a lower one is a redelivery to drop.
+        """
+        ...
+
+
+class FileSpoolSink:
+    """
+    Appends batches to a JSONL spool file for the POS to pick up. Revisions
+    already spooled by this process are skipped; the POS applies the same
+    rule as `OrderSink` for those spooled by other processes.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # idempotency key -> highest revision written
+        self._revisions: dict[str, int] = {}
+
+    async def submit(self, orders: list[SubmittedOrder]) -> None:
+        await asyncio.to_thread(self._write, orders)
+
+    def _write(self, orders: list[SubmittedOrder]) -> None:
+        new = []
+        for order in orders:
+            if order.revision > self._revisions.get(order.idempotency_key, -1):
+                new.append(order)
+                self._revisions[order.idempotency_key] = order.revision
+        if not new:
+            return
+
+        data = "".join(json.dumps(asdict(order)) + "\n" for order in new)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class SqliteSink:
+    """
+    Stores one row per order in SQLite, replaced by higher revisions;
+    redelivered and older revisions are ignored.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS submitted_orders ("
+            "idempotency_key TEXT PRIMARY KEY, order_uid TEXT, revision INTEGER, session_id TEXT,"
+            " total_fils INTEGER, submitted_at REAL, lines TEXT)"
+        )
+        self._lock = asyncio.Lock()
+
+    async def submit(self, orders: list[SubmittedOrder]) -> None:
+        # one writer at a time, sqlite connections aren't safe to share concurrently
+        async with self._lock:
+            await asyncio.to_thread(self._write, orders)
+
+    def _write(self, orders: list[SubmittedOrder]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO submitted_orders VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (idempotency_key) DO UPDATE SET"
+                " revision = excluded.revision, total_fils = excluded.total_fils,"
+                " submitted_at = excluded.submitted_at, lines = excluded.lines"
+                " WHERE excluded.revision > submitted_orders.revision",
+                [
+                    (
+                        order.idempotency_key,
+                        order.order_uid,
+                        order.revision,
+                        order.session_id,
+                        order.total_fils,
+                        order.submitted_at,
+                        json.dumps(order.lines),
+                    )
+                    for order in orders
+                ],
+            )
+
+
+class HttpSink:
+    """POSTs batches as JSON, each order carries its idempotency key and revision."""
+
+    def __init__(self, url: str, *, timeout: float = 5.0) -> None:
+        self.url = url
+        self.timeout = timeout
+        self._session: aiohttp.ClientSession | None = None
+
+    async def submit(self, orders: list[SubmittedOrder]) -> None:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        async with self._session.post(
+            self.url, json={"orders": [asdict(order) for order in orders]}
+        ) as resp:
+            resp.raise_for_status()
+
+    async def aclose(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class OrderSubmitter:
+    """
+    Streams finalized orders from every session on the worker to a sink.
+
+    `submit` only puts the order on a bounded queue; a background task pulls
+    batches of up to `max_batch` orders (waiting at most `max_delay` to fill
+    one) and delivers them with exponential backoff. When the sink falls
+    behind, the queue fills up and `submit` waits, which pushes back on the
+    callers instead of growing memory.
+
+    Each `submit` returns a future of that order's delivery, so a session
+    can wait for its own orders while `drain` waits for everyone's.
+    """
+
+    def __init__(
+        self,
+        sink: OrderSink,
+        *,
+        max_queue: int = 10_000,
+        max_batch: int = 200,
+        max_delay: float = 0.05,
+        max_attempts: int = 5,
+        retry_backoff: float = 0.2,
+    ) -> None:
+        self.sink = sink
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._queue: asyncio.Queue[tuple[SubmittedOrder, asyncio.Future[bool]]] = asyncio.Queue(max_queue)
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="order-submitter")
+
+    async def submit(self, order: SubmittedOrder) -> asyncio.Future[bool]:
+        """Queues `order`, the future is True once it is delivered, False if it was given up on."""
+        delivered = asyncio.get_running_loop().create_future()
+        await self._queue.put((order, delivered))
+        return delivered
+
+    async def drain(self) -> None:
+        """Waits until everything submitted so far was delivered (or given up on)."""
+        await self._queue.join()
+
+    async def aclose(self) -> None:
+        await self.drain()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+            delivered = await self._deliver([order for order, _ in batch])
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(delivered)
+                self._queue.task_done()
+
+    async def _deliver(self, batch: list[SubmittedOrder]) -> bool:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.sink.submit(batch)
+                return True
+            except Exception:
+                if attempt == self.max_attempts:
+                    # the orders are still in the order journal when it is enabled
+                    logger.exception(
+                        "giving up on %d orders: %s",
+                        len(batch),
+                        ", ".join(f"{order.idempotency_key}@{order.revision}" for order in batch),
+                    )
+                    return False
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+
+def sink_from_url(url: str) -> OrderSink:
+    """`spool:<path>`, `sqlite:<path>` or an `http(s)://` endpoint."""
+    scheme, _, path = url.partition(":")
+    if scheme == "spool":
+        return FileSpoolSink(path)
+    if scheme == "sqlite":
+        return SqliteSink(path)
+    if scheme in ("http", "https"):
+        return HttpSink(url)
+    raise ValueError(f"unsupported order sink: {url}")
+
+
+_submitter: OrderSubmitter | None = None
+
+
+def get_submitter() -> OrderSubmitter | None:
+    """
+    Returns the process-wide submitter when `ORDER_SINK` is set, started on the
+    running loop.
+    """
+    global _submitter
+    if _submitter is None and (url := os.getenv("ORDER_SINK")):
+        _submitter = OrderSubmitter(sink_from_url(url))
+        _submitter.start()
+    return _submitter
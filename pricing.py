@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+FILS_PER_AED = 100
+
+
+def to_fils(aed: float) -> int:
+    """Menu prices are floats in AED, every amount in an order is integer fils."""
+    return round(aed * FILS_PER_AED)
+
+
+def format_aed(fils: int) -> str:
+    sign = "-" if fils < 0 else ""
+    return f"{sign}AED {abs(fils) // FILS_PER_AED}.{abs(fils) % FILS_PER_AED:02d}"
+
+
+@dataclass(frozen=True)
+class PricingPolicy:
+    # UAE VAT is 5%, in basis points to keep the math in integers
+    vat_bps: int = 500
+    # menu prices are shown to customers VAT-inclusive
+    prices_include_vat: bool = True
+
+    def totals(self, subtotal_fils: int) -> OrderTotals:
+        if self.prices_include_vat:
+            # VAT part of a gross amount: gross * r / (1 + r), rounded half up
+            vat = (subtotal_fils * self.vat_bps * 2 + 10_000 + self.vat_bps) // (
+                2 * (10_000 + self.vat_bps)
+            )
+            return OrderTotals(subtotal_fils=subtotal_fils - vat, vat_fils=vat, total_fils=subtotal_fils)
+
+        vat = (subtotal_fils * self.vat_bps + 5_000) // 10_000
+        return OrderTotals(subtotal_fils=subtotal_fils, vat_fils=vat, total_fils=subtotal_fils + vat)
+
+
+@dataclass(frozen=True)
+class OrderTotals:
+    subtotal_fils: int
+    vat_fils: int
+    total_fils: int
+
+    def describe(self, vat_bps: int) -> str:
+        return (
+            f"Subtotal: {format_aed(self.subtotal_fils)}\n"
+            f"VAT {vat_bps / 100:g}%: {format_aed(self.vat_fils)}\n"
+            f"Total: {format_aed(self.total_fils)}"
+        )
+
+
+DEFAULT_PRICING = PricingPolicy()
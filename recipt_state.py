@@ -1,41 +1,302 @@
 from __future__ import annotations
 
-import secrets
-import string
-from dataclasses import dataclass
-from typing import Annotated, Literal, Union
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Annotated, Iterator, Literal, Union
 
 from pydantic import BaseModel, Field
 
+from order_ids import ids
+from pricing import DEFAULT_PRICING, OrderTotals, PricingPolicy, format_aed
+
+if TYPE_CHECKING:
+    from deals import DealEngine, DealTracker
+    from order_journal import OrderJournal
+
+
+ORDER_ID_PREFIX = "O_"
+
 
 def order_uid() -> str:
-    alphabet = string.ascii_uppercase + string.digits  # b36
-    return "O_" + "".join(secrets.choice(alphabet) for _ in range(6))
+    # base36, never contains UNIT_SEPARATOR
+    return ORDER_ID_PREFIX + ids.next_id()
 
 
+# a single unit of a line is addressed as "<line order_id>#<n>", n starting at 1
+UNIT_SEPARATOR = "#"
 
 
 class OrderedRegular(BaseModel):
     type: Literal["regular"] = "regular"
     order_id: str = Field(default_factory=order_uid)
     item_id: str
-    size: Literal["S", "M", "L"] | None = None
+    # menu sizes go beyond S/M/L ("Can", "8 Pieces", ...)
+    size: str | None = None
+    quantity: int = 1
+    # option ids, see `modifiers.ItemModifiers`
+    modifiers: list[str] = Field(default_factory=list)
+
+
+class OrderedCombo(BaseModel):
+    """A deal applied to units of the order's lines, which stay as they are."""
+
+    type: Literal["combo"] = "combo"
+    deal_id: str
+    name: str
+    components: list[OrderedRegular]
+    price_fils: int
+    savings_fils: int
 
 
 OrderedItem = Annotated[
-    Union[OrderedRegular], Field(discriminator="type")
+    Union[OrderedRegular, OrderedCombo], Field(discriminator="type")
 ]
 
 
+# (item_id, size, modifier ids), the same item with other options is another line
+LineKey = tuple[str, "str | None", tuple[str, ...]]
+
+
+class OrderLine:
+    """All units of the same `(item_id, size, modifiers)` in an order."""
+
+    __slots__ = ("order_id", "item_id", "size", "quantity", "unit_price_fils", "modifiers", "modifier_fils")
+
+    def __init__(
+        self,
+        order_id: str,
+        item_id: str,
+        size: str | None,
+        quantity: int,
+        unit_price_fils: int,
+        modifiers: tuple[str, ...] = (),
+        modifier_fils: int = 0,
+    ) -> None:
+        self.order_id = order_id
+        self.item_id = item_id
+        self.size = size
+        self.quantity = quantity
+        # modifiers included, `modifier_fils` of it is theirs
+        self.unit_price_fils = unit_price_fils
+        self.modifiers = modifiers
+        self.modifier_fils = modifier_fils
+
+    @property
+    def key(self) -> LineKey:
+        return (self.item_id, self.size, self.modifiers)
+
+    def view(self, order_id: str | None = None, quantity: int | None = None) -> OrderedRegular:
+        return OrderedRegular(
+            order_id=order_id or self.order_id,
+            item_id=self.item_id,
+            size=self.size,
+            quantity=self.quantity if quantity is None else quantity,
+            modifiers=list(self.modifiers),
+        )
+
+    def label(self) -> str:
+        label = f"{self.item_id} ({self.size})" if self.size else self.item_id
+        return f"{label} with {', '.join(self.modifiers)}" if self.modifiers else label
+
+    def describe(self) -> str:
+        return f"{self.order_id}: {self.quantity} x {self.label()}"
+
+    def receipt_row(self) -> str:
+        return f"{self.quantity} x {self.label()} @ {format_aed(self.unit_price_fils)} = {format_aed(self.quantity * self.unit_price_fils)}"
+
+
 @dataclass
 class OrderState:
-    items: dict[str, OrderedItem]
+    lines: dict[LineKey, OrderLine] = field(default_factory=dict)
+    pricing: PricingPolicy = DEFAULT_PRICING
+    # every change is appended to the journal so the order survives a crash
+    journal: OrderJournal | None = None
+    session_id: str = ""
+    order_uid: str = field(default_factory=order_uid)
+    # bumped on every change, tells submitted snapshots of the same order apart
+    revision: int = 0
+    # kept up to date on every change, never recomputed from the lines
+    subtotal_fils: int = 0
+    unit_count: int = 0
+    # the best deals for the current lines, see `use_deals`
+    deals: DealTracker | None = None
+    _lines_by_id: dict[str, OrderLine] = field(default_factory=dict, repr=False)
+    # rendered receipt rows by line order_id, None until (re-)rendered
+    _receipt_rows: dict[str, str | None] = field(default_factory=dict, repr=False)
+
+    def use_deals(self, engine: DealEngine) -> None:
+        """
+        Applies `engine`'s deals to the order from now on, the lines already
+        in it (e.g. recovered from the journal) included. Deals follow from
+        the lines, so they are never journaled.
+        """
+        self.deals = engine.tracker()
+        for line in self.lines.values():
+            self._update_deals(line, line.quantity)
 
-    async def add(self, item: OrderedItem) -> None:
-        self.items[item.order_id] = item
+    @property
+    def discount_fils(self) -> int:
+        return self.deals.savings_fils if self.deals is not None else 0
+
+    @property
+    def totals(self) -> OrderTotals:
+        return self.pricing.totals(self.subtotal_fils - self.discount_fils)
+
+    def combos(self) -> list[OrderedCombo]:
+        if self.deals is None:
+            return []
+        return [
+            OrderedCombo(
+                deal_id=applied.deal.deal_id,
+                name=applied.deal.name,
+                components=[self.lines[key].view(quantity=units) for key, units in applied.units],
+                price_fils=applied.deal.price_fils,
+                savings_fils=applied.savings_fils,
+            )
+            for applied in self.deals.match.applied
+        ]
+
+    def receipt(self) -> str:
+        rows = self._receipt_rows
+        for order_id, row in rows.items():
+            if row is None:
+                rows[order_id] = self._lines_by_id[order_id].receipt_row()
+        deal_rows = [
+            f"{combo.name} @ {format_aed(combo.price_fils)}: {format_aed(-combo.savings_fils)}"
+            for combo in self.combos()
+        ]
+        return "\n".join([*rows.values(), *deal_rows, self.totals.describe(self.pricing.vat_bps)])
+
+    @property
+    def items(self) -> dict[str, OrderedItem]:
+        """Per-unit view, one entry per unit keyed by its unit order_id."""
+        return dict(self.units())
+
+    def units(self) -> Iterator[tuple[str, OrderedItem]]:
+        for line in self.lines.values():
+            for n in range(1, line.quantity + 1):
+                unit_id = f"{line.order_id}{UNIT_SEPARATOR}{n}"
+                yield unit_id, line.view(unit_id, quantity=1)
+
+    async def add(
+        self,
+        item_id: str,
+        size: str | None = None,
+        *,
+        quantity: int = 1,
+        unit_price_fils: int = 0,
+        modifiers: tuple[str, ...] = (),
+        modifier_fils: int = 0,
+    ) -> OrderLine:
+        """`unit_price_fils` includes the `modifier_fils` of the options."""
+        line = self.lines.get((item_id, size, modifiers))
+        if line is not None:
+            return await self.increment(line.order_id, quantity)
+
+        line = self.restore_line(
+            order_uid(), item_id, size, quantity, unit_price_fils, modifiers, modifier_fils
+        )
+        self._log(
+            op="add",
+            o=self.order_uid,
+            id=line.order_id,
+            item=item_id,
+            size=size,
+            q=quantity,
+            p=unit_price_fils,
+            # left out without options, the records of most lines stay as they were
+            **(dict(m=list(modifiers), mp=modifier_fils) if modifiers else {}),
+        )
+        return line
+
+    async def increment(self, order_id: str, quantity: int = 1) -> OrderLine:
+        line = self.restore_quantity(self._line_id(order_id), quantity)
+        self._log(op="inc", id=line.order_id, q=quantity)
+        return line
+
+    async def decrement(self, order_id: str, quantity: int = 1) -> OrderLine:
+        """Removes `quantity` units, and the whole line when none are left."""
+        line = self._lines_by_id[self._line_id(order_id)]
+        quantity = min(quantity, line.quantity)
+        self.restore_quantity(line.order_id, -quantity)
+        self._log(op="dec", id=line.order_id, q=quantity)
+        return line
+
+    def close(self) -> None:
+        """Marks the order as finished, it won't be recovered from the journal."""
+        self._log(op="close")
+
+    def restore_line(
+        self,
+        order_id: str,
+        item_id: str,
+        size: str | None,
+        quantity: int,
+        unit_price_fils: int,
+        modifiers: tuple[str, ...] = (),
+        modifier_fils: int = 0,
+    ) -> OrderLine:
+        """Inserts a line as-is, without journaling it (used by `add` and recovery)."""
+        line = OrderLine(order_id, item_id, size, quantity, unit_price_fils, modifiers, modifier_fils)
+        self.lines[line.key] = line
+        self._lines_by_id[order_id] = line
+        self._apply(line, quantity)
+        return line
+
+    def restore_quantity(self, order_id: str, delta: int) -> OrderLine:
+        """Changes a line's quantity without journaling it, dropping the line at zero."""
+        line = self._lines_by_id[order_id]
+        line.quantity += delta
+        self._apply(line, delta)
+        if not line.quantity:
+            del self.lines[line.key]
+            del self._lines_by_id[line.order_id]
+            del self._receipt_rows[line.order_id]
+        return line
 
     async def remove(self, order_id: str) -> OrderedItem:
-        return self.items.pop(order_id)
+        """
+        Removes a single unit when given a unit order_id, or the whole line
+        when given the line order_id.
+        """
+        line_id = self._line_id(order_id)
+        line = self._lines_by_id[line_id]
+        if line_id != order_id:
+            await self.decrement(line_id)
+            return line.view(order_id, quantity=1)
+
+        removed = line.view()
+        await self.decrement(line_id, line.quantity)
+        return removed
 
     def get(self, order_id: str) -> OrderedItem | None:
-        return self.items[order_id]
\ No newline at end of file
+        line_id = self._line_id(order_id)
+        line = self._lines_by_id.get(line_id)
+        if line is None:
+            return None
+        if line_id == order_id:
+            return line.view()
+
+        n = order_id[len(line_id) + 1 :]
+        if not n.isdigit() or not 1 <= int(n) <= line.quantity:
+            return None
+        return line.view(order_id, quantity=1)
+
+    def _log(self, **record) -> None:
+        if self.journal is not None:
+            self.journal.append({"s": self.session_id, **record})
+
+    def _apply(self, line: OrderLine, quantity: int) -> None:
+        self.revision += 1
+        self.unit_count += quantity
+        self.subtotal_fils += line.unit_price_fils * quantity
+        self._receipt_rows[line.order_id] = None
+        if self.deals is not None:
+            self._update_deals(line, quantity)
+
+    def _update_deals(self, line: OrderLine, quantity: int) -> None:
+        # deals replace the item's price, the options are still paid for
+        self.deals.update(line.key, quantity, line.unit_price_fils - line.modifier_fils)
+
+    @staticmethod
+    def _line_id(order_id: str) -> str:
+        return order_id.partition(UNIT_SEPARATOR)[0]
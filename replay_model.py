@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Literal
+
+from livekit import rtc
+from livekit.agents import NOT_GIVEN, NotGivenOr, llm
+from livekit.agents.utils import shortuuid
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReplayCall:
+    name: str
+    arguments: dict[str, Any]
+
+
+@dataclass(frozen=True)
+class ReplayTurn:
+    """What the model does after one customer utterance: tool calls, then a reply."""
+
+    user: str
+    calls: tuple[ReplayCall, ...] = ()
+    reply: str = ""
+
+
+@dataclass(frozen=True)
+class ReplayScript:
+    turns: tuple[ReplayTurn, ...]
+    # the model's own latency, added to every response
+    response_delay: float = 0.0
+    # the reply to anything past the last turn
+    fallback_reply: str = "Anything else?"
+    greeting: str = "Welcome, what can I get you?"
+
+
+def load_script(path: str) -> ReplayScript:
+    """
+    Reads a transcript from JSON, e.g.
+    `{"turns": [{"user": "a pepsi can", "calls": [{"name": "order_regular_item", "arguments": {"item_id": "pepsi", "size": "Can"}}], "reply": "Sure."}]}`.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return ReplayScript(
+        turns=tuple(
+            ReplayTurn(
+                user=turn["user"],
+                calls=tuple(
+                    ReplayCall(name=call["name"], arguments=call.get("arguments", {}))
+                    for call in turn.get("calls", ())
+                ),
+                reply=turn.get("reply", ""),
+            )
+            for turn in data["turns"]
+        ),
+        response_delay=data.get("response_delay_ms", 0) / 1000,
+    )
+
+
+class ReplayRealtimeModel(llm.RealtimeModel):
+    """
+    Stand-in for the realtime model that replays a scripted transcript, for
+    load tests and local runs without Azure. Each session answers the user
+    messages of its chat context with the next turn of the script: the turn's
+    tool calls first (run for real by livekit), then its reply, as text.
+    """
+
+    def __init__(self, script: ReplayScript) -> None:
+        super().__init__(
+            capabilities=llm.RealtimeCapabilities(
+                message_truncation=False,
+                turn_detection=False,
+                user_transcription=False,
+                auto_tool_reply_generation=False,
+                audio_output=False,
+                manual_function_calls=False,
+                mutable_chat_context=True,
+                mutable_instructions=True,
+                mutable_tools=True,
+            )
+        )
+        self.script = script
+
+    @property
+    def model(self) -> str:
+        return "replay"
+
+    @property
+    def provider(self) -> str:
+        return "local"
+
+    def session(self, *, turn_detection_disabled: bool = False) -> ReplaySession:
+        return ReplaySession(self)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class ReplaySession(llm.RealtimeSession):
+    def __init__(self, realtime_model: ReplayRealtimeModel) -> None:
+        super().__init__(realtime_model)
+        self._script = realtime_model.script
+        self._chat_ctx = llm.ChatContext.empty()
+        self._tools = llm.ToolContext.empty()
+        self._instructions = ""
+        self._next_turn = 0
+        self._pending: set[asyncio.Task[None]] = set()
+
+    @property
+    def chat_ctx(self) -> llm.ChatContext:
+        return self._chat_ctx.copy()
+
+    @property
+    def tools(self) -> llm.ToolContext:
+        return self._tools
+
+    async def update_instructions(self, instructions: str) -> None:
+        self._instructions = instructions
+
+    async def update_chat_ctx(self, chat_ctx: llm.ChatContext) -> None:
+        self._chat_ctx = chat_ctx.copy()
+
+    async def update_tools(self, tools: list[llm.Tool]) -> None:
+        self._tools = llm.ToolContext(tools)
+
+    def update_options(self, *, tool_choice: NotGivenOr[llm.ToolChoice | None] = NOT_GIVEN) -> None:
+        pass
+
+    def push_audio(self, frame: rtc.AudioFrame) -> None:
+        pass
+
+    def push_video(self, frame: rtc.VideoFrame) -> None:
+        pass
+
+    def generate_reply(
+        self,
+        *,
+        instructions: NotGivenOr[str] = NOT_GIVEN,
+        tool_choice: NotGivenOr[llm.ToolChoice] = NOT_GIVEN,
+        tools: NotGivenOr[list[llm.Tool]] = NOT_GIVEN,
+    ) -> asyncio.Future[llm.GenerationCreatedEvent]:
+        fut: asyncio.Future[llm.GenerationCreatedEvent] = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(self._respond(fut, allow_calls=tool_choice != "none"))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return fut
+
+    async def _respond(
+        self, fut: asyncio.Future[llm.GenerationCreatedEvent], *, allow_calls: bool
+    ) -> None:
+        if self._script.response_delay:
+            await asyncio.sleep(self._script.response_delay)
+
+        calls: tuple[ReplayCall, ...] = ()
+        reply = self._script.fallback_reply
+        last = self._chat_ctx.items[-1] if self._chat_ctx.items else None
+        if last is None:
+            reply = self._script.greeting
+        elif self._next_turn < len(self._script.turns):
+            turn = self._script.turns[self._next_turn]
+            if last.type == "message" and last.role == "user":
+                if last.text_content != turn.user:
+                    logger.warning("replaying %r, the user said %r", turn.user, last.text_content)
+                calls = turn.calls if allow_calls else ()
+            # with tool calls, the reply comes in the response to their results
+            if not calls:
+                reply = turn.reply
+                self._next_turn += 1
+
+        function_calls = [
+            llm.FunctionCall(
+                call_id=f"call_{shortuuid()}", name=call.name, arguments=json.dumps(call.arguments)
+            )
+            for call in calls
+        ]
+        self._chat_ctx.items.extend(function_calls)
+        if not fut.done():
+            fut.set_result(
+                llm.GenerationCreatedEvent(
+                    message_stream=_messages([] if calls else [reply]),
+                    function_stream=_iterate(function_calls),
+                    user_initiated=True,
+                    response_id=f"resp_{shortuuid()}",
+                )
+            )
+
+    def commit_audio(self) -> None:
+        pass
+
+    def clear_audio(self) -> None:
+        pass
+
+    def interrupt(self) -> None:
+        pass
+
+    def truncate(
+        self,
+        *,
+        message_id: str,
+        modalities: list[Literal["text", "audio"]],
+        audio_end_ms: int,
+        audio_transcript: NotGivenOr[str] = NOT_GIVEN,
+    ) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        for task in list(self._pending):
+            task.cancel()
+
+
+async def _iterate(values: list[Any]) -> AsyncIterator[Any]:
+    for value in values:
+        yield value
+
+
+async def _messages(replies: list[str]) -> AsyncIterator[llm.MessageGeneration]:
+    for reply in replies:
+        modalities: asyncio.Future[list[Literal["text", "audio"]]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        modalities.set_result(["text"])
+        yield llm.MessageGeneration(
+            message_id=f"msg_{shortuuid()}",
+            text_stream=_iterate([reply]),
+            audio_stream=_iterate([]),
+            modalities=modalities,
+        )
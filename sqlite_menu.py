@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import asyncio
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from database import FakeDB, ItemCategory, MenuItem, Modifier, ModifierGroup
+from menu_table import MenuTable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS menu_items (
+    position INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    size TEXT,
+    price REAL NOT NULL,
+    ingredients TEXT,
+    available INTEGER NOT NULL DEFAULT 1,
+    voice_alias TEXT
+);
+CREATE INDEX IF NOT EXISTS menu_items_category ON menu_items (category);
+CREATE TABLE IF NOT EXISTS menu_modifiers (
+    item_id TEXT NOT NULL,
+    group_position INTEGER NOT NULL,
+    group_id TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    min_selections INTEGER NOT NULL DEFAULT 0,
+    max_selections INTEGER NOT NULL DEFAULT 1,
+    option_position INTEGER NOT NULL,
+    option_id TEXT NOT NULL,
+    option_name TEXT NOT NULL,
+    price REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (item_id, group_position, option_position)
+);
+"""
+
+_COLUMNS = "id, name, category, size, price, ingredients, available, voice_alias"
+
+
+class ConnectionPool:
+    """
+    A small pool of SQLite connections that are handed out to executor threads.
+
+    Connections are opened lazily and kept for the lifetime of the process, so
+    sessions loading the menu don't pay for `sqlite3.connect` every time.
+    """
+
+    def __init__(self, path: str, *, max_size: int = 4) -> None:
+        self._path = path
+        self._max_size = max_size
+        self._idle: queue.SimpleQueue[sqlite3.Connection] = queue.SimpleQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._opened < self._max_size
+            if can_open:
+                self._opened += 1
+
+        if not can_open:
+            return self._idle.get()
+
+        conn = None
+        try:
+            conn = sqlite3.connect(self._path, check_same_thread=False)
+            conn.executescript(SCHEMA)
+        except BaseException:
+            # the slot was never filled, give it back
+            if conn is not None:
+                conn.close()
+            with self._lock:
+                self._opened -= 1
+            raise
+        return conn
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str) -> ConnectionPool:
+    """Returns the process-wide pool for `path`, shared by every repository on it."""
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+def _row_to_item(row: tuple) -> MenuItem:
+    id, name, category, size, price, ingredients, available, voice_alias = row
+    return MenuItem(
+        id=id,
+        name=name,
+        category=category,
+        size=size,
+        price=price,
+        ingredients=ingredients,
+        available=bool(available),
+        voice_alias=voice_alias,
+    )
+
+
+class SqliteMenuRepository:
+    """
+    `MenuRepository` backed by a SQLite file. Queries run on the default
+    thread-pool executor so they never block the event loop.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._pool = get_pool(path)
+
+    async def list_all(self) -> list[MenuItem]:
+        return await self._query(f"SELECT {_COLUMNS} FROM menu_items ORDER BY position")
+
+    async def list_drinks(self) -> list[MenuItem]:
+        return await self._list_category("drink")
+
+    async def list_pizza(self) -> list[MenuItem]:
+        return await self._list_category("pizza")
+
+    async def list_chicken(self) -> list[MenuItem]:
+        return await self._list_category("chicken")
+
+    async def list_sides(self) -> list[MenuItem]:
+        return await self._list_category("sides")
+
+    async def list_desserts(self) -> list[MenuItem]:
+        return await self._list_category("desserts")
+
+    async def list_sauces(self) -> list[MenuItem]:
+        return await self._list_category("sauce")
+
+    async def save_items(self, items: list[MenuItem]) -> None:
+        """Replaces the whole menu with `items`, keeping their order."""
+
+        def _save() -> None:
+            with self._pool.connection() as conn, conn:
+                conn.execute("DELETE FROM menu_items")
+                conn.executemany(
+                    f"INSERT INTO menu_items (position, {_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            position,
+                            item.id,
+                            item.name,
+                            item.category,
+                            item.size,
+                            item.price,
+                            item.ingredients,
+                            int(item.available),
+                            item.voice_alias,
+                        )
+                        for position, item in enumerate(items)
+                    ],
+                )
+
+        await asyncio.get_running_loop().run_in_executor(None, _save)
+
+    async def list_modifier_groups(self) -> dict[str, tuple[ModifierGroup, ...]]:
+        def _fetch() -> dict[str, tuple[ModifierGroup, ...]]:
+            with self._pool.connection() as conn:
+                rows = conn.execute(
+                    "SELECT item_id, group_position, group_id, group_name, min_selections,"
+                    " max_selections, option_id, option_name, price FROM menu_modifiers"
+                    " ORDER BY item_id, group_position, option_position"
+                ).fetchall()
+            # one row per option, the group columns repeat
+            options: dict[tuple[str, int], list[Modifier]] = {}
+            groups: dict[tuple[str, int], tuple] = {}
+            for item_id, position, *group, option_id, option_name, price in rows:
+                groups[(item_id, position)] = tuple(group)
+                options.setdefault((item_id, position), []).append(
+                    Modifier(id=option_id, name=option_name, price=price)
+                )
+            by_item: dict[str, list[ModifierGroup]] = {}
+            for key, (group_id, name, min_selections, max_selections) in groups.items():
+                by_item.setdefault(key[0], []).append(
+                    ModifierGroup(
+                        id=group_id,
+                        name=name,
+                        options=tuple(options[key]),
+                        min_selections=min_selections,
+                        max_selections=max_selections,
+                    )
+                )
+            return {item_id: tuple(item_groups) for item_id, item_groups in by_item.items()}
+
+        return await asyncio.get_running_loop().run_in_executor(None, _fetch)
+
+    async def save_modifier_groups(self, groups_by_item: dict[str, tuple[ModifierGroup, ...]]) -> None:
+        """Replaces every item's modifier groups."""
+
+        def _save() -> None:
+            with self._pool.connection() as conn, conn:
+                conn.execute("DELETE FROM menu_modifiers")
+                conn.executemany(
+                    "INSERT INTO menu_modifiers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            item_id,
+                            group_position,
+                            group.id,
+                            group.name,
+                            group.min_selections,
+                            group.max_selections,
+                            option_position,
+                            option.id,
+                            option.name,
+                            option.price,
+                        )
+                        for item_id, groups in groups_by_item.items()
+                        for group_position, group in enumerate(groups)
+                        for option_position, option in enumerate(group.options)
+                    ],
+                )
+
+        await asyncio.get_running_loop().run_in_executor(None, _save)
+
+    async def load_table(self) -> MenuTable:
+        """The whole menu straight into a `MenuTable`, without a `MenuItem` per row."""
+
+        def _load() -> MenuTable:
+            table = MenuTable()
+            with self._pool.connection() as conn:
+                rows = conn.execute(f"SELECT {_COLUMNS} FROM menu_items ORDER BY position")
+                for id, name, category, size, price, ingredients, available, voice_alias in rows:
+                    table.append(
+                        id=id,
+                        name=name,
+                        category=category,
+                        size=size,
+                        price=price,
+                        ingredients=ingredients,
+                        available=bool(available),
+                        voice_alias=voice_alias,
+                    )
+            return table
+
+        return await asyncio.get_running_loop().run_in_executor(None, _load)
+
+    async def _list_category(self, category: ItemCategory) -> list[MenuItem]:
+        return await self._query(
+            f"SELECT {_COLUMNS} FROM menu_items WHERE category = ? ORDER BY position",
+            (category,),
+        )
+
+    async def _query(self, sql: str, params: tuple = ()) -> list[MenuItem]:
+        def _fetch() -> list[MenuItem]:
+            with self._pool.connection() as conn:
+                rows = conn.execute(sql, params).fetchall()
+            return [_row_to_item(row) for row in rows]
+
+        return await asyncio.get_running_loop().run_in_executor(None, _fetch)
+
+
+async def _export_sample_menu(path: str) -> None:
+    repository, sample = SqliteMenuRepository(path), FakeDB()
+    await repository.save_items(await sample.list_all())
+    await repository.save_modifier_groups(await sample.list_modifier_groups())
+
+
+if __name__ == "__main__":
+    # python sqlite_menu.py menu.db -> seeds `menu.db` with the sample menu
+    asyncio.run(_export_sample_menu(sys.argv[1]))
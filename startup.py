@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTrace:
+    """
+    Milestones of a job's startup, in ms since the worker handed the job to
+    `entrypoint`. Reported once, when the agent first speaks or the job ends.
+    """
+
+    def __init__(self, job_id: str) -> None:
+        self.job_id = job_id
+        self.marks: dict[str, float] = {}
+        self._start = time.perf_counter()
+        self._reported = False
+
+    def mark(self, name: str) -> None:
+        # only the first occurrence counts, e.g. the first audio frame
+        self.marks.setdefault(name, (time.perf_counter() - self._start) * 1000)
+
+    def report(self) -> None:
+        if self._reported:
+            return
+        self._reported = True
+        logger.info(
+            "job %s startup: %s",
+            self.job_id,
+            ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.marks.items()),
+        )
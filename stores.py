@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping
+
+from availability import AvailabilityKey
+from catalog import MenuCatalog, get_catalog, overlay_catalog
+from database import ItemSize, MenuItem
+
+logger = logging.getLogger(__name__)
+
+# rooms are named "<store id>__<call id>" when the job metadata doesn't say
+STORE_ROOM_SEPARATOR = "__"
+
+
+@dataclass(frozen=True)
+class StoreOverlay:
+    """What a store changes on the shared base menu, nothing else."""
+
+    store_id: str
+    # (item_id, size) -> price in AED
+    prices: Mapping[tuple[str, ItemSize | None], float] = field(
+        default_factory=lambda: MappingProxyType({})
+    )
+    # a `None` size marks every size of the item, as in the availability file
+    unavailable: frozenset[AvailabilityKey] = frozenset()
+
+    def changes(self, base: MenuCatalog) -> dict[tuple[str, ItemSize | None], MenuItem]:
+        """The base items this store replaces, keyed by `(item_id, size)`."""
+        updates: dict[tuple[str, ItemSize | None], dict] = {}
+        for (item_id, size), price in self.prices.items():
+            if base.find(item_id, size) is None:
+                logger.warning("store %s prices unknown item %s (%s)", self.store_id, item_id, size)
+                continue
+            updates.setdefault((item_id, size), {})["price"] = price
+
+        for item_id, size in self.unavailable:
+            size_map = base.items_by_id.get(item_id)
+            if size_map is None or (size is not None and size not in size_map):
+                logger.warning("store %s lists unknown item %s (%s)", self.store_id, item_id, size)
+                continue
+            for item_size in size_map if size is None else (size,):
+                updates.setdefault((item_id, item_size), {})["available"] = False
+
+        return {
+            key: base.items_by_id[key[0]][key[1]].model_copy(update=update)
+            for key, update in updates.items()
+        }
+
+
+def load_store_overlays(path: str) -> dict[str, StoreOverlay]:
+    """
+    Reads store overlays from JSON, e.g.
+    `{"marina": {"prices": [{"id": "pepsi", "size": "Can", "price": 6}], "unavailable": [{"id": "water"}]}}`.
+    """
+    with open(path, encoding="utf-8") as f:
+        stores = json.load(f)
+    return {
+        store_id: StoreOverlay(
+            store_id=store_id,
+            prices=MappingProxyType(
+                {(entry["id"], entry.get("size")): float(entry["price"]) for entry in store.get("prices", ())}
+            ),
+            unavailable=frozenset(
+                (entry["id"], entry.get("size")) for entry in store.get("unavailable", ())
+            ),
+        )
+        for store_id, store in stores.items()
+    }
+
+
+def store_for_job(metadata: str | None, room_name: str) -> str | None:
+    """The store a job is for: `{"store_id": ...}` in the job metadata, else the room name prefix."""
+    if metadata:
+        try:
+            store_id = json.loads(metadata).get("store_id")
+        except (ValueError, AttributeError):
+            store_id = None
+        if store_id:
+            return str(store_id)
+
+    store_id, separator, _ = room_name.partition(STORE_ROOM_SEPARATOR)
+    return store_id if separator else None
+
+
+class StoreCatalogs:
+    """
+    Catalogs of every store served by the worker. Only the overlays (the
+    differences) are kept for all stores; a store's catalog is derived from
+    the base one when a job for it arrives, and the most recently used ones
+    are kept around for the next calls.
+    """
+
+    def __init__(
+        self, base: MenuCatalog, overlays: Mapping[str, StoreOverlay], *, max_cached: int = 64
+    ) -> None:
+        self.base = base
+        self.overlays = overlays
+        self.max_cached = max_cached
+        self._cached: OrderedDict[str, MenuCatalog] = OrderedDict()
+
+    def get(self, store_id: str | None) -> MenuCatalog:
+        if store_id is None:
+            return self.base
+
+        catalog = self._cached.get(store_id)
+        if catalog is not None:
+            self._cached.move_to_end(store_id)
+            return catalog
+
+        overlay = self.overlays.get(store_id)
+        if overlay is None:
+            logger.warning("unknown store %s, using the base menu", store_id)
+            return self.base
+
+        catalog = self._cached[store_id] = overlay_catalog(self.base, overlay.changes(self.base))
+        if len(self._cached) > self.max_cached:
+            self._cached.popitem(last=False)
+        return catalog
+
+
+_stores: StoreCatalogs | None = None
+
+
+async def get_stores() -> StoreCatalogs:
+    """
+    Returns the process-wide store catalogs, with the overlays from
+    `MENU_STORES_FILE` when set.
+    """
+    global _stores
+    if _stores is None:
+        path = os.getenv("MENU_STORES_FILE")
+        _stores = StoreCatalogs(await get_catalog(), load_store_overlays(path) if path else {})
+    return _stores
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import os
+import struct
+from array import array
+from collections import defaultdict
+from typing import Callable, Iterable, Iterator, Sequence
+
+logger = logging.getLogger(__name__)
+
+# layout: magic, u32 header length, JSON header (item ids, array lengths),
+# then the arrays of both tables back to back, 4-byte items
+MAGIC = b"SUGGEST\x01"
+_ARRAYS = (
+    ("complements", "indptr", "I"),
+    ("complements", "indices", "I"),
+    ("complements", "scores", "f"),
+    ("substitutes", "indptr", "I"),
+    ("substitutes", "indices", "I"),
+    ("substitutes", "scores", "f"),
+)
+
+
+class SparseRows:
+    """
+    A sparse item x item matrix in CSR form: the entries of row `i` are
+    `indices[indptr[i]:indptr[i + 1]]` with their `scores`, best first.
+    """
+
+    __slots__ = ("indptr", "indices", "scores")
+
+    def __init__(self, indptr: array, indices: array, scores: array) -> None:
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+
+    def row(self, i: int) -> tuple[array, array]:
+        start, stop = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:stop], self.scores[start:stop]
+
+
+class SuggestionTables:
+    """
+    What customers order together (`complements`) and what they order
+    instead of an item (`substitutes`), learned offline from past orders
+    and kept as the top entries of each item's row.
+    """
+
+    def __init__(self, item_ids: Sequence[str], complements: SparseRows, substitutes: SparseRows) -> None:
+        self.item_ids = tuple(item_ids)
+        self.complements = complements
+        self.substitutes = substitutes
+        self._index = {item_id: i for i, item_id in enumerate(self.item_ids)}
+
+    def suggest(
+        self, order_item_ids: Iterable[str], k: int = 3, keep: Callable[[str], bool] = lambda item_id: True
+    ) -> list[str]:
+        """The `k` items that go best with the order's items and pass `keep`, e.g. in stock."""
+        in_order = set()
+        totals: dict[int, float] = defaultdict(float)
+        for item_id in order_item_ids:
+            i = self._index.get(item_id)
+            if i is None or i in in_order:
+                continue
+            in_order.add(i)
+            for j, score in zip(*self.complements.row(i)):
+                totals[j] += score
+        ranked = sorted((j for j in totals if j not in in_order), key=totals.__getitem__, reverse=True)
+        return self._first(ranked, k, keep)
+
+    def alternatives(
+        self, item_id: str, k: int = 3, keep: Callable[[str], bool] = lambda item_id: True
+    ) -> list[str]:
+        """The `k` closest substitutes of `item_id` that pass `keep`."""
+        i = self._index.get(item_id)
+        if i is None:
+            return []
+        return self._first(self.substitutes.row(i)[0], k, keep)
+
+    def _first(self, ranked: Iterable[int], k: int, keep: Callable[[str], bool]) -> list[str]:
+        found = []
+        for j in ranked:
+            if keep(self.item_ids[j]):
+                found.append(self.item_ids[j])
+                if len(found) == k:
+                    break
+        return found
+
+
+def build_tables(
+    orders: Sequence[int],
+    items: Sequence[int],
+    item_ids: Sequence[str],
+    categories: Sequence[str],
+    *,
+    top: int = 32,
+    min_count: int = 3,
+    max_basket: int = 40,
+    block_entries: int = 1 << 24,
+) -> SuggestionTables:
+    """
+    Builds both tables from order lines given as two parallel arrays: the
+    order number and the item (an index into `item_ids`) of each line.
+
+    Complements score how often two items share an order, normalized by
+    their popularity (count / sqrt(orders of a * orders of b)), so the
+    bestsellers don't top every row. Substitutes are items of the same
+    category whose complements look alike: the cosine of their rows.
+    Baskets above `max_basket` items (catering orders) are left out, their
+    pairs would swamp everyone else's. Similarities are computed for as many
+    items at a time as keep a block under `block_entries` entries.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    n = len(item_ids)
+    # the distinct items of each order, grouped by order
+    keys = np.unique(np.asarray(orders, np.int64) * n + np.asarray(items, np.int64))
+    basket, item = keys // n, keys % n
+    starts = np.flatnonzero(np.r_[True, basket[1:] != basket[:-1]])
+    sizes = np.diff(np.r_[starts, len(keys)])
+    item_orders = np.bincount(item, minlength=n)
+
+    # every pair of items in the same basket, once (items are sorted within
+    # a basket, so a < b), taken a basket size at a time: the baskets of one
+    # size form a matrix and the pairs are pairs of its columns
+    chunks = []
+    for size in range(2, max_basket + 1):
+        first = starts[sizes == size]
+        if not len(first):
+            continue
+        members = item[first[:, None] + np.arange(size)]
+        left, right = np.triu_indices(size, 1)
+        chunks.append((members[:, left] * n + members[:, right]).ravel())
+    pairs = np.concatenate(chunks) if chunks else np.zeros(0, np.int64)
+
+    if n * n <= 1 << 25:
+        counts = np.bincount(pairs, minlength=n * n)
+        pairs = np.flatnonzero(counts >= min_count)
+        counts = counts[pairs]
+    else:
+        pairs, counts = np.unique(pairs, return_counts=True)
+        pairs, counts = pairs[counts >= min_count], counts[counts >= min_count]
+    a, b = pairs // n, pairs % n
+    scores = counts / np.sqrt(item_orders[a].astype(np.float64) * item_orders[b])
+    # both directions, each item gets its own row
+    complements = _top_rows(np.r_[a, b], np.r_[b, a], np.r_[scores, scores], n, top)
+    indptr, indices, scores = complements
+
+    # substitutes: cosine of the complement rows, within each category, as
+    # sparse rows multiplied a block at a time: each item keeps its `top`
+    # best, so neither the profiles nor the similarities are ever dense
+    sub_a, sub_b, sub_scores = [], [], []
+    categories = np.asarray(categories)
+    rows_of = np.repeat(np.arange(n), np.diff(indptr))
+    for category in np.unique(categories):
+        members = np.flatnonzero(categories == category)
+        if len(members) < 2:
+            continue
+        position = np.full(n, -1)
+        position[members] = np.arange(len(members))
+        in_category = position[rows_of] >= 0
+        profiles = sparse.csr_matrix(
+            (scores[in_category].astype(np.float32), (position[rows_of[in_category]], indices[in_category])),
+            shape=(len(members), n),
+        )
+        norms = np.sqrt(np.asarray(profiles.multiply(profiles).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        profiles = sparse.diags((1 / norms).astype(np.float32)) @ profiles
+        transposed = profiles.T.tocsr()
+        block = max(1, block_entries // len(members))
+        for start in range(0, len(members), block):
+            similarity = profiles[start : start + block] @ transposed
+            for x in range(similarity.shape[0]):
+                y = similarity.indices[similarity.indptr[x] : similarity.indptr[x + 1]]
+                values = similarity.data[similarity.indptr[x] : similarity.indptr[x + 1]]
+                keep = (values > 0) & (y != start + x)
+                y, values = y[keep], values[keep]
+                if len(values) > top:
+                    best = np.argpartition(-values, top)[:top]
+                    y, values = y[best], values[best]
+                sub_a.append(np.full(len(y), members[start + x]))
+                sub_b.append(members[y])
+                sub_scores.append(values)
+    substitutes = _top_rows(
+        np.concatenate(sub_a or [np.zeros(0, np.int64)]),
+        np.concatenate(sub_b or [np.zeros(0, np.int64)]),
+        np.concatenate(sub_scores or [np.zeros(0)]),
+        n,
+        top,
+    )
+    return SuggestionTables(item_ids, _sparse_rows(*complements), _sparse_rows(*substitutes))
+
+
+def _top_rows(rows, columns, scores, n: int, top: int) -> tuple:
+    """CSR rows of `(rows, columns, scores)` entries, each row's `top` best scores first."""
+    import numpy as np
+
+    order = np.lexsort((-scores, rows))
+    rows, columns, scores = rows[order], columns[order], scores[order]
+    row_start = np.searchsorted(rows, np.arange(n))
+    rank = np.arange(len(rows)) - row_start[rows]
+    keep = rank < top
+    rows, columns, scores = rows[keep], columns[keep], scores[keep]
+    indptr = np.r_[0, np.cumsum(np.bincount(rows, minlength=n))]
+    return indptr, columns, scores
+
+
+def _sparse_rows(indptr, indices, scores) -> SparseRows:
+    # plain arrays: reading a few entries of a row is faster than with numpy
+    return SparseRows(
+        array("I", indptr.astype("<u4").tobytes()),
+        array("I", indices.astype("<u4").tobytes()),
+        array("f", scores.astype("<f4").tobytes()),
+    )
+
+
+def encode_lines(lines: Iterable[tuple[str, str]], item_ids: Sequence[str]) -> tuple[array, array]:
+    """`(order key, item id)` lines to the arrays of `build_tables`, items not in `item_ids` dropped."""
+    index = {item_id: i for i, item_id in enumerate(item_ids)}
+    order_numbers: dict[str, int] = {}
+    orders, items = array("q"), array("q")
+    for order_key, item_id in lines:
+        i = index.get(item_id)
+        if i is not None:
+            orders.append(order_numbers.setdefault(order_key, len(order_numbers)))
+            items.append(i)
+    return orders, items
+
+
+def journal_lines(directory: str) -> Iterator[tuple[str, str]]:
+    """
+    The lines of every order in the journal at `directory` with units left at
+    the end, closed orders included after a compaction moved them to history.
+    """
+    from order_journal import read_journal
+
+    # line order_id -> [order uid, item id, quantity]
+    lines: dict[str, list] = {}
+    for record in read_journal(directory, history=True):
+        op = record["op"]
+        if op == "add":
+            lines[record["id"]] = [record.get("o") or record["s"], record["item"], record["q"]]
+        elif op in ("inc", "dec") and (line := lines.get(record["id"])):
+            line[2] += record["q"] if op == "inc" else -record["q"]
+    for order_key, item_id, quantity in lines.values():
+        if quantity > 0:
+            yield order_key, item_id
+
+
+def csv_lines(path: str) -> Iterator[tuple[str, str]]:
+    """`order_id,item_id` rows of a CSV export of past orders, other columns are ignored."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row["order_id"], row["item_id"]
+
+
+def write_tables(tables: SuggestionTables, path: str) -> None:
+    arrays = [getattr(getattr(tables, table), name) for table, name, _ in _ARRAYS]
+    header = json.dumps({"item_ids": tables.item_ids, "lengths": [len(a) for a in arrays]}).encode()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for a in arrays:
+            a.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def load_tables(path: str) -> SuggestionTables:
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a suggestions file")
+    (header_size,) = struct.unpack_from("<I", data, len(MAGIC))
+    offset = len(MAGIC) + 4
+    header = json.loads(data[offset : offset + header_size])
+    offset += header_size
+
+    loaded = []
+    for (_, _, typecode), length in zip(_ARRAYS, header["lengths"]):
+        a = array(typecode)
+        a.frombytes(data[offset : offset + length * a.itemsize])
+        offset += length * a.itemsize
+        loaded.append(a)
+    return SuggestionTables(header["item_ids"], SparseRows(*loaded[:3]), SparseRows(*loaded[3:]))
+
+
+_tables: SuggestionTables | None = None
+
+
+def get_suggestions() -> SuggestionTables | None:
+    """
+    Returns the process-wide tables from `SUGGESTIONS_FILE`, None when it
+    isn't set or the offline job hasn't written it yet.
+    """
+    global _tables
+    if _tables is None and (path := os.getenv("SUGGESTIONS_FILE")):
+        try:
+            _tables = load_tables(path)
+        except FileNotFoundError:
+            logger.warning("no suggestions at %s, run suggestions.py to build them", path)
+            return None
+        logger.info("suggestions for %d items loaded from %s", len(_tables.item_ids), path)
+    return _tables
+
+
+if __name__ == "__main__":
+    # python suggestions.py (--journal DIR | --csv FILE) [-o PATH] -> writes SUGGESTIONS_FILE by default
+    import argparse
+    import asyncio
+
+    from catalog import build_catalog, default_repository
+
+    parser = argparse.ArgumentParser()
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--journal", help="order journal directory (ORDER_JOURNAL_DIR)")
+    source.add_argument("--csv", help="CSV of past order lines with order_id and item_id columns")
+    parser.add_argument("-o", "--output", default=os.getenv("SUGGESTIONS_FILE"))
+    args = parser.parse_args()
+    if not args.output:
+        parser.error("no output path, pass -o or set SUGGESTIONS_FILE")
+
+    catalog = asyncio.run(build_catalog(default_repository()))
+    # one category per id, as in the menu
+    category_of = {item.id: item.category for item in catalog.all_items}
+    item_ids = tuple(category_of)
+    orders, items = encode_lines(journal_lines(args.journal) if args.journal else csv_lines(args.csv), item_ids)
+    tables = build_tables(orders, items, item_ids, [category_of[item_id] for item_id in item_ids])
+    write_tables(tables, args.output)
+    print(f"{len(items)} order lines -> {len(tables.complements.indices)} complements, "
+          f"{len(tables.substitutes.indices)} substitutes, written to {args.output}")
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+
+from cashier import new_userdata, validate_order_item
+from catalog import build_catalog
+from database import FakeDB
+from pricing import to_fils
+
+
+@pytest.fixture
+def userdata():
+    return new_userdata(asyncio.run(build_catalog(FakeDB())))
+
+
+def test_single_size_items_land_on_one_line_with_or_without_the_size(userdata):
+    for size in (None, "8 Pieces"):
+        menu_item, size, chosen = validate_order_item(userdata, "garlic_twists", size)
+        asyncio.run(
+            userdata.order.add(menu_item.id, size, unit_price_fils=to_fils(menu_item.price), modifiers=chosen.ids)
+        )
+
+    (line,) = userdata.order.lines.values()
+    assert (line.size, line.quantity) == ("8 Pieces", 2)
+
+
+def test_unsized_items_keep_no_size(userdata):
+    _, size, _ = validate_order_item(userdata, "pepsi", "Can")
+    assert size == "Can"
+    _, size, _ = validate_order_item(userdata, "marinara_sauce", None)
+    assert size is None
@@ -0,0 +1,161 @@
+import json
+import random
+
+from deals import Deal, DealComponent, DealEngine, load_deals
+
+
+def component(*keys, quantity: int = 1) -> DealComponent:
+    return DealComponent(choices=frozenset(keys), quantity=quantity)
+
+
+PIZZA = ("pizza", "M")
+DRINK = ("pepsi", "Can")
+SIDE = ("fries", None)
+PRICES = {PIZZA: 4000, DRINK: 1000, SIDE: 1000}
+
+# the best single deal, but taking it leaves nothing for the others
+FEAST = Deal("feast", "Feast", 4500, (component(PIZZA), component(DRINK), component(SIDE)))
+PIZZA_DRINK = Deal("pizza_drink", "Pizza and drink", 3800, (component(PIZZA), component(DRINK)))
+SIDE_DRINK = Deal("side_drink", "Side and drink", 1200, (component(SIDE), component(DRINK)))
+DEALS = [FEAST, PIZZA_DRINK, SIDE_DRINK]
+
+
+def order(*keys) -> tuple[dict, dict]:
+    units: dict = {}
+    for key in keys:
+        units[key] = units.get(key, 0) + 1
+    return units, {key: PRICES[key] for key in units}
+
+
+def test_search_beats_the_greedy_pick():
+    engine = DealEngine(DEALS)
+    units, prices = order(PIZZA, DRINK, DRINK, SIDE)
+    match = engine.match(units, prices, range(len(DEALS)))
+
+    assert match.exhaustive
+    assert match.savings_fils == 2000
+    assert sorted(applied.deal.deal_id for applied in match.applied) == ["pizza_drink", "side_drink"]
+
+
+def test_node_budget_falls_back_to_the_greedy_pick():
+    engine = DealEngine(DEALS, max_nodes=0)
+    units, prices = order(PIZZA, DRINK, DRINK, SIDE)
+    match = engine.match(units, prices, range(len(DEALS)))
+
+    assert not match.exhaustive
+    assert [applied.deal.deal_id for applied in match.applied] == ["feast"]
+    assert match.savings_fils == 1500
+
+
+def test_no_deal_that_costs_more_than_its_items():
+    expensive = Deal("expensive", "Expensive", 9000, (component(PIZZA), component(DRINK)))
+    units, prices = order(PIZZA, DRINK)
+    assert DealEngine([expensive]).match(units, prices, [0]).applied == ()
+
+
+def test_any_size_components_match_every_size():
+    engine = DealEngine([Deal("any_pepsi", "Any pepsi", 500, (component(("pepsi", None)),))])
+    assert engine.components_for(("pepsi", "Can")) == [(0, 0)]
+    assert engine.components_for(("pepsi", None)) == [(0, 0)]
+    assert engine.components_for(("water", None)) == []
+
+
+def unbounded_savings(engine: DealEngine, units: dict, prices: dict) -> int:
+    """The best savings of the engine's search with no bound and no node budget."""
+    by_price = sorted(units, key=lambda key: -prices[key])
+    eligible = {
+        d: tuple([key for key in by_price if (d, c) in engine.components_for(key[:2])] for c in range(len(deal.components)))
+        for d, deal in enumerate(engine.deals)
+    }
+    # deals are tried in the engine's order: the units an instance takes depend on what was taken before
+    scored = [(engine._take(d, eligible[d], units, prices), d) for d in eligible]
+    order = [d for instance, d in sorted(scored, key=lambda entry: (-(entry[0].savings_fils if entry[0] else 0), entry[1]))]
+
+    def best(start: int, remaining: dict) -> int:
+        savings = 0
+        for i in range(start, len(order)):
+            instance = engine._take(order[i], eligible[order[i]], remaining, prices)
+            if instance is None or instance.savings_fils <= 0:
+                continue
+            left = dict(remaining)
+            for key, count in instance.units:
+                left[key] -= count
+            savings = max(savings, instance.savings_fils + best(i, left))
+        return savings
+
+    return best(0, units)
+
+
+def test_bound_never_prunes_the_best_combination():
+    rng = random.Random(3)
+    items = [(f"item_{n}", size) for n in range(5) for size in ("S", "L")]
+    for _ in range(200):
+        prices = {key: rng.randrange(500, 5000, 100) for key in items}
+        deals = []
+        for d in range(rng.randint(1, 5)):
+            components = tuple(
+                component(*rng.sample(items, rng.randint(1, 3)), quantity=rng.randint(1, 2))
+                for _ in range(rng.randint(1, 3))
+            )
+            value = sum(c.quantity * max(prices[key] for key in c.choices) for c in components)
+            deals.append(Deal(f"deal_{d}", f"Deal {d}", int(value * rng.uniform(0.5, 1.0)), components))
+        engine = DealEngine(deals, max_nodes=1_000_000)
+        units = {key: rng.randint(1, 3) for key in rng.sample(items, rng.randint(1, 6))}
+        line_prices = {key: prices[key] for key in units}
+
+        match = engine.match(units, line_prices, range(len(deals)))
+        assert match.exhaustive
+        assert match.savings_fils == unbounded_savings(engine, units, line_prices)
+        for key, used in _used_units(match).items():
+            assert used <= units[key]
+
+
+def _used_units(match) -> dict:
+    used: dict = {}
+    for applied in match.applied:
+        for key, count in applied.units:
+            used[key] = used.get(key, 0) + count
+    return used
+
+
+def test_tracker_follows_the_order():
+    engine = DealEngine(DEALS)
+    tracker = engine.tracker()
+    pizza, drink, side = (key + ((),) for key in (PIZZA, DRINK, SIDE))
+
+    assert not tracker.update(("water", None, ()), 1, 500)
+    assert not tracker.update(pizza, 1, 4000)
+    assert tracker.update(drink, 1, 1000)
+    assert tracker.savings_fils == 1200
+    assert tracker.update(side, 1, 1000)
+    assert tracker.savings_fils == 1500
+    tracker.update(drink, 1, 1000)
+    assert tracker.savings_fils == 2000
+    tracker.update(pizza, -1, 4000)
+    assert tracker.savings_fils == 800
+    assert [applied.deal.deal_id for applied in tracker.match.applied] == ["side_drink"]
+
+
+def test_load_deals(tmp_path):
+    path = tmp_path / "deals.json"
+    path.write_text(
+        json.dumps(
+            [
+                {
+                    "id": "pizza_pair",
+                    "name": "2 medium pizzas and a drink",
+                    "price": 49,
+                    "components": [
+                        {"quantity": 2, "items": [{"id": "margherita", "size": "M"}]},
+                        {"items": [{"id": "pepsi"}]},
+                    ],
+                }
+            ]
+        )
+    )
+    (deal,) = load_deals(str(path))
+    assert deal.price_fils == 4900
+    assert deal.components == (
+        component(("margherita", "M"), quantity=2),
+        component(("pepsi", None)),
+    )
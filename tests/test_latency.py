@@ -0,0 +1,40 @@
+import glob
+import os
+
+from latency import SessionLatency, WorkerLatency, fold_finished, read_snapshots
+
+
+def worker(directory: str, seconds: float) -> WorkerLatency:
+    latency = WorkerLatency(directory)
+    SessionLatency("room", latency.histograms).record("tool_call", "order_items", seconds)
+    latency.flush()
+    return latency
+
+
+def exit_process(latency: WorkerLatency) -> None:
+    # what the OS does with the lock when the job process exits
+    latency._lock_file.close()
+
+
+def test_finished_snapshots_are_folded_without_losing_counts(tmp_path):
+    directory = str(tmp_path)
+    finished = [worker(directory, 0.01) for _ in range(3)]
+    live = worker(directory, 0.02)
+    for latency in finished:
+        exit_process(latency)
+
+    fold_finished(directory)
+    fold_finished(directory)
+
+    assert glob.glob(os.path.join(directory, "latency-*.json")) == [live._path]
+    histogram = read_snapshots(directory)[("tool_call", "order_items")]
+    assert histogram.count == 4
+
+    exit_process(live)
+    fold_finished(directory)
+    assert glob.glob(os.path.join(directory, "latency-*.json")) == []
+    assert read_snapshots(directory)[("tool_call", "order_items")].count == 4
+
+
+def test_snapshots_of_two_processes_never_share_a_file(tmp_path):
+    assert WorkerLatency(str(tmp_path))._path != WorkerLatency(str(tmp_path))._path
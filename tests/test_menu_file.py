@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from catalog import MENU_CATEGORIES, build_catalog
+from database import FakeDB
+from menu_file import load_catalog, write_menu_file
+
+QUERIES = ["pepsi", "بيبسي", "margarita", "peperoni pizza", "chiken wings", "garlic", "water", "zzz"]
+
+
+@pytest.fixture(scope="module", params=["full", "retrieval"])
+def catalogs(request, tmp_path_factory):
+    built = asyncio.run(build_catalog(FakeDB(), context_mode=request.param))
+    path = str(tmp_path_factory.mktemp("menu") / "menu.bin")
+    write_menu_file(built, path)
+    return built, load_catalog(path)
+
+
+def test_items_round_trip(catalogs):
+    built, mapped = catalogs
+    assert list(mapped.all_items) == list(built.all_items)
+    for category in MENU_CATEGORIES:
+        assert list(mapped.items(category)) == list(built.items(category))
+    assert mapped.item_ids == built.item_ids
+    for item_id in built.item_ids:
+        assert dict(mapped.items_by_id[item_id]) == dict(built.items_by_id[item_id])
+        assert mapped.sizes_by_id[item_id] == built.sizes_by_id[item_id]
+
+
+def test_prompt_and_options_round_trip(catalogs):
+    built, mapped = catalogs
+    assert mapped.version == built.version
+    assert mapped.instructions == built.instructions
+    assert mapped.prompt.categories == built.prompt.categories
+    assert mapped.context_mode == built.context_mode
+    assert mapped.modifier_groups == built.modifier_groups
+
+
+def test_lookups_are_decoded_once(catalogs):
+    _, mapped = catalogs
+    item_id = next(iter(mapped.item_ids))
+    size_map = mapped.items_by_id[item_id]
+    assert mapped.items_by_id.get(item_id) is size_map
+    assert mapped.items_by_id[item_id] is size_map
+    assert mapped.find(item_id, next(iter(size_map))) is next(iter(size_map.values()))
+    assert mapped.items_by_id.get("not_on_the_menu") is None
+    assert "not_on_the_menu" not in mapped.items_by_id
+
+
+def test_resolver_matches_the_built_one(catalogs):
+    built, mapped = catalogs
+    for query in QUERIES + sorted(built.item_ids):
+        assert mapped.resolver.rank(query) == built.resolver.rank(query)
+        assert mapped.resolver.resolve(query) == built.resolver.resolve(query)
+
+
+def test_search_matches_the_built_one(catalogs):
+    built, mapped = catalogs
+    if built.search_index is None:
+        assert mapped.search_index is None
+        return
+    for query in QUERIES + ["mozz", "cheese pizza", "large"]:
+        assert mapped.search_index.search(query) == built.search_index.search(query)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "menu.bin"
+    path.write_bytes(b"not a menu file")
+    with pytest.raises(ValueError):
+        load_catalog(str(path))
@@ -0,0 +1,72 @@
+import multiprocessing
+
+import pytest
+
+import order_ids
+from order_ids import COUNTER_BITS, MAX_COUNTER, MAX_WORKER_ID, IdGenerator, decode, lease_worker_id
+
+
+def test_ids_are_unique_and_increasing():
+    generator = IdGenerator(7)
+    issued = [generator.next_id() for _ in range(10_000)]
+    # more than a millisecond's counter in one go
+    issued += generator.next_ids(3 * (MAX_COUNTER + 1))
+
+    assert len(set(issued)) == len(issued)
+    assert issued == sorted(issued)
+    assert {decode(id) >> COUNTER_BITS & MAX_WORKER_ID for id in issued} == {7}
+
+
+def test_ids_keep_increasing_when_the_clock_goes_back(monkeypatch):
+    generator = IdGenerator(1)
+    now = [1_800_000_000_000_000_000]
+    monkeypatch.setattr(order_ids.time, "time_ns", lambda: now[0])
+    before = generator.next_ids(5)
+    now[0] -= 60_000_000_000
+    after = generator.next_ids(5)
+
+    assert before + after == sorted(before + after)
+    assert len(set(before + after)) == 10
+
+
+def test_observed_ids_sort_before_new_ones():
+    ahead = IdGenerator(2)
+    ahead._last_ms = order_ids.time.time_ns() // 1_000_000 + 60_000
+    observed = ahead.next_id()
+
+    generator = IdGenerator(3)
+    generator.observe(observed)
+    assert generator.next_id() > observed
+
+
+def test_worker_id_must_fit():
+    with pytest.raises(ValueError):
+        IdGenerator(MAX_WORKER_ID + 1)
+
+
+def test_leases_are_exclusive(tmp_path):
+    pool = range(4, 6)
+    assert lease_worker_id(str(tmp_path), pool) == 4
+    assert lease_worker_id(str(tmp_path), pool) == 5
+    with pytest.raises(RuntimeError):
+        lease_worker_id(str(tmp_path), pool)
+
+
+def _child_worker_id(generator: IdGenerator, queue) -> None:
+    queue.put(generator.worker_id)
+
+
+def test_forked_processes_lease_their_own_worker_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(order_ids, "WORKER_ID_DIR", str(tmp_path))
+    generator = IdGenerator()
+    parent_id = generator.worker_id
+
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    child = context.Process(target=_child_worker_id, args=(generator, queue))
+    child.start()
+    child_id = queue.get(timeout=10)
+    child.join()
+
+    assert child_id != parent_id
+    assert generator.worker_id == parent_id
@@ -0,0 +1,138 @@
+import asyncio
+import glob
+import json
+import os
+
+from order_journal import OrderJournal, compact_journal, read_journal, recover_order
+from recipt_state import OrderState
+
+
+def new_order(journal: OrderJournal, session_id: str = "room") -> OrderState:
+    return OrderState(journal=journal, session_id=session_id)
+
+
+def segments(directory) -> list[str]:
+    return sorted(glob.glob(os.path.join(directory, "orders-*.jsonl")))
+
+
+def test_recovers_changes_across_segments_in_append_order(tmp_path):
+    # b's segment is created first, so it sorts before a's by name
+    b = OrderJournal(str(tmp_path), group_commit=False)
+    a = OrderJournal(str(tmp_path), group_commit=False)
+
+    order = new_order(a)
+    line = asyncio.run(order.add("pepsi", "Can", unit_price_fils=5000))
+
+    recovered = recover_order(str(tmp_path), "room")
+    recovered.journal, recovered.session_id = b, "room"
+    asyncio.run(recovered.increment(line.order_id))
+
+    again = recover_order(str(tmp_path), "room")
+    assert [(l.item_id, l.quantity) for l in again.lines.values()] == [("pepsi", 2)]
+    assert again.order_uid == order.order_uid
+    a.close()
+    b.close()
+
+
+def test_recovery_skips_changes_to_unknown_lines(tmp_path):
+    journal = OrderJournal(str(tmp_path), group_commit=False)
+    order = new_order(journal)
+    asyncio.run(order.add("pepsi", "Can", unit_price_fils=5000))
+    journal.append({"s": "room", "op": "inc", "id": "O_MISSING", "q": 1})
+    journal.close()
+
+    recovered = recover_order(str(tmp_path), "room")
+    assert recovered.unit_count == 1
+
+
+def test_closed_orders_are_not_recovered(tmp_path):
+    journal = OrderJournal(str(tmp_path), group_commit=False)
+    order = new_order(journal)
+    asyncio.run(order.add("pepsi", "Can", unit_price_fils=5000))
+    order.close()
+    journal.close()
+
+    assert recover_order(str(tmp_path), "room") is None
+
+
+def test_close_writes_out_group_committed_records(tmp_path):
+    journal = OrderJournal(str(tmp_path), commit_interval=60)
+    order = new_order(journal)
+    asyncio.run(order.add("pepsi", "Can", unit_price_fils=5000))
+    order.close()
+    journal.close()
+
+    assert [record["op"] for record in read_journal(str(tmp_path))] == ["add", "close"]
+
+
+def test_compaction_keeps_only_open_orders_and_live_segments(tmp_path):
+    directory = str(tmp_path)
+    first = OrderJournal(directory, group_commit=False)
+    closed = new_order(first, "closed")
+    asyncio.run(closed.add("pepsi", "Can", unit_price_fils=5000))
+    closed.close()
+    open_order = new_order(first, "open")
+    asyncio.run(open_order.add("water", unit_price_fils=2000))
+    first.close()
+    sealed = segments(directory)
+
+    live = OrderJournal(directory, group_commit=False)
+    asyncio.run(new_order(live, "live").add("pepsi", "Can", unit_price_fils=5000))
+    (live_segment,) = set(segments(directory)) - set(sealed)
+
+    compact_journal(directory)
+
+    assert len(segments(directory)) == 2
+    assert live_segment in segments(directory)
+    sessions = [record["s"] for record in read_journal(directory)]
+    assert sorted(sessions) == ["live", "open"]
+    assert recover_order(directory, "open").unit_count == 1
+    assert recover_order(directory, "closed") is None
+    live.close()
+
+
+def test_recovery_ignores_duplicates_left_by_a_crashed_compaction(tmp_path):
+    journal = OrderJournal(str(tmp_path), group_commit=False)
+    asyncio.run(new_order(journal).add("pepsi", "Can", unit_price_fils=5000))
+    journal.close()
+
+    (path,) = segments(str(tmp_path))
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    with open(os.path.join(str(tmp_path), "orders-99999999999999999999-1.jsonl"), "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+    assert recover_order(str(tmp_path), "room").unit_count == 1
+
+
+def test_compaction_moves_closed_orders_to_history(tmp_path):
+    directory = str(tmp_path)
+    journal = OrderJournal(directory, group_commit=False)
+    for session in ("first", "second"):
+        order = new_order(journal, session)
+        asyncio.run(order.add("pepsi", "Can", unit_price_fils=5000))
+        order.close()
+    journal.close()
+    before = read_journal(directory)
+
+    compact_journal(directory)
+
+    assert segments(directory) == []
+    assert len(glob.glob(os.path.join(directory, "history-*.jsonl"))) == 1
+    assert read_journal(directory) == []
+    assert read_journal(directory, history=True) == before
+    assert recover_order(directory, "first") is None
+
+
+def test_flush_writes_out_records_and_keeps_the_journal_open(tmp_path):
+    journal = OrderJournal(str(tmp_path), commit_interval=60)
+    first = new_order(journal, "first")
+    asyncio.run(first.add("pepsi", "Can", unit_price_fils=5000))
+    first.close()
+    journal.flush()
+    assert [record["op"] for record in read_journal(str(tmp_path))] == ["add", "close"]
+
+    second = new_order(journal, "second")
+    asyncio.run(second.add("water", unit_price_fils=2000))
+    journal.close()
+    assert recover_order(str(tmp_path), "second").unit_count == 1
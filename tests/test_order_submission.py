@@ -0,0 +1,63 @@
+import asyncio
+import json
+import sqlite3
+
+from order_submission import FileSpoolSink, OrderSubmitter, SqliteSink, SubmittedOrder
+
+
+def submitted(revision: int, total_fils: int = 1000) -> SubmittedOrder:
+    return SubmittedOrder(
+        idempotency_key="O_1",
+        order_uid="O_1",
+        revision=revision,
+        session_id="room",
+        lines=(("pepsi", "Can", 1, total_fils, ()),),
+        total_fils=total_fils,
+        submitted_at=0.0,
+    )
+
+
+def test_sqlite_sink_keeps_the_latest_revision(tmp_path):
+    path = str(tmp_path / "orders.db")
+    sink = SqliteSink(path)
+    asyncio.run(sink.submit([submitted(1), submitted(3, 3000)]))
+    # a redelivery and a late, older revision
+    asyncio.run(sink.submit([submitted(3, 3000), submitted(2, 2000)]))
+
+    rows = sqlite3.connect(path).execute("SELECT order_uid, revision, total_fils FROM submitted_orders").fetchall()
+    assert rows == [("O_1", 3, 3000)]
+
+
+def test_spool_sink_skips_revisions_it_already_wrote(tmp_path):
+    path = tmp_path / "orders.jsonl"
+    sink = FileSpoolSink(str(path))
+    asyncio.run(sink.submit([submitted(1)]))
+    asyncio.run(sink.submit([submitted(1), submitted(2, 2000)]))
+
+    spooled = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(order["idempotency_key"], order["revision"]) for order in spooled] == [("O_1", 1), ("O_1", 2)]
+
+
+class FlakySink:
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.orders: list[SubmittedOrder] = []
+
+    async def submit(self, orders: list[SubmittedOrder]) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("sink down")
+        self.orders += orders
+
+
+def test_submit_resolves_once_its_order_is_delivered_or_given_up():
+    async def deliver(sink: FlakySink) -> bool:
+        submitter = OrderSubmitter(sink, max_attempts=2, retry_backoff=0)
+        submitter.start()
+        delivered = await submitter.submit(submitted(1))
+        result = await asyncio.wait_for(delivered, timeout=1)
+        await submitter.aclose()
+        return result
+
+    assert asyncio.run(deliver(FlakySink(failures=1)))
+    assert not asyncio.run(deliver(FlakySink(failures=2)))
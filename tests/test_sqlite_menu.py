@@ -0,0 +1,17 @@
+import sqlite3
+
+import pytest
+
+from sqlite_menu import ConnectionPool
+
+
+def test_failed_connects_give_their_slot_back(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "missing" / "menu.db"), max_size=1)
+    for _ in range(3):
+        with pytest.raises(sqlite3.OperationalError):
+            with pool.connection():
+                pass
+
+    pool._path = str(tmp_path / "menu.db")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone() == (1,)
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from order_journal import OrderJournal, compact_journal
+from recipt_state import OrderState
+from suggestions import build_tables, encode_lines, journal_lines
+
+
+def journal_orders(directory: str, baskets: list[list[str]]) -> None:
+    journal = OrderJournal(directory, group_commit=False)
+    for n, basket in enumerate(baskets):
+        order = OrderState(journal=journal, session_id=f"room-{n}")
+        for item_id in basket:
+            asyncio.run(order.add(item_id, unit_price_fils=1000))
+        order.close()
+    journal.close()
+
+
+def test_closed_orders_survive_compaction(tmp_path):
+    directory = str(tmp_path)
+    journal_orders(directory, [["pizza", "pepsi"]] * 3)
+    before = sorted(journal_lines(directory))
+
+    compact_journal(directory)
+
+    assert len(before) == 6
+    assert sorted(journal_lines(directory)) == before
+
+
+def test_history_reaches_the_tables(tmp_path):
+    pytest.importorskip("numpy")
+    directory = str(tmp_path)
+    journal_orders(directory, [["pizza", "pepsi"]] * 3 + [["pizza", "fries"]])
+    compact_journal(directory)
+
+    item_ids = ("pizza", "pepsi", "fries")
+    orders, items = encode_lines(journal_lines(directory), item_ids)
+    tables = build_tables(orders, items, item_ids, ["pizza", "drink", "sides"])
+
+    assert tables.suggest(["pizza"]) == ["pepsi"]
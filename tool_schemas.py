@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable
+
+import pydantic
+from livekit.agents import FunctionTool, RunContext, ToolError, function_tool
+from livekit.agents.llm import RawFunctionTool
+from livekit.agents.llm.utils import (
+    build_legacy_openai_schema,
+    function_arguments_to_pydantic_model,
+)
+
+
+# (ctx, tool name, seconds), called after every call, failed ones included
+ToolCallObserver = Callable[[RunContext, str, float], None]
+
+
+def compile_tool(tool: FunctionTool, *, on_call: ToolCallObserver | None = None) -> RawFunctionTool:
+    """
+    Freezes the JSON schema and the argument model of `tool`. livekit would
+    otherwise rebuild both with pydantic for every session, and the model
+    again for every call. `tool` must take the `RunContext` first.
+    """
+    args_model = function_arguments_to_pydantic_model(tool)
+    schema = build_legacy_openai_schema(tool, internally_tagged=True)
+    del schema["type"]
+    fields = tuple(args_model.model_fields)
+
+    async def call(raw_arguments: dict[str, Any], ctx: RunContext) -> Any:
+        start = time.perf_counter()
+        try:
+            try:
+                args = args_model.model_validate(raw_arguments)
+            except pydantic.ValidationError as e:
+                raise ToolError(f"Error parsing arguments for `{tool.info.name}`: {e}") from e
+            return await tool(ctx, **{name: getattr(args, name) for name in fields})
+        finally:
+            if on_call is not None:
+                on_call(ctx, tool.info.name, time.perf_counter() - start)
+
+    call.__name__ = tool.info.name
+    return function_tool(call, raw_schema=schema)